@@ -0,0 +1,194 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from paths import APP_DATA_DIR
+
+
+DEFAULT_DECISION_LOG = APP_DATA_DIR / "adaptive.jsonl"
+TICK_SECONDS = 5
+MAX_FRAGMENTS = 16
+
+# Controller tuning
+CPU_HIGH = 0.90  # utilization that counts as overload
+DISK_HIGH = 0.90
+DECREASE_FACTOR = 0.5  # multiplicative decrease on overload or a throughput drop
+MIN_GAIN = 0.05  # an increase must raise throughput at least this much to be kept
+DROP = 0.25  # throughput this far below the level before an increase counts as congestion
+HOLD_TICKS = 6  # ticks to wait after an unhelpful increase before probing again
+SETTLE_TICKS = 2  # ticks for throughput to settle after a change
+
+
+def _read_cpu_times() -> Optional[Tuple[int, int]]:
+    """(busy, total) jiffies from /proc/stat"""
+    try:
+        with open('/proc/stat', 'r') as f:
+            values = [int(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+    return sum(values) - idle, sum(values)
+
+
+def _read_io_ticks(device: int) -> Optional[int]:
+    """Milliseconds the block device has spent doing I/O (Linux)"""
+    try:
+        with open(f'/sys/dev/block/{os.major(device)}:{os.minor(device)}/stat', 'r') as f:
+            return int(f.read().split()[9])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SystemSampler:
+    """CPU and download-volume utilization since the previous sample, as fractions
+
+    Uses psutil for CPU when it is installed, /proc and /sys otherwise. Disk
+    utilization is only known on Linux, other platforms report None.
+    """
+
+    def __init__(self, path: str = '.'):
+        self.device = None
+        self.set_path(path)
+        self._cpu = _read_cpu_times()
+        self._disk = None
+        self._time = time.monotonic()
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)  # the first call only sets a reference point
+
+    def set_path(self, path: str):
+        try:
+            device = os.stat(path or '.').st_dev
+        except OSError:
+            device = None
+        if device != self.device:
+            self.device = device
+            self._disk = _read_io_ticks(device) if device is not None else None
+
+    def sample(self) -> Tuple[Optional[float], Optional[float]]:
+        now = time.monotonic()
+        elapsed_ms = (now - self._time) * 1000
+        self._time = now
+
+        cpu = None
+        if psutil is not None:
+            cpu = psutil.cpu_percent(interval=None) / 100
+        else:
+            times = _read_cpu_times()
+            if times and self._cpu and times[1] > self._cpu[1]:
+                cpu = (times[0] - self._cpu[0]) / (times[1] - self._cpu[1])
+            self._cpu = times
+
+        disk = None
+        ticks = _read_io_ticks(self.device) if self.device is not None else None
+        if ticks is not None and self._disk is not None and elapsed_ms > 0:
+            disk = min(1.0, (ticks - self._disk) / elapsed_ms)
+        self._disk = ticks
+        return cpu, disk
+
+
+class AdaptiveConcurrency:
+    """AIMD control of parallel downloads and fragments per download
+
+    Every tick the controller looks at the combined download throughput and
+    at CPU and disk utilization:
+
+    - overload (CPU or disk above their limits) or throughput falling well
+      below where it was before the last increase: multiplicative decrease
+      of both knobs
+    - the last increase did not raise throughput by MIN_GAIN: undo it and
+      hold for HOLD_TICKS before probing again, with the other knob
+    - otherwise, while every slot is busy: additive increase, one more slot
+      if jobs are waiting, else one more fragment per download
+
+    Fragments only apply to downloads started afterwards, yt-dlp cannot
+    change them mid-download. Decisions are returned for the log and
+    appended to a JSON lines file for tuning.
+    """
+
+    def __init__(self, max_slots: int = 4, max_fragments: int = MAX_FRAGMENTS,
+                 decision_log: Optional[Path] = DEFAULT_DECISION_LOG):
+        self.max_slots = max_slots
+        self.max_fragments = max_fragments
+        self.slots = 1
+        self.fragments = 1
+        self.decision_log = Path(decision_log) if decision_log else None
+        self._before_increase = None  # throughput when the last increase was made
+        self._last_increase = None  # 'slots' or 'fragments'
+        self._probe_fragments = False  # set when more slots did not help last time
+        self._settle = 0
+        self._hold = 0
+
+    def _decrease(self) -> str:
+        self.slots = max(1, int(self.slots * DECREASE_FACTOR))
+        self.fragments = max(1, int(self.fragments * DECREASE_FACTOR))
+        self._last_increase = None
+        self._before_increase = None
+        self._settle = SETTLE_TICKS
+        return 'decrease'
+
+    def update(self, throughput: float, cpu: Optional[float], disk: Optional[float],
+               running: int, waiting: int) -> Optional[Dict[str, Any]]:
+        """Adjust slots and fragments for one tick, returns the decision if anything changed"""
+        self.slots = min(self.slots, self.max_slots)
+        action = reason = None
+        if cpu is not None and cpu >= CPU_HIGH and (self.slots > 1 or self.fragments > 1):
+            action, reason = self._decrease(), f"CPU at {cpu:.0%}"
+        elif disk is not None and disk >= DISK_HIGH and (self.slots > 1 or self.fragments > 1):
+            action, reason = self._decrease(), f"disk at {disk:.0%}"
+        elif self._settle > 0:
+            self._settle -= 1
+        elif self._last_increase is not None:
+            before = self._before_increase
+            if throughput < before * (1 - DROP):
+                action, reason = self._decrease(), f"throughput fell to {throughput / before:.0%} after more {self._last_increase}"
+            elif throughput < before * (1 + MIN_GAIN):
+                # Whatever limits us now, more of this knob does not help
+                if self._last_increase == 'slots':
+                    self.slots = max(1, self.slots - 1)
+                else:
+                    self.fragments = max(1, self.fragments - 1)
+                self._probe_fragments = self._last_increase == 'slots'  # try the other knob next
+                action, reason = 'undo', f"more {self._last_increase} gained only {throughput / max(before, 1) - 1:+.0%}"
+                self._last_increase = None
+                self._hold = HOLD_TICKS
+            else:
+                self._last_increase = None  # kept, probe again next tick
+        elif self._hold > 0:
+            self._hold -= 1
+        elif running >= self.slots and throughput > 0:
+            if waiting and self.slots < self.max_slots and not self._probe_fragments:
+                self.slots += 1
+                self._last_increase = 'slots'
+            elif self.fragments < self.max_fragments:
+                self.fragments += 1
+                self._last_increase = 'fragments'
+            if self._last_increase:
+                self._before_increase = throughput
+                self._settle = SETTLE_TICKS
+                action, reason = 'increase', f"probing with more {self._last_increase}"
+
+        if action is None:
+            return None
+        decision = {'time': round(time.time(), 1), 'action': action, 'reason': reason,
+                    'slots': self.slots, 'fragments': self.fragments, 'throughput': round(throughput),
+                    'cpu': None if cpu is None else round(cpu, 3), 'disk': None if disk is None else round(disk, 3),
+                    'running': running, 'waiting': waiting}
+        self._log(decision)
+        return decision
+
+    def _log(self, decision: Dict[str, Any]):
+        if self.decision_log is None:
+            return
+        try:
+            self.decision_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.decision_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(decision) + '\n')
+        except OSError:
+            pass
\ No newline at end of file
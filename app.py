@@ -1,42 +1,163 @@
+import secrets
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTabWidget, QGroupBox, QLabel, QLineEdit, QPushButton, QComboBox,
-    QCheckBox, QProgressBar, QTextEdit, QFileDialog, QMessageBox,
-    QGridLayout
+    QCheckBox, QProgressBar, QPlainTextEdit, QFileDialog, QMessageBox,
+    QGridLayout, QListWidget, QListWidgetItem, QSpinBox, QInputDialog, QTableView, QHeaderView
 )
-from PySide6.QtCore import QThread
-from PySide6.QtGui import QFont
+from PySide6.QtCore import QThread, QSize, Qt, QTimer, QUrl, Signal
+from PySide6.QtGui import QDesktopServices, QFont, QIcon, QPixmap
 
-from workers import DownloadWorker, InfoWorker
+from workers import (DownloadWorker, InfoWorker, DedupWorker, CutWorker, HarvestWorker, LiveCaptureWorker,
+                     RemoteWorker, SplitStreamWorker)
+from adaptive import TICK_SECONDS, AdaptiveConcurrency, SystemSampler
+from cluster import DEFAULT_PORT, Coordinator
 from dialogs import VideoInfoDialog
+from history import HistoryModel, HistoryStore, record_from_job
+from library import LibraryIndex
+from livecapture import LiveCapture, capture_prefix
+from videoinfo import InfoBlobStore, VideoInfo
+from ytcache import YtDlpCache
+from quota import LibraryQuota
+from retry import LOST
+from scratch import create_job_dir, remove_job_dir
+from layout import LAYOUT_PRESETS
+from subscriptions import SubscriptionManager, SubscriptionStore
 from command import CommandBuilder
+from extractors import get_index, match_extractor
+from harvest import FORMAT_ARROW, FORMAT_CSV, FORMAT_NDJSON, FORMAT_PARQUET, pyarrow
 from theme import apply_theme
+from thumbnails import ThumbnailLoader
+from sponsorblock import MODE_MARK_THEN_CUT, format_categories_for_command
+from sponsorblock_cache import SegmentCache, SegmentFetcher, SponsorBlockProxy
+from urlnorm import SeenSet, canonicalize, split_url_list
+from scheduler import (
+    DownloadScheduler, DownloadJob, SiteLimits, ORDER_FIFO, ORDER_SHORTEST_FIRST, FINISHED, RUNNING, RETRYING,
+    format_bytes
+)
+
+
+LOG_FLUSH_MS = 50  # how long log lines are collected before they are shown
 
 
 class YtDlpGUI(QMainWindow):
+    dedup_requested = Signal(list, str)  # paths, link mode
+    cut_requested = Signal(list)  # (path, categories) items
+    harvest_requested = Signal(list, str, str)  # URLs, output path, format
+    library_scanned = Signal(int)  # files added
+    urls_received = Signal(list)  # URLs handed over by another launch
+    agent_event = Signal(str)  # a worker agent connected or went away
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("yt-dlp GUI")
         self.setGeometry(100, 100, 900, 700)
         
         # Worker threads
-        self.download_thread = None
-        self.download_worker = None
+        self.active_downloads = {}  # job id -> (thread, worker)
         self.info_thread = None
         self.info_worker = None
+        self.harvest_thread = None
+        self.harvest_worker = None
         
         # State
         self.is_downloading = False
+        self.info_url = None
+        self.info_cache = {}  # url -> VideoInfo from Get Info
+        self.info_blobs = InfoBlobStore()  # full info JSON, read back only on demand
+        self.ytdlp_cache = YtDlpCache()  # --cache-dir shared by all yt-dlp processes
+        
+        # Download queue
+        self.scheduler = DownloadScheduler()
+        self.jobs = {}  # job id -> DownloadJob
+        self.queue_items = {}  # job id -> QListWidgetItem
+        self.seen_urls = SeenSet()  # canonical URLs queued this session
+        
+        # Re-checks the queue when a site's start interval runs out
+        self.queue_timer = QTimer(self)
+        self.queue_timer.setSingleShot(True)
+        self.queue_timer.timeout.connect(self.process_queue)
+        
+        # Log lines are appended in batches, one widget update per flush instead of per line
+        self.pending_log = []
+        self.log_timer = QTimer(self)
+        self.log_timer.setSingleShot(True)
+        self.log_timer.setInterval(LOG_FLUSH_MS)
+        self.log_timer.timeout.connect(self.flush_log)
+        
+        # Tunes parallel downloads and fragments per download to the observed throughput
+        self.adaptive = AdaptiveConcurrency()
+        self.system_sampler = SystemSampler()
+        self.job_speeds = {}  # job id -> bytes per second
+        self.adaptive_timer = QTimer(self)
+        self.adaptive_timer.setInterval(TICK_SECONDS * 1000)
+        self.adaptive_timer.timeout.connect(self.adaptive_tick)
+        
+        # Remote worker agents, started from the Advanced tab
+        self.coordinator = None
+        self.agent_event.connect(self.on_agent_event)
         
         # Command builder
         self.command_builder = CommandBuilder()
         
+        # Shared thumbnail loader (memory + disk cache)
+        self.thumbnail_loader = ThumbnailLoader(self)
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_queue_thumbnail)
+        
+        # Background deduplication of finished files
+        self.dedup_worker = DedupWorker()
+        self.dedup_thread = QThread()
+        self.dedup_worker.moveToThread(self.dedup_thread)
+        self.dedup_worker.output_received.connect(self.log)
+        self.dedup_worker.dedup_finished.connect(self.dedup_finished)
+        self.dedup_requested.connect(self.dedup_worker.process)
+        self.dedup_thread.start()
+        self.reclaimed_bytes = 0
+        
+        # Deferred SponsorBlock cutting, run while the queue is idle
+        self.cut_worker = CutWorker()
+        self.cut_thread = QThread()
+        self.cut_worker.moveToThread(self.cut_thread)
+        self.cut_worker.output_received.connect(self.log)
+        self.cut_worker.cut_finished.connect(self.cut_finished)
+        self.cut_requested.connect(self.cut_worker.process)
+        self.cut_thread.start()
+        self.pending_cuts = []
+        self.is_cutting = False
+        
+        # Full-text index of downloaded files, searched from the Library tab
+        self.library = LibraryIndex()
+        # Size cap over downloads, least recently used files make room for new ones
+        self.library_quota = LibraryQuota(library=self.library)
+        self.library_scanned.connect(self.library_scan_finished)
+        self.urls_received.connect(self.receive_urls)
+        
+        # Persistent history of jobs that will not run again
+        self.history_model = HistoryModel(HistoryStore(), self)
+        
+        # Saved channels/playlists, checked for new entries in the background
+        self.subscriptions = SubscriptionManager(SubscriptionStore())
+        self.subscription_timer = QTimer(self)
+        self.subscription_timer.setInterval(60 * 1000)
+        self.subscription_timer.timeout.connect(self.sync_subscriptions)
+        
+        # Local SponsorBlock cache, started on first use
+        self.sponsorblock_proxy = None
+        
+        # Offline URL -> extractor index, loaded (or rebuilt) off the GUI thread
+        threading.Thread(target=get_index, name='extractor-index', daemon=True).start()
+        threading.Thread(target=self.info_blobs.prune, name='info-prune', daemon=True).start()
+        threading.Thread(target=self.ytdlp_cache.evict, name='ytdlp-cache-evict', daemon=True).start()
+        
         self.setup_ui()
         self.setup_styling()
         self.check_ytdlp_installation()
+        self.subscription_timer.start()
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -53,6 +174,9 @@ class YtDlpGUI(QMainWindow):
         # Setup tabs
         self.setup_download_tab()
         self.setup_advanced_tab()
+        self.setup_history_tab()
+        self.setup_library_tab()
+        self.setup_subscriptions_tab()
         
         # Status bar
         self.statusBar().showMessage("Ready")
@@ -70,8 +194,12 @@ class YtDlpGUI(QMainWindow):
         
         self.url_input = QLineEdit()
         self.url_input.setPlaceholderText("Enter video URL here...")
+        self.url_input.textChanged.connect(self.on_url_changed)
         url_layout.addWidget(self.url_input)
         
+        self.url_status_label = QLabel()
+        url_layout.addWidget(self.url_status_label)
+        
         layout.addWidget(url_group)
         
         # Options group
@@ -121,6 +249,14 @@ class YtDlpGUI(QMainWindow):
         self.playlist_cb = QCheckBox("Download Playlist")
         checkbox_layout.addWidget(self.playlist_cb)
         
+        self.live_capture_cb = QCheckBox("Live Capture")
+        self.live_capture_cb.setToolTip("Record a live stream as rolling segments (see Advanced > Storage Options)")
+        checkbox_layout.addWidget(self.live_capture_cb)
+        
+        self.split_streams_cb = QCheckBox("Parallel Video+Audio")
+        self.split_streams_cb.setToolTip("Fetch separate video and audio streams at the same time, then merge them")
+        checkbox_layout.addWidget(self.split_streams_cb)
+        
         checkbox_layout.addStretch()
         options_layout.addLayout(checkbox_layout)
         
@@ -134,6 +270,9 @@ class YtDlpGUI(QMainWindow):
         self.download_btn.clicked.connect(self.start_download)
         button_layout.addWidget(self.download_btn)
         
+        self.clear_queue_btn = QPushButton("Clear Finished")
+        self.clear_queue_btn.clicked.connect(self.clear_finished_jobs)
+        
         self.stop_btn = QPushButton("Stop")
         self.stop_btn.setStyleSheet("QPushButton { background-color: #f44336; color: white; font-weight: bold; }")
         self.stop_btn.clicked.connect(self.stop_download)
@@ -145,9 +284,31 @@ class YtDlpGUI(QMainWindow):
         self.info_btn.clicked.connect(self.get_video_info)
         button_layout.addWidget(self.info_btn)
         
+        self.bulk_btn = QPushButton("Bulk Add")
+        self.bulk_btn.setToolTip("Paste a list of URLs, duplicates already queued this session are skipped")
+        self.bulk_btn.clicked.connect(self.bulk_add_urls)
+        button_layout.addWidget(self.bulk_btn)
+        
+        self.harvest_btn = QPushButton("Harvest Metadata")
+        self.harvest_btn.setToolTip("Extract metadata for a list of URLs into a file, without downloading")
+        self.harvest_btn.clicked.connect(self.toggle_harvest)
+        button_layout.addWidget(self.harvest_btn)
+        
         button_layout.addStretch()
+        button_layout.addWidget(self.clear_queue_btn)
         layout.addLayout(button_layout)
         
+        # Download queue
+        queue_group = QGroupBox("Queue")
+        queue_layout = QVBoxLayout()
+        queue_group.setLayout(queue_layout)
+        
+        self.queue_list = QListWidget()
+        self.queue_list.setIconSize(QSize(64, 36))
+        queue_layout.addWidget(self.queue_list)
+        
+        layout.addWidget(queue_group)
+        
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -158,7 +319,7 @@ class YtDlpGUI(QMainWindow):
         log_layout = QVBoxLayout()
         log_group.setLayout(log_layout)
         
-        self.log_output = QTextEdit()
+        self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
         self.log_output.setFont(QFont("Consolas", 9))
         self.log_output.setMaximumHeight(200)
@@ -221,6 +382,143 @@ class YtDlpGUI(QMainWindow):
         
         layout.addWidget(video_group)
         
+        # Queue options group
+        queue_group = QGroupBox("Queue Options")
+        queue_layout = QGridLayout()
+        queue_group.setLayout(queue_layout)
+        
+        queue_layout.addWidget(QLabel("Parallel Downloads:"), 0, 0)
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, 16)
+        self.parallel_spin.setValue(1)
+        queue_layout.addWidget(self.parallel_spin, 0, 1)
+        
+        self.adaptive_cb = QCheckBox("Adaptive")
+        self.adaptive_cb.setToolTip("Start with one download and add downloads or fragments while throughput grows, "
+                                    "backing off when it drops or CPU/disk are saturated (up to Parallel Downloads)")
+        self.adaptive_cb.toggled.connect(self.toggle_adaptive)
+        queue_layout.addWidget(self.adaptive_cb, 0, 2)
+        
+        queue_layout.addWidget(QLabel("Keep Free (GB):"), 1, 0)
+        self.space_margin_spin = QSpinBox()
+        self.space_margin_spin.setRange(0, 1024)
+        self.space_margin_spin.setValue(1)
+        self.space_margin_spin.setToolTip("Jobs that would leave less than this free on the download volume are deferred or refused")
+        queue_layout.addWidget(self.space_margin_spin, 1, 1)
+        
+        self.sjf_cb = QCheckBox("Shortest job first")
+        self.sjf_cb.setToolTip("Start the smallest queued downloads first (uses sizes from Get Info)")
+        queue_layout.addWidget(self.sjf_cb, 2, 0, 1, 2)
+        
+        queue_layout.addWidget(QLabel("Per-site Limit:"), 3, 0)
+        self.site_limit_spin = QSpinBox()
+        self.site_limit_spin.setRange(0, 16)
+        self.site_limit_spin.setValue(2)
+        self.site_limit_spin.setSpecialValueText("Unlimited")
+        self.site_limit_spin.setToolTip("Maximum simultaneous downloads from the same site (extractor)")
+        queue_layout.addWidget(self.site_limit_spin, 3, 1)
+        
+        queue_layout.addWidget(QLabel("Min Start Interval (s):"), 4, 0)
+        self.site_interval_spin = QSpinBox()
+        self.site_interval_spin.setRange(0, 600)
+        self.site_interval_spin.setValue(0)
+        self.site_interval_spin.setToolTip("Minimum seconds between starting two downloads from the same site")
+        queue_layout.addWidget(self.site_interval_spin, 4, 1)
+        
+        queue_layout.addWidget(QLabel("Site Overrides:"), 5, 0)
+        self.site_overrides_input = QLineEdit()
+        self.site_overrides_input.setPlaceholderText("e.g., youtube=2, twitch=1/10")
+        self.site_overrides_input.setToolTip("Comma-separated site=limit[/seconds] entries, site names are yt-dlp extractors")
+        queue_layout.addWidget(self.site_overrides_input, 5, 1)
+        
+        queue_layout.addWidget(QLabel("Max Retries:"), 6, 0)
+        self.max_retries_spin = QSpinBox()
+        self.max_retries_spin.setRange(0, 10)
+        self.max_retries_spin.setValue(2)
+        self.max_retries_spin.setToolTip("Network and throttling failures are retried with increasing delays")
+        queue_layout.addWidget(self.max_retries_spin, 6, 1)
+        
+        queue_layout.addWidget(QLabel("Connections per File:"), 7, 0)
+        self.connections_spin = QSpinBox()
+        self.connections_spin.setRange(1, 16)
+        self.connections_spin.setValue(1)
+        self.connections_spin.setToolTip("Split direct HTTP downloads into byte ranges fetched in parallel (1 = yt-dlp's own downloader)")
+        queue_layout.addWidget(self.connections_spin, 7, 1)
+        
+        layout.addWidget(queue_group)
+        
+        # Storage options group
+        storage_group = QGroupBox("Storage Options")
+        storage_layout = QGridLayout()
+        storage_group.setLayout(storage_layout)
+        
+        storage_layout.addWidget(QLabel("Deduplicate Files:"), 0, 0)
+        self.dedup_combo = QComboBox()
+        self.dedup_combo.addItems(["off", "hardlink", "reflink", "auto"])
+        self.dedup_combo.setToolTip("Replace finished files that are byte-identical to an earlier download with links")
+        storage_layout.addWidget(self.dedup_combo, 0, 1)
+        
+        storage_layout.addWidget(QLabel("Scratch Directory:"), 1, 0)
+        scratch_layout = QHBoxLayout()
+        self.scratch_input = QLineEdit()
+        self.scratch_input.setPlaceholderText("Off - write directly to the download folder")
+        self.scratch_input.setToolTip("Fast local folder (SSD or tmpfs) for partial files and merges, "
+                                      "only finished files are moved to the download folder")
+        scratch_layout.addWidget(self.scratch_input)
+        scratch_browse_btn = QPushButton("Browse")
+        scratch_browse_btn.clicked.connect(self.browse_scratch_path)
+        scratch_layout.addWidget(scratch_browse_btn)
+        storage_layout.addLayout(scratch_layout, 1, 1)
+        
+        storage_layout.addWidget(QLabel("Live Window (h):"), 2, 0)
+        self.live_window_spin = QSpinBox()
+        self.live_window_spin.setRange(1, 168)
+        self.live_window_spin.setValue(6)
+        self.live_window_spin.setToolTip("Live captures keep only the most recent hours, older segments are deleted")
+        storage_layout.addWidget(self.live_window_spin, 2, 1)
+        
+        storage_layout.addWidget(QLabel("Live Segment (min):"), 3, 0)
+        self.live_segment_spin = QSpinBox()
+        self.live_segment_spin.setRange(1, 120)
+        self.live_segment_spin.setValue(10)
+        storage_layout.addWidget(self.live_segment_spin, 3, 1)
+        
+        storage_layout.addWidget(QLabel("Live Max Size (GB):"), 4, 0)
+        self.live_max_size_spin = QSpinBox()
+        self.live_max_size_spin.setRange(0, 10240)
+        self.live_max_size_spin.setValue(0)
+        self.live_max_size_spin.setSpecialValueText("No limit")
+        self.live_max_size_spin.setToolTip("Also delete the oldest segments once a capture uses more than this")
+        storage_layout.addWidget(self.live_max_size_spin, 4, 1)
+        
+        storage_layout.addWidget(QLabel("Output Layout:"), 5, 0)
+        self.layout_combo = QComboBox()
+        self.layout_combo.setEditable(True)
+        self.layout_combo.addItems(list(LAYOUT_PRESETS.values()))
+        self.layout_combo.setToolTip("yt-dlp output template below the download folder. Sharding by extractor and id "
+                                     "keeps directories small in large libraries, move existing files with layout.py")
+        storage_layout.addWidget(self.layout_combo, 5, 1)
+        
+        storage_layout.addWidget(QLabel("yt-dlp Cache (MB):"), 6, 0)
+        self.ytdlp_cache_spin = QSpinBox()
+        self.ytdlp_cache_spin.setRange(0, 10240)
+        self.ytdlp_cache_spin.setValue(self.ytdlp_cache.max_bytes // 1024 ** 2)
+        self.ytdlp_cache_spin.setSpecialValueText("Unmanaged")
+        self.ytdlp_cache_spin.setToolTip("Share one yt-dlp cache between downloads and warm it with the first job "
+                                         "of each site before starting the others, oldest entries are removed above this size")
+        storage_layout.addWidget(self.ytdlp_cache_spin, 6, 1)
+        
+        storage_layout.addWidget(QLabel("Library Quota (GB):"), 7, 0)
+        self.library_quota_spin = QSpinBox()
+        self.library_quota_spin.setRange(0, 102400)
+        self.library_quota_spin.setValue(0)
+        self.library_quota_spin.setSpecialValueText("No limit")
+        self.library_quota_spin.setToolTip("Keep downloads made with a quota under this size: before a job starts, the least "
+                                           "recently opened files are deleted to make room. Pin files in the Library tab to keep them")
+        storage_layout.addWidget(self.library_quota_spin, 7, 1)
+        
+        layout.addWidget(storage_group)
+        
         # SponsorBlock options (imported from sponsorblock module)
         from sponsorblock import create_sponsorblock_group
         sponsor_group = create_sponsorblock_group()
@@ -228,13 +526,283 @@ class YtDlpGUI(QMainWindow):
         # Get the widgets we need to access later
         self.sponsorblock_cb = sponsor_group.findChild(QCheckBox, "sponsorblock_cb")
         self.sponsor_categories_input = sponsor_group.findChild(QLineEdit, "sponsor_categories_input")
+        self.sponsorblock_cache_cb = sponsor_group.findChild(QCheckBox, "sponsorblock_cache_cb")
+        self.sponsorblock_mode_combo = sponsor_group.findChild(QComboBox, "sponsorblock_mode_combo")
         
         layout.addWidget(sponsor_group)
         
+        # Worker agents group
+        agents_group = QGroupBox("Worker Agents")
+        agents_layout = QGridLayout()
+        agents_group.setLayout(agents_layout)
+        
+        self.accept_agents_cb = QCheckBox("Accept worker agents")
+        self.accept_agents_cb.setToolTip("Lease queued downloads to agents on other machines "
+                                         "(python cluster.py --coordinator HOST:PORT --token TOKEN --output DIR)")
+        self.accept_agents_cb.toggled.connect(self.toggle_agents)
+        agents_layout.addWidget(self.accept_agents_cb, 0, 0, 1, 2)
+        
+        agents_layout.addWidget(QLabel("Port:"), 1, 0)
+        self.agent_port_spin = QSpinBox()
+        self.agent_port_spin.setRange(1, 65535)
+        self.agent_port_spin.setValue(DEFAULT_PORT)
+        agents_layout.addWidget(self.agent_port_spin, 1, 1)
+        
+        agents_layout.addWidget(QLabel("Token:"), 2, 0)
+        self.agent_token_input = QLineEdit()
+        self.agent_token_input.setPlaceholderText("Generated when agents are enabled")
+        agents_layout.addWidget(self.agent_token_input, 2, 1)
+        
+        self.agents_label = QLabel("Off")
+        agents_layout.addWidget(self.agents_label, 3, 0, 1, 2)
+        
+        layout.addWidget(agents_group)
+        
         layout.addStretch()
         
         self.tab_widget.addTab(advanced_widget, "Advanced")
     
+    def setup_history_tab(self):
+        """Setup the download history tab"""
+        history_widget = QWidget()
+        layout = QVBoxLayout()
+        history_widget.setLayout(layout)
+        
+        self.history_view = QTableView()
+        self.history_view.setModel(self.history_model)
+        self.history_view.setSelectionBehavior(QTableView.SelectRows)
+        self.history_view.setAlternatingRowColors(True)
+        self.history_view.verticalHeader().setVisible(False)
+        # Fixed row heights and column widths keep scrolling from measuring every row
+        self.history_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.history_view.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.history_view)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        clear_history_btn = QPushButton("Clear History")
+        clear_history_btn.clicked.connect(self.clear_history)
+        button_layout.addWidget(clear_history_btn)
+        layout.addLayout(button_layout)
+        
+        self.tab_widget.addTab(history_widget, "History")
+    
+    def setup_library_tab(self):
+        """Setup the library search tab"""
+        library_widget = QWidget()
+        layout = QVBoxLayout()
+        library_widget.setLayout(layout)
+        
+        search_layout = QHBoxLayout()
+        self.library_search_input = QLineEdit()
+        self.library_search_input.setPlaceholderText("Search titles, uploaders, descriptions, tags...")
+        search_layout.addWidget(self.library_search_input)
+        
+        self.library_scan_btn = QPushButton("Index Folder")
+        self.library_scan_btn.setToolTip("Add files in the download folder that have a .info.json next to them")
+        self.library_scan_btn.clicked.connect(self.scan_library_folder)
+        search_layout.addWidget(self.library_scan_btn)
+        
+        self.library_pin_btn = QPushButton("Pin")
+        self.library_pin_btn.setToolTip("Pin or unpin the selected file, pinned files are never removed by the library quota")
+        self.library_pin_btn.clicked.connect(self.toggle_library_pin)
+        search_layout.addWidget(self.library_pin_btn)
+        layout.addLayout(search_layout)
+        
+        self.library_subs_cb = QCheckBox("Index subtitle text of new downloads")
+        layout.addWidget(self.library_subs_cb)
+        
+        self.library_results = QListWidget()
+        self.library_results.itemDoubleClicked.connect(self.open_library_item)
+        layout.addWidget(self.library_results)
+        
+        self.library_status_label = QLabel(f"{self.library.count()} item(s) indexed")
+        layout.addWidget(self.library_status_label)
+        
+        # Search once typing pauses rather than on every keystroke
+        self.library_search_timer = QTimer(self)
+        self.library_search_timer.setSingleShot(True)
+        self.library_search_timer.setInterval(150)
+        self.library_search_timer.timeout.connect(self.search_library)
+        self.library_search_input.textChanged.connect(self.library_search_timer.start)
+        
+        self.tab_widget.addTab(library_widget, "Library")
+    
+    def search_library(self):
+        """Show the best matches for the search box"""
+        text = self.library_search_input.text()
+        started = time.perf_counter()
+        results = self.library.search(text)
+        elapsed = (time.perf_counter() - started) * 1000
+        
+        pinned = self.library_quota.pinned_paths()
+        self.library_results.setUpdatesEnabled(False)
+        self.library_results.clear()
+        for path, title, uploader, duration in results:
+            item = QListWidgetItem(f"{title} - {uploader}" if uploader else title)
+            if path in pinned:
+                item.setText(f"{item.text()} (pinned)")
+            item.setToolTip(path)
+            item.setData(Qt.UserRole, path)
+            self.library_results.addItem(item)
+        self.library_results.setUpdatesEnabled(True)
+        
+        if text.strip():
+            self.library_status_label.setText(f"{len(results)} result(s) in {elapsed:.1f} ms")
+        else:
+            self.library_status_label.setText(f"{self.library.count()} item(s) indexed")
+    
+    def open_library_item(self, item: QListWidgetItem):
+        """Open a library file with the system's default player"""
+        self.library_quota.touch(item.data(Qt.UserRole))
+        QDesktopServices.openUrl(QUrl.fromLocalFile(item.data(Qt.UserRole)))
+    
+    def toggle_library_pin(self):
+        """Pin the selected library file, or unpin it"""
+        item = self.library_results.currentItem()
+        if item is None:
+            return
+        path = item.data(Qt.UserRole)
+        pinned = path not in self.library_quota.pinned_paths()
+        self.library_quota.set_pinned(path, pinned)
+        self.log(f"{'Pinned' if pinned else 'Unpinned'} {path}")
+        self.search_library()
+    
+    def scan_library_folder(self):
+        """Index existing downloads in the background"""
+        directory = self.path_input.text()
+        with_subtitles = self.library_subs_cb.isChecked()
+        self.library_scan_btn.setEnabled(False)
+        self.log(f"Indexing {directory} for the library...")
+        threading.Thread(target=lambda: self.library_scanned.emit(self.library.scan(directory, with_subtitles)),
+                         name='library-scan', daemon=True).start()
+    
+    def library_scan_finished(self, added: int):
+        self.library_scan_btn.setEnabled(True)
+        self.log(f"Library: indexed {added} file(s)")
+        self.search_library()
+    
+    def setup_subscriptions_tab(self):
+        """Setup the channel/playlist subscriptions tab"""
+        subscriptions_widget = QWidget()
+        layout = QVBoxLayout()
+        subscriptions_widget.setLayout(layout)
+        
+        self.subscription_list = QListWidget()
+        layout.addWidget(self.subscription_list)
+        
+        settings_layout = QHBoxLayout()
+        settings_layout.addWidget(QLabel("Check every (min):"))
+        self.subscription_interval_spin = QSpinBox()
+        self.subscription_interval_spin.setRange(5, 7 * 24 * 60)
+        self.subscription_interval_spin.setValue(int(self.subscriptions.interval // 60))
+        settings_layout.addWidget(self.subscription_interval_spin)
+        settings_layout.addWidget(QLabel("Concurrent syncs:"))
+        self.subscription_concurrency_spin = QSpinBox()
+        self.subscription_concurrency_spin.setRange(1, 16)
+        self.subscription_concurrency_spin.setValue(self.subscriptions.max_concurrent)
+        self.subscription_concurrency_spin.setToolTip("Subscriptions checked at the same time, each is one queued job")
+        settings_layout.addWidget(self.subscription_concurrency_spin)
+        settings_layout.addWidget(QLabel("Newest entries checked:"))
+        self.subscription_items_spin = QSpinBox()
+        self.subscription_items_spin.setRange(1, 1000)
+        self.subscription_items_spin.setValue(self.subscriptions.max_items)
+        settings_layout.addWidget(self.subscription_items_spin)
+        settings_layout.addStretch()
+        layout.addLayout(settings_layout)
+        
+        button_layout = QHBoxLayout()
+        subscribe_btn = QPushButton("Subscribe to URL")
+        subscribe_btn.setToolTip("Keep the channel or playlist in the URL box in sync with the current options")
+        subscribe_btn.clicked.connect(self.add_subscription)
+        button_layout.addWidget(subscribe_btn)
+        sync_btn = QPushButton("Sync Now")
+        sync_btn.clicked.connect(lambda: self.sync_subscriptions(force=True))
+        button_layout.addWidget(sync_btn)
+        remove_btn = QPushButton("Remove")
+        remove_btn.clicked.connect(self.remove_subscription)
+        button_layout.addWidget(remove_btn)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+        
+        self.refresh_subscription_list()
+        self.tab_widget.addTab(subscriptions_widget, "Subscriptions")
+    
+    def refresh_subscription_list(self):
+        """Show each subscription with its sync state"""
+        self.subscription_list.clear()
+        for subscription in self.subscriptions.subscriptions.values():
+            if subscription.sub_id in self.subscriptions.running:
+                state = "syncing..."
+            elif subscription.last_checked:
+                checked = time.strftime('%Y-%m-%d %H:%M', time.localtime(subscription.last_checked))
+                state = f"checked {checked}, {subscription.last_new} new"
+            else:
+                state = "never checked"
+            item = QListWidgetItem(f"{subscription.url} - {state}")
+            item.setData(Qt.UserRole, subscription.sub_id)
+            self.subscription_list.addItem(item)
+    
+    def add_subscription(self):
+        """Subscribe to the URL in the download box"""
+        url = self.url_input.text().strip()
+        if not url:
+            QMessageBox.warning(self, "Error", "Please enter a channel or playlist URL")
+            return
+        options = self.get_ui_options()
+        options.pop('url', None)
+        subscription = self.subscriptions.add(url, options)
+        self.log(f"Subscribed to {subscription.url}")
+        self.refresh_subscription_list()
+        self.sync_subscriptions()
+    
+    def remove_subscription(self):
+        item = self.subscription_list.currentItem()
+        if item is None:
+            return
+        self.subscriptions.remove(item.data(Qt.UserRole))
+        self.refresh_subscription_list()
+    
+    def sync_subscriptions(self, force: bool = False):
+        """Queue a sync job for each due subscription, up to the concurrency cap"""
+        self.subscriptions.interval = self.subscription_interval_spin.value() * 60
+        self.subscriptions.max_concurrent = self.subscription_concurrency_spin.value()
+        self.subscriptions.max_items = self.subscription_items_spin.value()
+        due = self.subscriptions.due(force=force)
+        if not due:
+            return
+        for subscription in due:
+            options = self.subscriptions.sync_options(subscription)
+            if options.get('sponsorblock') and options.get('sponsorblock_cache'):
+                options['sponsorblock_api'] = self.ensure_sponsorblock_proxy().url
+            self.enqueue_job(options)
+        self.log(f"Syncing {len(due)} subscription(s)")
+        self.refresh_subscription_list()
+        self.process_queue()
+    
+    def job_closed(self, job: DownloadJob):
+        """Clean up after a job that will not run again"""
+        remove_job_dir(job.scratch_path)
+        job.scratch_path = None
+        self.subscription_job_done(job)
+    
+    def subscription_job_done(self, job: DownloadJob):
+        """Record the outcome of a sync job"""
+        sub_id = job.options.get('subscription_id')
+        if sub_id is None:
+            return
+        subscription = self.subscriptions.sync_finished(sub_id, job.status == FINISHED)
+        if subscription:
+            self.log(f"Subscription {subscription.url}: {subscription.last_new} new")
+        self.refresh_subscription_list()
+    
+    def clear_history(self):
+        """Forget all recorded jobs"""
+        reply = QMessageBox.question(self, "Clear History", "Remove all entries from the download history?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.history_model.clear()
+    
     def setup_styling(self):
         """Apply application styling"""
         apply_theme(self)
@@ -253,6 +821,17 @@ class YtDlpGUI(QMainWindow):
             self.info_btn.setEnabled(False)
             self.statusBar().showMessage("yt-dlp not found!")
     
+    def on_url_changed(self, text: str):
+        """Show which extractor will handle the URL as it is typed"""
+        url = text.strip()
+        if not url:
+            self.url_status_label.clear()
+        elif not self.command_builder.validate_url(url):
+            self.url_status_label.setText("Not a valid URL")
+        else:
+            extractor = match_extractor(url, wait=False)
+            self.url_status_label.setText(f"Extractor: {extractor}" if extractor else "")
+    
     def get_ui_options(self) -> Dict[str, Any]:
         """Get current UI options as dictionary"""
         return {
@@ -263,15 +842,32 @@ class YtDlpGUI(QMainWindow):
             'audio_only': self.audio_only_cb.isChecked(),
             'subtitle': self.subtitle_cb.isChecked(),
             'playlist': self.playlist_cb.isChecked(),
+            'split_streams': self.split_streams_cb.isChecked(),
             'audio_format': self.audio_format_combo.currentText(),
             'audio_quality': self.audio_quality_combo.currentText(),
             'embed_subs': self.embed_subs_cb.isChecked(),
             'write_thumbnail': self.write_thumbnail_cb.isChecked(),
             'sponsorblock': self.sponsorblock_cb.isChecked(),
             'sponsor_categories': self.sponsor_categories_input.text(),
+            'sponsorblock_cache': self.sponsorblock_cache_cb.isChecked(),
+            'sponsorblock_mode': self.sponsorblock_mode_combo.currentData(),
+            'ranged_connections': self.connections_spin.value(),
+            'scratch_dir': self.scratch_input.text().strip(),
+            'output_template': self.layout_combo.currentText().strip(),
+            'ytdlp_cache_dir': str(self.ytdlp_cache.directory) if self.ytdlp_cache_spin.value() else '',
+            'live_capture': self.live_capture_cb.isChecked(),
+            'live_window_hours': self.live_window_spin.value(),
+            'live_segment_minutes': self.live_segment_spin.value(),
+            'live_max_gb': self.live_max_size_spin.value(),
             'custom_args': self.custom_args_input.text().strip()
         }
     
+    def browse_scratch_path(self):
+        """Browse for the scratch directory"""
+        folder = QFileDialog.getExistingDirectory(self, "Select Scratch Directory", self.scratch_input.text())
+        if folder:
+            self.scratch_input.setText(folder)
+    
     def browse_download_path(self):
         """Browse for download directory"""
         folder = QFileDialog.getExistingDirectory(self, "Select Download Directory", 
@@ -280,94 +876,594 @@ class YtDlpGUI(QMainWindow):
             self.path_input.setText(folder)
     
     def log(self, message: str):
-        """Add message to log"""
-        self.log_output.append(message)
-        
-        # Auto-scroll to bottom
-        from PySide6.QtGui import QTextCursor
-        cursor = self.log_output.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        self.log_output.setTextCursor(cursor)
+        """Add message to log, shown with the next flush"""
+        self.pending_log.append(message)
+        if not self.log_timer.isActive():
+            self.log_timer.start()
+    
+    def flush_log(self):
+        """Append the pending log lines at once and scroll to the bottom"""
+        self.log_timer.stop()
+        if not self.pending_log:
+            return
+        self.log_output.appendPlainText('\n'.join(self.pending_log))
+        self.pending_log.clear()
+        scroll_bar = self.log_output.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
     
     def start_download(self):
-        """Start download process"""
+        """Queue the current URL and start downloading"""
         try:
-            if self.is_downloading:
-                return
+            options = self.get_download_options()
+            # Build once up front so bad options are reported before queueing
+            self.command_builder.build_download_command(options)
             
-            options = self.get_ui_options()
-            cmd = self.command_builder.build_download_command(options)
-            self.log(f"Starting download: {' '.join(cmd)}")
+            self.seen_urls.add(canonicalize(options['url'], options['playlist']))
+            job = self.enqueue_job(options)
+            self.log(f"Queued: {job.title} ({format_bytes(job.estimated_size)})")
             
-            # Setup worker and thread
-            self.download_worker = DownloadWorker()
-            self.download_thread = QThread()
-            
-            self.download_worker.moveToThread(self.download_thread)
-            
-            # Connect signals
-            self.download_worker.output_received.connect(self.log)
-            self.download_worker.progress_updated.connect(self.progress_bar.setValue)
-            self.download_worker.download_finished.connect(self.download_finished)
-            
-            # Start download when thread starts
-            self.download_thread.started.connect(lambda: self.download_worker.start_download(cmd))
-            
-            # UI state
-            self.is_downloading = True
-            self.download_btn.setEnabled(False)
-            self.stop_btn.setEnabled(True)
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setRange(0, 100)
-            self.progress_bar.setValue(0)
-            self.statusBar().showMessage("Downloading...")
-            
-            # Start thread
-            self.download_thread.start()
+            self.prewarm_sponsorblock()
+            self.process_queue()
             
         except ValueError as e:
             QMessageBox.warning(self, "Error", str(e))
         except Exception as e:
             self.log(f"Error starting download: {e}")
     
+    def get_download_options(self) -> Dict[str, Any]:
+        """UI options plus settings that only apply to queued downloads"""
+        options = self.get_ui_options()
+        if options['sponsorblock'] and options['sponsorblock_cache']:
+            options['sponsorblock_api'] = self.ensure_sponsorblock_proxy().url
+        return options
+    
+    def enqueue_job(self, options: Dict[str, Any]) -> DownloadJob:
+        """Create a job for options and add it to the queue (without starting it)"""
+        job = DownloadJob(options, self.info_cache.get(options['url']))
+        self.scheduler.add(job)
+        self.jobs[job.job_id] = job
+        self.add_queue_row(job)
+        return job
+    
+    def bulk_add_urls(self):
+        """Queue a pasted list of URLs"""
+        text, ok = QInputDialog.getMultiLineText(self, "Bulk Add", "Paste URLs (one per line):")
+        if ok and text.strip():
+            self.ingest_urls(split_url_list(text))
+    
+    def receive_urls(self, urls: List[str]):
+        """Queue URLs from the command line or another launch and bring the window forward"""
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        if urls:
+            self.ingest_urls(urls)
+    
+    def ingest_urls(self, urls: List[str]):
+        """Queue many URLs, dropping duplicates before anything is spawned"""
+        options = self.get_download_options()
+        new_urls, duplicates = self.seen_urls.filter_new(urls, options['playlist'], self.command_builder.validate_url)
+        invalid = len(urls) - len(new_urls) - duplicates
+        
+        self.queue_list.setUpdatesEnabled(False)
+        try:
+            for url in new_urls:
+                self.enqueue_job(dict(options, url=url))
+        finally:
+            self.queue_list.setUpdatesEnabled(True)
+        
+        self.log(f"Queued {len(new_urls)} URL(s), skipped {duplicates} duplicate(s) "
+                 f"and {invalid} invalid entr{'y' if invalid == 1 else 'ies'}")
+        self.prewarm_sponsorblock()
+        self.process_queue()
+    
+    def toggle_harvest(self):
+        """Start a metadata harvest, or stop the running one"""
+        if self.harvest_worker:
+            self.harvest_worker.stop()
+            self.harvest_btn.setEnabled(False)
+            return
+        
+        text, ok = QInputDialog.getMultiLineText(self, "Harvest Metadata", "Paste URLs (one per line):")
+        urls = split_url_list(text) if ok else []
+        if not urls:
+            return
+        
+        filters = {}
+        if pyarrow is not None:
+            filters["Parquet dataset (*.parquet)"] = FORMAT_PARQUET
+            filters["Arrow IPC dataset (*.arrow)"] = FORMAT_ARROW
+        filters["NDJSON (*.ndjson)"] = FORMAT_NDJSON
+        filters["CSV (*.csv)"] = FORMAT_CSV
+        # Existing outputs are resumed from their checkpoint, not replaced
+        output, selected = QFileDialog.getSaveFileName(
+            self, "Harvest Output", str(Path(self.path_input.text()) / "metadata"), ";;".join(filters),
+            options=QFileDialog.DontConfirmOverwrite)
+        if not output:
+            return
+        fmt = filters.get(selected, FORMAT_NDJSON)
+        if not output.endswith('.' + fmt):
+            output += '.' + fmt
+        
+        self.harvest_worker = HarvestWorker()
+        self.harvest_thread = QThread()
+        self.harvest_worker.moveToThread(self.harvest_thread)
+        self.harvest_worker.output_received.connect(self.log)
+        self.harvest_worker.harvest_progress.connect(self.harvest_progress)
+        self.harvest_worker.harvest_finished.connect(self.harvest_finished)
+        self.harvest_requested.connect(self.harvest_worker.run)
+        self.harvest_thread.start()
+        self.harvest_requested.emit(urls, output, fmt)
+        
+        self.harvest_btn.setText("Stop Harvest")
+        self.log(f"Harvesting metadata for {len(urls)} URL(s) into {output}")
+    
+    def harvest_progress(self, done: int, total: int, failures: int):
+        """Show harvest progress in the status bar"""
+        self.statusBar().showMessage(f"Harvested {done}/{total} URL(s), {failures} failed")
+    
+    def harvest_finished(self, written: int, failures: int):
+        """Clean up after a harvest"""
+        self.harvest_requested.disconnect(self.harvest_worker.run)
+        if self.harvest_thread:
+            self.harvest_thread.quit()
+            self.harvest_thread.wait()
+            self.harvest_thread = None
+        self.harvest_worker = None
+        self.harvest_btn.setText("Harvest Metadata")
+        self.harvest_btn.setEnabled(True)
+        self.log(f"Harvest wrote {written} row(s), {failures} URL(s) failed")
+        self.statusBar().showMessage("Harvest finished")
+    
+    def ensure_sponsorblock_proxy(self) -> SponsorBlockProxy:
+        """Start the local SponsorBlock cache endpoint if it is not running"""
+        if self.sponsorblock_proxy is None:
+            self.sponsorblock_proxy = SponsorBlockProxy(SegmentFetcher(SegmentCache()))
+            self.sponsorblock_proxy.start()
+            self.log(f"SponsorBlock cache listening on {self.sponsorblock_proxy.url}")
+        return self.sponsorblock_proxy
+    
+    def prewarm_sponsorblock(self):
+        """Fetch SponsorBlock segments for all queued videos in one batch"""
+        if self.sponsorblock_proxy is None:
+            return
+        
+        video_ids = set()
+        for job in self.scheduler.pending:
+            if not job.options.get('sponsorblock_api'):
+                continue
+            if job.info and job.info.get('extractor_key') == 'Youtube':
+                video_ids.add(job.info.get('id'))
+                continue
+            site, media_id = canonicalize(job.url)
+            if site == 'youtube':
+                video_ids.add(media_id)
+        video_ids.discard(None)
+        
+        if video_ids:
+            threading.Thread(target=self.sponsorblock_proxy.fetcher.prewarm, args=(video_ids,),
+                             name='sponsorblock-prewarm', daemon=True).start()
+    
+    def apply_queue_settings(self):
+        """Push queue options from the UI into the scheduler"""
+        # Slots on connected agents come on top of the local ones
+        remote_slots = self.coordinator.total_slots() if self.coordinator else 0
+        self.scheduler.max_parallel = self.local_parallel() + remote_slots
+        self.scheduler.local_slots = self.local_parallel() if self.coordinator else None
+        self.scheduler.remote_free = self.coordinator.free_slots() if self.coordinator else 0
+        self.scheduler.order = ORDER_SHORTEST_FIRST if self.sjf_cb.isChecked() else ORDER_FIFO
+        self.ytdlp_cache.max_bytes = self.ytdlp_cache_spin.value() * 1024 ** 2
+        self.scheduler.ytdlp_cache = self.ytdlp_cache if self.ytdlp_cache_spin.value() else None
+        self.library_quota.max_bytes = self.library_quota_spin.value() * 1024 ** 3
+        self.scheduler.library_quota = self.library_quota if self.library_quota_spin.value() else None
+        self.scheduler.reservations.margin = self.space_margin_spin.value() * 1024 ** 3
+        
+        self.scheduler.retry_policy.max_attempts = self.max_retries_spin.value() + 1
+        
+        site_limits = self.scheduler.site_limits
+        site_limits.default_limit = self.site_limit_spin.value()
+        site_limits.default_interval = float(self.site_interval_spin.value())
+        try:
+            site_limits.overrides = SiteLimits.parse_overrides(
+                self.site_overrides_input.text(), site_limits.default_interval)
+        except ValueError as e:
+            self.log(f"Ignoring site overrides: {e}")
+            site_limits.overrides = {}
+    
+    def local_parallel(self) -> int:
+        """Downloads this machine runs at once"""
+        if self.adaptive_cb.isChecked():
+            self.adaptive.max_slots = self.parallel_spin.value()
+            return min(self.adaptive.slots, self.adaptive.max_slots)
+        return self.parallel_spin.value()
+    
+    def process_queue(self):
+        """Start as many queued jobs as the scheduler allows"""
+        self.apply_queue_settings()
+        to_start, refused = self.scheduler.schedule()
+        
+        for path, size in self.scheduler.evicted:
+            self.log(f"Library quota: removed {path} ({format_bytes(size)})")
+        self.scheduler.evicted.clear()
+        
+        for job in refused:
+            self.log(f"Refused: {job.title} - {job.message}")
+            self.update_queue_row(job)
+            self.job_closed(job)
+        
+        for job in to_start:
+            self.launch_job(job)
+        
+        for job in self.scheduler.pending:
+            self.update_queue_row(job)
+        
+        # Wake up again when a throttled site may start its next job
+        wakeup = self.scheduler.next_wakeup()
+        if wakeup is not None and self.scheduler.free_slots():
+            self.queue_timer.start(int(wakeup * 1000) + 50)
+        
+        self.update_download_state()
+        self.run_idle_cuts()
+    
+    def run_idle_cuts(self):
+        """Start the deferred SponsorBlock cut batch once nothing is downloading"""
+        if self.is_cutting or not self.pending_cuts or self.scheduler.has_work():
+            return
+        
+        batch = self.pending_cuts
+        self.pending_cuts = []
+        self.is_cutting = True
+        self.log(f"Removing SponsorBlock segments from {len(batch)} file(s)...")
+        self.cut_requested.emit(batch)
+    
+    def cut_finished(self, done: int, failed: int):
+        """Handle the end of a deferred cut batch"""
+        self.is_cutting = False
+        self.log(f"SponsorBlock cut batch finished: {done} file(s) cut, {failed} failed")
+        # More files may have finished downloading in the meantime
+        self.run_idle_cuts()
+    
+    def launch_job(self, job: DownloadJob):
+        """Run a scheduled job in its own worker thread"""
+        if job.options.get('live_capture'):
+            self.launch_live_capture(job)
+            return
+        if job.remote:
+            if not self.coordinator or not self.launch_remote(job):
+                # The agent went away since the queue was scheduled, back to the front of the queue
+                self.launch_failed(job, "No worker agent slot free", LOST)
+            return
+        try:
+            options = job.options
+            if job.scratch_dir:
+                # Retries reuse the directory so yt-dlp can resume its .part files
+                if job.scratch_path is None:
+                    job.scratch_path = create_job_dir(job.scratch_dir)
+                options = dict(options, scratch_path=job.scratch_path)
+            if self.adaptive_cb.isChecked():
+                options = dict(options, concurrent_fragments=self.adaptive.fragments)
+            cmd = self.command_builder.build_download_command(options)
+        except (ValueError, OSError) as e:
+            self.launch_failed(job, str(e))
+            return
+        
+        self.log(f"Starting download: {' '.join(cmd)}")
+        
+        # Setup worker and thread
+        split = options.get('split_streams') and not options.get('audio_only') and not options.get('playlist')
+        if split:
+            worker = SplitStreamWorker(job.job_id, job.scratch_path, job.output_path, self.command_builder, job.info)
+        else:
+            worker = DownloadWorker(job.job_id, job.scratch_path, job.output_path)
+        thread = QThread()
+        worker.moveToThread(thread)
+        
+        # Connect signals
+        worker.output_received.connect(self.log)
+        worker.job_progress.connect(self.job_progress)
+        worker.job_speed.connect(self.job_speed)
+        worker.job_finished.connect(self.job_finished)
+        worker.file_completed.connect(self.job_file_completed)
+        worker.file_info.connect(self.job_file_info)
+        
+        self.active_downloads[job.job_id] = (thread, worker)
+        self.update_queue_row(job)
+        thread.start()
+        # Queued to the worker's thread, a lambda on thread.started would run on this one
+        if split:
+            worker.split_requested.emit(options)
+        else:
+            worker.start_requested.emit(cmd)
+    
+    def launch_failed(self, job: DownloadJob, message: str, failure: str = ''):
+        """Finish a job that could not be started, cleaning up like job_finished() does"""
+        self.scheduler.job_finished(job.job_id, False, message, failure)
+        self.log(f"{job.title}: {job.message}")
+        self.update_queue_row(job)
+        if job.status != RETRYING:
+            self.history_model.add(record_from_job(job))
+            self.job_closed(job)
+        # Called from process_queue(), refill the freed slot once it is done
+        QTimer.singleShot(0, self.process_queue)
+    
+    def launch_remote(self, job: DownloadJob) -> bool:
+        """Lease a job to a worker agent, False if none has a free slot"""
+        options = job.options
+        if self.adaptive_cb.isChecked():
+            options = dict(options, concurrent_fragments=self.adaptive.fragments)
+        
+        worker = RemoteWorker(job.job_id, self.coordinator)
+        worker.output_received.connect(self.log)
+        worker.job_progress.connect(self.job_progress)
+        worker.job_speed.connect(self.job_speed)
+        worker.job_finished.connect(self.job_finished)
+        
+        # Registered first, the agent may report back before start_remote() returns
+        self.active_downloads[job.job_id] = (None, worker)
+        if not worker.start_remote(options):
+            del self.active_downloads[job.job_id]
+            return False
+        self.log(f"Leased to agent {self.coordinator.agent_of(worker.lease_id)}: {job.url}")
+        self.update_queue_row(job)
+        return True
+    
+    def toggle_agents(self, enabled: bool):
+        """Start or stop accepting worker agents"""
+        if not enabled:
+            if self.coordinator:
+                self.coordinator.stop()
+                self.coordinator = None
+            self.agents_label.setText("Off")
+            self.process_queue()
+            return
+        
+        if not self.agent_token_input.text().strip():
+            self.agent_token_input.setText(secrets.token_urlsafe(16))
+        coordinator = Coordinator(self.agent_port_spin.value(), self.agent_token_input.text().strip(),
+                                  on_event=self.agent_event.emit)
+        try:
+            coordinator.start()
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Cannot listen on port {self.agent_port_spin.value()}: {e}")
+            self.accept_agents_cb.setChecked(False)
+            return
+        self.coordinator = coordinator
+        self.agents_label.setText(f"Listening on port {coordinator.port}, no agents connected")
+    
+    def on_agent_event(self, message: str):
+        """An agent connected or went away, which changes the number of slots"""
+        self.log(message)
+        if self.coordinator:
+            names = self.coordinator.agent_names()
+            self.agents_label.setText(f"Listening on port {self.coordinator.port}, "
+                                      f"{len(names)} agent(s): {', '.join(names) or 'none'}")
+            self.process_queue()
+    
+    def launch_live_capture(self, job: DownloadJob):
+        """Run a live-capture job, which segments the stream itself instead of writing one file"""
+        options = job.options
+        try:
+            cmd = self.command_builder.build_live_command(options)
+        except ValueError as e:
+            self.launch_failed(job, str(e))
+            return
+        
+        capture = LiveCapture(cmd, job.output_path, capture_prefix(job.url),
+                              segment_seconds=options.get('live_segment_minutes', 10) * 60,
+                              window_seconds=options.get('live_window_hours', 6) * 3600,
+                              max_bytes=options.get('live_max_gb', 0) * 1024 ** 3)
+        self.log(f"Starting live capture: {' '.join(cmd)}")
+        
+        worker = LiveCaptureWorker(job.job_id, capture)
+        thread = QThread()
+        worker.moveToThread(thread)
+        worker.output_received.connect(self.log)
+        worker.job_finished.connect(self.job_finished)
+        thread.started.connect(worker.run)
+        
+        self.active_downloads[job.job_id] = (thread, worker)
+        self.update_queue_row(job)
+        thread.start()
+    
     def stop_download(self):
-        """Stop current download"""
-        if self.download_worker:
-            self.download_worker.stop_download()
+        """Stop running downloads and drop the rest of the queue"""
+        for job in self.scheduler.cancel_pending():
+            self.update_queue_row(job)
+            self.history_model.add(record_from_job(job))
+            self.job_closed(job)
+        
+        for _, worker in self.active_downloads.values():
+            worker.stop_download()
+        if self.active_downloads:
             self.log("Stopping download...")
+        
+        self.update_download_state()
     
-    def download_finished(self, success: bool, message: str):
-        """Handle download completion"""
-        self.log(message)
+    def job_progress(self, job_id: str, percent: int):
+        """Handle progress from one job"""
+        self.scheduler.update_progress(job_id, percent)
+        extracted = self.scheduler.extraction_done(job_id)
+        if extracted:
+            cache = '' if extracted.cache_warm is None else f" ({'warm' if extracted.cache_warm else 'cold'} yt-dlp cache)"
+            self.log(f"{extracted.title}: downloading after {extracted.extract_seconds:.1f}s{cache}")
+            if extracted.cache_warm is False:
+                # Jobs held back for the warm-up can start now
+                self.process_queue()
+        job = self.jobs.get(job_id)
+        if job:
+            self.update_queue_row(job)
+        self.update_download_state()
+    
+    def job_speed(self, job_id: str, speed: float):
+        """Remember the latest download speed of one job for the adaptive controller"""
+        self.job_speeds[job_id] = speed
+    
+    def toggle_adaptive(self, enabled: bool):
+        """Start or stop adaptive concurrency, which always begins from one download"""
+        if enabled:
+            self.adaptive = AdaptiveConcurrency(self.parallel_spin.value())
+            self.system_sampler.sample()  # the first tick measures from here
+            self.adaptive_timer.start()
+        else:
+            self.adaptive_timer.stop()
+        self.process_queue()
+    
+    def adaptive_tick(self):
+        """Feed throughput and utilization to the adaptive controller and apply its decision"""
+        self.system_sampler.set_path(self.scratch_input.text().strip() or self.path_input.text())
+        cpu, disk = self.system_sampler.sample()
+        if not self.active_downloads:
+            return
         
+        self.adaptive.max_slots = self.parallel_spin.value()
+        slots = self.adaptive.slots
+        decision = self.adaptive.update(sum(self.job_speeds.values()), cpu, disk,
+                                        len(self.active_downloads), len(self.scheduler.pending))
+        if decision is None:
+            return
+        self.log(f"[adaptive] {decision['action']} ({decision['reason']}): "
+                 f"{decision['slots']} parallel, {decision['fragments']} fragment(s) per download")
+        if self.adaptive.slots > slots:
+            self.process_queue()
+        else:
+            # Running downloads finish, fewer slots only hold back the next ones
+            self.apply_queue_settings()
+    
+    def job_finished(self, job_id: str, success: bool, message: str, failure: str = ''):
+        """Handle completion of one job"""
+        self.job_speeds.pop(job_id, None)
         # Clean up thread
-        if self.download_thread:
-            self.download_thread.quit()
-            self.download_thread.wait()
-            self.download_thread = None
-        self.download_worker = None
+        thread, _ = self.active_downloads.pop(job_id, (None, None))
+        if thread:
+            thread.quit()
+            thread.wait()
         
-        # UI state
-        self.is_downloading = False
-        self.download_btn.setEnabled(True)
-        self.stop_btn.setEnabled(False)
-        self.progress_bar.setVisible(False)
+        job = self.scheduler.job_finished(job_id, success, message, failure)
+        if job and success and job.files and self.dedup_combo.currentText() != "off":
+            self.dedup_requested.emit(list(job.files), self.dedup_combo.currentText())
+        if (job and success and job.files and job.options.get('sponsorblock')
+                and job.options.get('sponsorblock_mode') == MODE_MARK_THEN_CUT):
+            categories = format_categories_for_command(job.options.get('sponsor_categories', '')).split(',')
+            self.pending_cuts.extend((path, categories) for path in job.files)
+        if job:
+            self.log(f"{job.title}: {job.message}")
+            self.update_queue_row(job)
+            if job.status != RETRYING:
+                self.history_model.add(record_from_job(job))
+                self.job_closed(job)
+        else:
+            self.log(message)
         
         if success:
             self.statusBar().showMessage("Download completed!")
+        elif job and job.status == RETRYING:
+            self.statusBar().showMessage("Download failed, retry scheduled")
         else:
             self.statusBar().showMessage("Download failed!")
+        
+        # Slots and disk space may have been freed
+        self.process_queue()
+        
+        if not self.scheduler.has_work():
+            summary = self.ytdlp_cache.summary()
+            if summary:
+                self.log(summary)
+            # Nothing is reading the cache now
+            threading.Thread(target=self.ytdlp_cache.evict, name='ytdlp-cache-evict', daemon=True).start()
+    
+    def job_file_completed(self, job_id: str, path: str):
+        """Remember files a job has finished writing"""
+        job = self.jobs.get(job_id)
+        if job and path not in job.files:
+            job.files.append(path)
+        if self.scheduler.library_quota is not None:
+            self.library_quota.add(path)
+    
+    def job_file_info(self, job_id: str, path: str, info: Dict[str, Any]):
+        """Add a finished file to the library index"""
+        job = self.jobs.get(job_id)
+        if job and job.options.get('subscription_id') is not None:
+            self.subscriptions.entry_finished(job.options['subscription_id'], info)
+        try:
+            self.library.add_file(path, info, self.library_subs_cb.isChecked())
+        except Exception as e:
+            self.log(f"Could not index {path}: {e}")
+    
+    def dedup_finished(self, linked: int, reclaimed: int):
+        """Report space reclaimed by deduplication"""
+        if linked:
+            self.reclaimed_bytes += reclaimed
+            self.log(f"Deduplicated {linked} file(s), reclaimed {format_bytes(reclaimed)} "
+                     f"({format_bytes(self.reclaimed_bytes)} this session)")
+    
+    def update_download_state(self):
+        """Sync buttons and progress bar with the queue"""
+        self.is_downloading = bool(self.active_downloads)
+        self.stop_btn.setEnabled(self.scheduler.has_work())
+        self.progress_bar.setVisible(self.is_downloading)
+        
+        if self.is_downloading:
+            running = list(self.scheduler.running.values())
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(sum(job.progress for job in running) // max(len(running), 1))
+            pending = len(self.scheduler.pending)
+            self.statusBar().showMessage(f"Downloading {len(running)} item(s), {pending} queued...")
+    
+    def add_queue_row(self, job: DownloadJob):
+        """Add a queue list entry for a job"""
+        item = QListWidgetItem()
+        item.setData(Qt.UserRole, job.job_id)
+        self.queue_list.addItem(item)
+        self.queue_items[job.job_id] = item
+        
+        thumbnail_url = job.info.get('thumbnail') if job.info else None
+        if thumbnail_url:
+            pixmap = self.thumbnail_loader.request(thumbnail_url)
+            if pixmap is not None:
+                item.setIcon(QIcon(pixmap))
+        
+        self.update_queue_row(job)
+    
+    def update_queue_row(self, job: DownloadJob):
+        """Refresh the queue list entry for a job"""
+        item = self.queue_items.get(job.job_id)
+        if item is None:
+            return
+        
+        text = f"[{job.status}] [{job.site}] {job.title}"
+        if job.status == RUNNING:
+            text += f" - {job.progress}%"
+        elif job.message:
+            text += f" - {job.message}"
+        item.setText(text)
+    
+    def on_queue_thumbnail(self, url: str, pixmap: QPixmap):
+        """Set queue row icons once their thumbnail has loaded"""
+        for job_id, item in self.queue_items.items():
+            job = self.jobs.get(job_id)
+            if job and job.info and job.info.get('thumbnail') == url:
+                item.setIcon(QIcon(pixmap))
+    
+    def clear_finished_jobs(self):
+        """Remove jobs that are no longer queued or running from the list"""
+        for job_id in list(self.queue_items):
+            if self.scheduler.get(job_id) is None:
+                item = self.queue_items.pop(job_id)
+                self.queue_list.takeItem(self.queue_list.row(item))
+                self.jobs.pop(job_id, None)
     
     def get_video_info(self):
         """Get video information"""
         try:
             options = self.get_ui_options()
             cmd = self.command_builder.build_info_command(options)
+            self.info_url = options['url']
             self.log("Getting video information...")
             self.statusBar().showMessage("Getting video info...")
             
             # Setup worker and thread
-            self.info_worker = InfoWorker()
+            self.info_worker = InfoWorker(self.info_blobs)
             self.info_thread = QThread()
             
             self.info_worker.moveToThread(self.info_thread)
@@ -376,18 +1472,16 @@ class YtDlpGUI(QMainWindow):
             self.info_worker.info_received.connect(self.show_video_info)
             self.info_worker.error_occurred.connect(self.info_error)
             
-            # Start info retrieval when thread starts
-            self.info_thread.started.connect(lambda: self.info_worker.get_info(cmd))
-            
-            # Start thread
+            # Start thread, then info retrieval on it
             self.info_thread.start()
+            self.info_worker.info_requested.emit(cmd)
             
         except ValueError as e:
             QMessageBox.warning(self, "Error", str(e))
         except Exception as e:
             self.log(f"Error getting video info: {e}")
     
-    def show_video_info(self, info: Dict[str, Any]):
+    def show_video_info(self, info: VideoInfo):
         """Show video information dialog"""
         self.log("Video information retrieved successfully")
         self.statusBar().showMessage("Ready")
@@ -399,8 +1493,16 @@ class YtDlpGUI(QMainWindow):
             self.info_thread = None
         self.info_worker = None
         
+        # Remember the info so queued jobs can be sized and scheduled
+        if self.info_url:
+            self.info_cache[self.info_url] = info
+            for job in self.scheduler.pending:
+                if job.url == self.info_url and job.info is None:
+                    job.attach_info(info)
+                    self.update_queue_row(job)
+        
         # Show info dialog
-        dialog = VideoInfoDialog(info, self)
+        dialog = VideoInfoDialog(info, self, thumbnail_loader=self.thumbnail_loader)
         dialog.show()
     
     def info_error(self, error: str):
@@ -415,6 +1517,26 @@ class YtDlpGUI(QMainWindow):
             self.info_thread = None
         self.info_worker = None
     
+    def shutdown_background_workers(self):
+        """Stop long-lived background worker threads"""
+        if self.harvest_worker:
+            self.harvest_worker.stop()
+            self.harvest_thread.quit()
+            self.harvest_thread.wait()
+        
+        self.dedup_thread.quit()
+        self.dedup_thread.wait()
+        self.cut_thread.quit()
+        self.cut_thread.wait()
+        
+        if self.sponsorblock_proxy:
+            self.sponsorblock_proxy.stop()
+            self.sponsorblock_proxy = None
+        
+        if self.coordinator:
+            self.coordinator.stop()
+            self.coordinator = None
+    
     def closeEvent(self, event):
         """Handle application closing"""
         if self.is_downloading:
@@ -423,10 +1545,11 @@ class YtDlpGUI(QMainWindow):
                                        QMessageBox.Yes | QMessageBox.No)
             
             if reply == QMessageBox.Yes:
-                if self.download_worker:
-                    self.download_worker.stop_download()
+                self.stop_download()
+                self.shutdown_background_workers()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.shutdown_background_workers()
             event.accept()
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""Widget performance benchmarks, run under the offscreen Qt platform
+
+    python benchmarks/gui_bench.py                    # compare against baseline.json
+    python benchmarks/gui_bench.py --update-baseline  # record new baselines
+    python benchmarks/gui_bench.py --only log_100k
+
+Each benchmark reports one or more metrics where lower is better. A metric
+above its threshold in baseline.json is a regression and makes the script
+exit with status 1. Baselines are machine specific, record them on the
+machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Must be set before Qt is imported, and before paths.py reads the home directory
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+_HOME = tempfile.mkdtemp(prefix='ytdlp-gui-bench-')
+os.environ['HOME'] = _HOME
+os.environ['USERPROFILE'] = _HOME
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QThread, QTimer
+from PySide6.QtWidgets import QApplication
+
+from app import YtDlpGUI
+from dialogs import VideoInfoDialog
+from videoinfo import InfoBlobStore, VideoInfo
+from workers import DownloadWorker
+
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+DEFAULT_TOLERANCE = 1.5  # thresholds are baseline * tolerance
+
+LOG_LINES = 100_000
+INFO_FORMATS = 1000
+INFO_BYTES = 5 * 1024 * 1024
+STREAM_WORKERS = 4
+STREAM_LINES_PER_SECOND = 500  # per worker
+STREAM_SECONDS = 3.0
+TICK_MS = 5
+
+# Prints yt-dlp style progress lines at a fixed rate: argv = rate, seconds
+_FAKE_DOWNLOAD = """
+import sys, time
+rate, seconds = float(sys.argv[1]), float(sys.argv[2])
+start = time.perf_counter()
+i = 0
+while time.perf_counter() - start < seconds:
+    print(f"[download] {i % 1000 / 10:5.1f}% of  512.00MiB at    8.00MiB/s ETA 01:{i % 60:02d}", flush=True)
+    i += 1
+    time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+"""
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def drain(app: QApplication, seconds: float = 0.05):
+    """Process events until the queue has been quiet for a moment"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        app.processEvents()
+
+
+def make_info(formats: int = INFO_FORMATS, size: int = INFO_BYTES) -> Dict[str, Any]:
+    """An info dict shaped like yt-dlp's, padded to about size bytes of JSON"""
+    info = {
+        'id': 'bench0000001', 'title': 'Benchmark video', 'uploader': 'Benchmark channel',
+        'duration': 3600, 'view_count': 123456, 'upload_date': '20240101', 'extractor_key': 'Youtube',
+        'webpage_url': 'https://www.youtube.com/watch?v=bench0000001',
+        'description': 'Lorem ipsum dolor sit amet. ' * 200,
+        'tags': [f'tag{i}' for i in range(50)],
+        'formats': [],
+    }
+    for i in range(formats):
+        height = (144, 240, 360, 480, 720, 1080, 1440, 2160)[i % 8]
+        info['formats'].append({
+            'format_id': str(100 + i), 'ext': ('mp4', 'webm', 'm4a')[i % 3],
+            'resolution': f'{height * 16 // 9}x{height}', 'width': height * 16 // 9, 'height': height,
+            'fps': 30, 'vcodec': 'avc1.640028', 'acodec': 'none' if i % 3 else 'mp4a.40.2',
+            'filesize': 1_000_000 * (i + 1), 'tbr': 1000.0 + i, 'format_note': f'{height}p',
+            'protocol': 'https', 'url': f'https://rr1.example.invalid/videoplayback?itag={i}&sig=' + 'x' * 200,
+            'http_headers': {'User-Agent': 'Mozilla/5.0', 'Accept': '*/*'},
+        })
+    # Fragment lists make up most of a real info dict's size
+    padding = size - len(json.dumps(info))
+    per_format = max(0, padding // formats // 60)
+    for i, fmt in enumerate(info['formats']):
+        fmt['fragments'] = [{'path': f'sq/{j}/seg-{i:04d}', 'duration': 5.0} for j in range(per_format)]
+    return info
+
+
+def bench_construct(app: QApplication, repeat: int = 3) -> Dict[str, float]:
+    """YtDlpGUI() until its first frame is shown"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        window = YtDlpGUI()
+        window.show()
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+        window.close()
+        window.deleteLater()
+        drain(app)
+    return {'construct_s': statistics.median(times)}
+
+
+def bench_log(app: QApplication, window: YtDlpGUI, lines: int = LOG_LINES) -> Dict[str, float]:
+    """YtDlpGUI.log() for many lines, including the flush and repaint that follow"""
+    window.log_output.clear()
+    start = time.perf_counter()
+    for i in range(lines):
+        window.log(f"[download] {i % 1000 / 10:5.1f}% of  512.00MiB at    8.00MiB/s ETA 01:{i % 60:02d}")
+    window.flush_log()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    window.log_output.clear()
+    return {'log_100k_s': elapsed, 'log_us_per_line': elapsed / lines * 1e6}
+
+
+def bench_info_dialog(app: QApplication, window: YtDlpGUI, repeat: int = 3) -> Dict[str, float]:
+    """VideoInfoDialog with a large info dict, until its first frame is shown
+
+    Parsing happens in InfoWorker's thread and is reported separately.
+    """
+    text = json.dumps(make_info())
+    store = InfoBlobStore(Path(_HOME) / 'info')
+    start = time.perf_counter()
+    info = VideoInfo.from_json(text, store)
+    parse_time = time.perf_counter() - start
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dialog = VideoInfoDialog(info, None, window.thumbnail_loader)
+        dialog.show()
+        app.processEvents()
+        times.append(time.perf_counter() - start)
+        dialog.close()
+        dialog.deleteLater()
+        drain(app)
+    return {'info_dialog_s': statistics.median(times), 'info_parse_s': parse_time}
+
+
+def bench_streaming_latency(app: QApplication, window: YtDlpGUI) -> Dict[str, float]:
+    """How late a TICK_MS timer fires while several workers stream output into the log
+
+    Timing starts once every worker is streaming, the yt-dlp processes
+    starting up is not what this measures.
+    """
+    window.log_output.clear()
+    threads = []
+    streaming = set()
+    for i in range(STREAM_WORKERS):
+        worker = DownloadWorker(f'bench{i}')
+        thread = QThread()
+        worker.moveToThread(thread)
+        worker.output_received.connect(window.log)
+        worker.job_progress.connect(lambda job_id, _: streaming.add(job_id))
+        worker.download_finished.connect(thread.quit)
+        threads.append((thread, worker))
+    command = [sys.executable, '-c', _FAKE_DOWNLOAD, str(STREAM_LINES_PER_SECOND), str(STREAM_SECONDS)]
+
+    lateness = []
+    last = [time.perf_counter()]
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, (now - last[0]) * 1000 - TICK_MS))
+        last[0] = now
+
+    timer = QTimer()
+    timer.setInterval(TICK_MS)
+    timer.timeout.connect(tick)
+    for thread, worker in threads:
+        thread.start()
+        # Started the way launch_job does, queued to the worker's thread
+        worker.start_requested.emit(command)
+    while len(streaming) < STREAM_WORKERS and any(thread.isRunning() for thread, _ in threads):
+        app.processEvents()
+    last[0] = time.perf_counter()
+    timer.start()
+    while any(thread.isRunning() for thread, _ in threads):
+        app.processEvents()
+    # Output still queued for the GUI thread counts too
+    drain(app, 0.2)
+    timer.stop()
+    for thread, _ in threads:
+        thread.wait()
+    window.log_output.clear()
+    return {
+        'stream_latency_p50_ms': percentile(lateness, 0.50),
+        'stream_latency_p99_ms': percentile(lateness, 0.99),
+        'stream_latency_max_ms': max(lateness),
+    }
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, float]]] = {
+    'construct': bench_construct,
+    'log_100k': bench_log,
+    'info_dialog': bench_info_dialog,
+    'stream_latency': bench_streaming_latency,
+}
+
+
+def run(names: List[str]) -> Dict[str, float]:
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = {}
+    window = None
+    for name in names:
+        print(f"{name}...", flush=True)
+        if name == 'construct':
+            results.update(bench_construct(app))
+            continue
+        if window is None:
+            window = YtDlpGUI()
+            window.show()
+            drain(app)
+        results.update(BENCHMARKS[name](app, window))
+    if window is not None:
+        window.close()
+    return results
+
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'metrics': {}}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, Any]) -> List[str]:
+    """Lines describing each metric, regressions start with 'REGRESSION'"""
+    lines = []
+    for metric, value in results.items():
+        entry = baseline['metrics'].get(metric)
+        if entry is None:
+            lines.append(f"  {metric:26} {value:12.3f}  (no baseline)")
+            continue
+        prefix = 'REGRESSION' if value > entry['threshold'] else '  '
+        lines.append(f"{prefix} {metric:24} {value:12.3f}  "
+                     f"baseline {entry['value']:.3f}, threshold {entry['threshold']:.3f}")
+    return lines
+
+
+def update_baseline(results: Dict[str, float], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    baseline['machine'] = f"{platform.system()} {platform.machine()}, Python {platform.python_version()}"
+    baseline['recorded'] = time.strftime('%Y-%m-%d')
+    for metric, value in results.items():
+        # Sub-millisecond latencies are noise, give them an absolute floor
+        floor = 5.0 if metric.endswith('_ms') else 0.0
+        baseline['metrics'][metric] = {'value': round(value, 4),
+                                       'threshold': round(max(value * tolerance, floor), 4)}
+    return baseline
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offscreen benchmarks for the GUI widgets")
+    parser.add_argument('--only', action='append', choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help="record the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="threshold as a multiple of the recorded value (with --update-baseline)")
+    parser.add_argument('--output', type=Path, help="also write the raw results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.only or list(BENCHMARKS))
+    baseline = load_baseline(args.baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(update_baseline(results, baseline, args.tolerance), f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    lines = compare(results, baseline)
+    print('\n'.join(lines))
+    return 1 if any(line.startswith('REGRESSION') for line in lines) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
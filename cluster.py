@@ -0,0 +1,460 @@
+"""Worker agents that run queued downloads on other machines
+
+    python cluster.py --coordinator 192.168.1.10:8765 --token SECRET --output /srv/videos --slots 2
+
+The GUI is the coordinator (Advanced > Worker Agents). Agents connect to it
+over TCP and both sides send one JSON object per line:
+
+    agent -> coordinator   hello {name, slots, nonce}, auth {proof}, heartbeat,
+                           output {lease, line}, finished {lease, code, error}
+    coordinator -> agent   challenge {nonce, proof}, welcome, error {message},
+                           assign {lease, options}, cancel {lease}
+
+The token never goes over the wire. Both sides prove they know it with an
+HMAC over the two nonces, and every message after the handshake carries an
+HMAC with a sequence number under a key derived from them. Nobody without
+the token can pose as the coordinator or inject commands into a session.
+Agents only pass on the custom yt-dlp arguments they were started with
+--allow-arg for.
+
+A job is leased to one agent. Every message from the agent renews its
+leases. If nothing arrives for LEASE_SECONDS, or the connection drops, the
+leases are lost and the jobs go back to the queue for another node. An
+agent that loses its coordinator stops its downloads for the same reason.
+Several agents can run on one machine against a coordinator on localhost.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from command import CommandBuilder
+
+
+DEFAULT_PORT = 8765
+DEFAULT_SLOTS = 2
+LEASE_SECONDS = 30
+HEARTBEAT_SECONDS = 10
+RECONNECT_SECONDS = 5
+MAX_LINE = 1024 * 1024
+
+# Options that point at the coordinator's machine, agents use their own
+LOCAL_OPTIONS = ('output_path', 'scratch_dir', 'scratch_path', 'sponsorblock_api', 'ytdlp_cache_dir',
+                 'download_archive')
+
+
+def _proof(token: str, role: str, *nonces: str) -> str:
+    return hmac.new(token.encode('utf-8'), ':'.join((role,) + nonces).encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _session_key(token: str, agent_nonce: str, coordinator_nonce: str) -> bytes:
+    return hmac.new(token.encode('utf-8'), f"session:{agent_nonce}:{coordinator_nonce}".encode('utf-8'),
+                    hashlib.sha256).digest()
+
+
+def filter_custom_args(text: str, allowed: Tuple[str, ...]) -> Optional[str]:
+    """text if every option in it is allowed, else None
+
+    Values following an allowed option pass, so "--limit-rate 1M" needs
+    only --limit-rate to be allowed. An empty allow-list refuses any option.
+    """
+    for arg in text.split():
+        if arg.startswith('-') and arg.split('=', 1)[0] not in allowed:
+            return None
+    return text
+
+
+class Channel:
+    """One JSON object per line over a socket, sends may come from several threads"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self._lock = threading.Lock()
+        self.key = None
+        self.send_seq = 0
+        self.receive_seq = 0
+
+    def secure(self, key: bytes):
+        """Sign every following message with key, and accept only messages signed with it"""
+        self.key = key
+
+    def _mac(self, seq: int, body: str) -> str:
+        return hmac.new(self.key, f"{seq}:{body}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        body = json.dumps(message)
+        with self._lock:
+            if self.key is not None:
+                # JSON escapes tabs, the last one separates the MAC
+                body = f"{body}\t{self._mac(self.send_seq, body)}"
+                self.send_seq += 1
+            try:
+                self.sock.sendall((body + '\n').encode('utf-8'))
+                return True
+            except OSError:
+                return False
+
+    def receive(self) -> Optional[Dict[str, Any]]:
+        """The next message, None once the connection is closed, broken or tampered with"""
+        try:
+            line = self.reader.readline(MAX_LINE).decode('utf-8')
+            if self.key is not None and line:
+                line, _, mac = line.rstrip('\n').rpartition('\t')
+                if not hmac.compare_digest(mac, self._mac(self.receive_seq, line)):
+                    return None
+                self.receive_seq += 1
+            message = json.loads(line) if line else None
+        except (OSError, ValueError):
+            return None
+        return message if isinstance(message, dict) else None
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class _Agent:
+    def __init__(self, name: str, slots: int, channel: Channel):
+        self.name = name
+        self.slots = slots
+        self.channel = channel
+        self.leases = set()
+        self.last_seen = time.monotonic()
+
+
+class Coordinator:
+    """Accepts worker agents and leases queued jobs to them
+
+    A job's handler receives handle_output(line), process_exited(code) and
+    lost(message) calls from the coordinator's threads. on_event gets a
+    line for the log whenever an agent comes or goes.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, token: str = '', host: str = '0.0.0.0',
+                 lease_seconds: float = LEASE_SECONDS, on_event: Optional[Callable[[str], None]] = None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.lease_seconds = lease_seconds
+        self.on_event = on_event or (lambda message: None)
+        self.server = None
+        self.agents: List[_Agent] = []
+        self.leases: Dict[str, Tuple[Any, _Agent]] = {}  # lease id -> (handler, agent)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name='coordinator-accept', daemon=True).start()
+        threading.Thread(target=self._reap_loop, name='coordinator-leases', daemon=True).start()
+
+    def stop(self):
+        """Close every connection, running remote jobs are lost"""
+        self._stopped.set()
+        if self.server:
+            self.server.close()
+        with self._lock:
+            agents = list(self.agents)
+        for agent in agents:
+            self._drop_agent(agent, "coordinator stopped")
+
+    def agent_names(self) -> List[str]:
+        with self._lock:
+            return [agent.name for agent in self.agents]
+
+    def total_slots(self) -> int:
+        with self._lock:
+            return sum(agent.slots for agent in self.agents)
+
+    def free_slots(self) -> int:
+        with self._lock:
+            return sum(max(agent.slots - len(agent.leases), 0) for agent in self.agents)
+
+    def assign(self, options: Dict[str, Any], handler) -> Optional[str]:
+        """Lease a job to the least busy agent, returns the lease id or None if all are full"""
+        options = {key: value for key, value in options.items() if key not in LOCAL_OPTIONS}
+        with self._lock:
+            candidates = [agent for agent in self.agents if len(agent.leases) < agent.slots]
+            if not candidates:
+                return None
+            agent = min(candidates, key=lambda agent: len(agent.leases) / agent.slots)
+            lease_id = uuid.uuid4().hex
+            agent.leases.add(lease_id)
+            self.leases[lease_id] = (handler, agent)
+        if not agent.channel.send({'type': 'assign', 'lease': lease_id, 'options': options}):
+            with self._lock:
+                self.leases.pop(lease_id, None)
+                agent.leases.discard(lease_id)
+            self._drop_agent(agent, "connection lost")
+            return None
+        return lease_id
+
+    def agent_of(self, lease_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self.leases.get(lease_id)
+        return entry[1].name if entry else None
+
+    def cancel(self, lease_id: Optional[str]):
+        with self._lock:
+            entry = self.leases.get(lease_id)
+        if entry:
+            entry[1].channel.send({'type': 'cancel', 'lease': lease_id})
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                sock, address = self.server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve_agent, args=(sock, address),
+                             name='coordinator-agent', daemon=True).start()
+
+    def _serve_agent(self, sock: socket.socket, address):
+        channel = Channel(sock)
+        sock.settimeout(10)  # for the handshake only
+        hello = channel.receive()
+        if not hello or hello.get('type') != 'hello' or not isinstance(hello.get('nonce'), str):
+            channel.send({'type': 'error', 'message': "bad hello"})
+            channel.close()
+            return
+        agent_nonce, nonce = hello['nonce'], secrets.token_hex(16)
+        channel.send({'type': 'challenge', 'nonce': nonce,
+                      'proof': _proof(self.token, 'coordinator', agent_nonce, nonce)})
+        auth = channel.receive()
+        sock.settimeout(None)
+        if (not auth or auth.get('type') != 'auth'
+                or not hmac.compare_digest(str(auth.get('proof', '')), _proof(self.token, 'agent', nonce, agent_nonce))):
+            channel.send({'type': 'error', 'message': "bad token"})
+            channel.close()
+            return
+        channel.send({'type': 'welcome'})
+        # Signed from here on, before assign() can reach the agent
+        channel.secure(_session_key(self.token, agent_nonce, nonce))
+        name = f"{hello.get('name') or 'agent'}@{address[0]}"
+        slots = hello.get('slots')
+        agent = _Agent(name, max(1, slots if isinstance(slots, int) else 1), channel)
+        with self._lock:
+            self.agents.append(agent)
+        self.on_event(f"Agent {agent.name} connected with {agent.slots} slot(s)")
+
+        while True:
+            message = channel.receive()
+            if message is None:
+                break
+            agent.last_seen = time.monotonic()
+            kind = message.get('type')
+            if kind == 'output':
+                with self._lock:
+                    entry = self.leases.get(message.get('lease'))
+                if entry:
+                    entry[0].handle_output(str(message.get('line', '')))
+            elif kind == 'finished':
+                with self._lock:
+                    entry = self.leases.pop(message.get('lease'), None)
+                    agent.leases.discard(message.get('lease'))
+                if entry:
+                    # An expired lease was already handed to someone else, its result is dropped
+                    if message.get('error'):
+                        entry[0].handle_output(f"ERROR: {message['error']}")
+                    entry[0].process_exited(message.get('code'))
+        self._drop_agent(agent, "connection closed")
+
+    def _drop_agent(self, agent: _Agent, reason: str):
+        with self._lock:
+            if agent not in self.agents:
+                return
+            self.agents.remove(agent)
+            lost = [self.leases.pop(lease_id)[0] for lease_id in agent.leases if lease_id in self.leases]
+            agent.leases.clear()
+        agent.channel.close()
+        self.on_event(f"Agent {agent.name} disconnected ({reason}), {len(lost)} job(s) to reassign")
+        for handler in lost:
+            handler.lost(f"Agent {agent.name} lost: {reason}")
+
+    def _reap_loop(self):
+        while not self._stopped.wait(1.0):
+            deadline = time.monotonic() - self.lease_seconds
+            with self._lock:
+                silent = [agent for agent in self.agents if agent.last_seen < deadline]
+            for agent in silent:
+                self._drop_agent(agent, f"no heartbeat for {int(self.lease_seconds)}s, leases expired")
+
+
+class Agent:
+    """Runs jobs leased by a coordinator with yt-dlp on this machine"""
+
+    def __init__(self, host: str, port: int, token: str, output_dir: str, slots: int = DEFAULT_SLOTS,
+                 name: Optional[str] = None, builder: Optional[CommandBuilder] = None,
+                 allowed_args: Tuple[str, ...] = ()):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.output_dir = os.path.abspath(output_dir)
+        self.slots = slots
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.builder = builder or CommandBuilder()
+        self.allowed_args = tuple(allowed_args)  # custom yt-dlp options the coordinator may pass
+        self.processes: Dict[str, subprocess.Popen] = {}
+        self.cancelled = set()  # leases cancelled before their process was started
+        self.channel = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Leave the coordinator, run_forever() returns"""
+        self._stopped.set()
+        if self.channel:
+            self.channel.close()
+
+    def run_forever(self) -> bool:
+        """Serve coordinators until stopped (True) or refused (False)"""
+        while not self._stopped.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=10)
+            except OSError as e:
+                print(f"Cannot reach coordinator {self.host}:{self.port}: {e}", flush=True)
+            else:
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if not self.session(Channel(sock)):
+                    return False
+            self._stopped.wait(RECONNECT_SECONDS)
+        return True
+
+    def session(self, channel: Channel) -> bool:
+        """Serve one connection, returns False if the coordinator refused this agent or failed to authenticate"""
+        self.channel = channel
+        nonce = secrets.token_hex(16)
+        channel.send({'type': 'hello', 'name': self.name, 'slots': self.slots, 'nonce': nonce})
+        challenge = channel.receive()
+        if not challenge or challenge.get('type') != 'challenge' or not isinstance(challenge.get('nonce'), str):
+            print(f"Coordinator refused: {(challenge or {}).get('message', 'no reply')}", flush=True)
+            channel.close()
+            return challenge is None  # a dropped connection is worth retrying, a refusal is not
+        if not hmac.compare_digest(str(challenge.get('proof', '')),
+                                   _proof(self.token, 'coordinator', nonce, challenge['nonce'])):
+            print("Coordinator does not know the token, not taking jobs from it", flush=True)
+            channel.close()
+            return False
+        channel.send({'type': 'auth', 'proof': _proof(self.token, 'agent', challenge['nonce'], nonce)})
+        reply = channel.receive()
+        if not reply or reply.get('type') != 'welcome':
+            print(f"Coordinator refused: {(reply or {}).get('message', 'no reply')}", flush=True)
+            channel.close()
+            return reply is None
+        channel.secure(_session_key(self.token, nonce, challenge['nonce']))
+        print(f"Connected to {self.host}:{self.port} as {self.name}", flush=True)
+
+        closed = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(channel, closed), daemon=True).start()
+        while True:
+            message = channel.receive()
+            if message is None:
+                break
+            if message.get('type') == 'assign':
+                threading.Thread(target=self._run_job, args=(channel, message['lease'], message.get('options', {})),
+                                 daemon=True).start()
+            elif message.get('type') == 'cancel':
+                self._terminate(message.get('lease'))
+        closed.set()
+        channel.close()
+        # Our leases expire on the coordinator, another node will redo these jobs
+        print("Lost the coordinator, stopping running downloads", flush=True)
+        with self._lock:
+            leases = list(self.processes)
+        for lease_id in leases:
+            self._terminate(lease_id)
+        return True
+
+    def _heartbeat(self, channel: Channel, closed: threading.Event):
+        while not closed.wait(HEARTBEAT_SECONDS):
+            if not channel.send({'type': 'heartbeat'}):
+                return
+
+    def _terminate(self, lease_id: Optional[str]):
+        with self._lock:
+            process = self.processes.get(lease_id)
+            if process is None:
+                self.cancelled.add(lease_id)
+        if process and process.poll() is None:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+    def _run_job(self, channel: Channel, lease_id: str, options: Dict[str, Any]):
+        options = {key: value for key, value in options.items() if key not in LOCAL_OPTIONS}
+        custom_args = str(options.get('custom_args') or '')
+        if custom_args and filter_custom_args(custom_args, self.allowed_args) is None:
+            # yt-dlp options like --exec run programs, only those the agent's owner allowed pass
+            print(f"[{lease_id[:8]}] dropping custom arguments not allowed with --allow-arg: {custom_args}", flush=True)
+            channel.send({'type': 'output', 'lease': lease_id,
+                          'line': f"WARNING: agent {self.name} ignored custom arguments: {custom_args}"})
+            options['custom_args'] = ''
+        try:
+            command = self.builder.build_download_command(dict(options, output_path=self.output_dir))
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       text=True, encoding='utf-8', errors='replace', bufsize=1)
+        except (ValueError, OSError) as e:
+            channel.send({'type': 'finished', 'lease': lease_id, 'code': None, 'error': str(e)})
+            return
+        with self._lock:
+            self.processes[lease_id] = process
+            cancelled = lease_id in self.cancelled
+            self.cancelled.discard(lease_id)
+        if cancelled:
+            self._terminate(lease_id)
+        print(f"[{lease_id[:8]}] {options.get('url')}", flush=True)
+        try:
+            for line in process.stdout:
+                line = line.rstrip()
+                if line:
+                    channel.send({'type': 'output', 'lease': lease_id, 'line': line})
+            code = process.wait()
+        finally:
+            with self._lock:
+                self.processes.pop(lease_id, None)
+        print(f"[{lease_id[:8]}] exit code {code}", flush=True)
+        channel.send({'type': 'finished', 'lease': lease_id, 'code': code})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run downloads leased by a yt-dlp GUI coordinator")
+    parser.add_argument('--coordinator', required=True, help="host:port of the GUI accepting agents")
+    parser.add_argument('--token', default=os.environ.get('YTDLP_GUI_TOKEN', ''),
+                        help="shared token shown in the GUI (default: $YTDLP_GUI_TOKEN)")
+    parser.add_argument('--output', default='.', help="download folder on this machine")
+    parser.add_argument('--slots', type=int, default=DEFAULT_SLOTS, help="downloads run at once")
+    parser.add_argument('--name', help="name shown in the coordinator's log")
+    parser.add_argument('--allow-arg', action='append', default=[], metavar='OPTION',
+                        help="custom yt-dlp option jobs may use, e.g. --allow-arg=--limit-rate (repeatable, default: none)")
+    args = parser.parse_args(argv)
+
+    host, _, port = args.coordinator.rpartition(':')
+    if not host or not port.isdigit():
+        parser.error("--coordinator must be host:port")
+    agent = Agent(host, int(port), args.token, args.output, max(1, args.slots), args.name,
+                  allowed_args=tuple(args.allow_arg))
+    try:
+        return 0 if agent.run_forever() else 1  # 1: refused by the coordinator
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
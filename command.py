@@ -1,6 +1,24 @@
 import os
+import re
 import subprocess
 from typing import List, Dict, Any
+from urllib.parse import urlsplit
+
+from extractors import get_index
+from layout import FLAT_TEMPLATE, resolve_template
+from library import INFO_FIELDS
+from rangedl import LAUNCHER_NAME, launcher_path
+from sponsorcut import CHAPTER_TITLE_TEMPLATE
+from urlnorm import canonicalize
+
+
+# yt-dlp prints the final path of every finished file with this prefix
+FILEPATH_MARKER = '[filepath] '
+# ...followed by a line of JSON metadata for the library index
+LIBRARY_INFO_MARKER = '[libinfo] '
+BREAK_EXIT_CODE = 101  # yt-dlp stopped at a --break-* condition
+
+_WHITESPACE_RE = re.compile(r'\s')
 
 
 class CommandBuilder:
@@ -37,9 +55,18 @@ class CommandBuilder:
         
         cmd = [self.ytdlp_cmd]
         
-        # Output path
-        output_path = os.path.join(options.get('output_path', '.'), '%(title)s.%(ext)s')
+        # Output path, or the job's scratch directory when finished files are moved afterwards
+        output_dir = options.get('scratch_path') or options.get('output_path', '.')
+        # The layout template may shard files into subdirectories (extractor/id prefix/...)
+        output_path = os.path.join(output_dir, resolve_template(options.get('output_template') or FLAT_TEMPLATE))
         cmd.extend(['-o', output_path])
+        if options.get('scratch_path'):
+            # Fragments and intermediate streams of merges go there too
+            cmd.extend(['-P', f"temp:{options['scratch_path']}"])
+        
+        # Shared cache of extractor artifacts (solved player signatures), managed by ytcache
+        if options.get('ytdlp_cache_dir'):
+            cmd.extend(['--cache-dir', options['ytdlp_cache_dir']])
         
         # Format selection
         if options.get('audio_only', False):
@@ -59,6 +86,12 @@ class CommandBuilder:
                 height = quality[:-1]
                 format_str = f"best[height<={height}]"
             
+            if options.get('format_pair'):
+                # Streams fetched beforehand by SplitStreamWorker, yt-dlp finds them and only merges
+                format_str = options['format_pair']
+                if options.get('format') in ('mp4', 'webm', 'mkv'):
+                    cmd.extend(['--merge-output-format', options['format']])
+            
             cmd.extend(['-f', format_str])
         
         # Subtitles
@@ -74,11 +107,36 @@ class CommandBuilder:
         # Playlist
         if not options.get('playlist', False):
             cmd.append('--no-playlist')
+        if options.get('playlist_items'):
+            # Process entries as they are listed so a break stops the walk early
+            cmd.extend(['--playlist-items', options['playlist_items'], '--lazy-playlist'])
+        
+        # Incremental syncs only fetch what is newer than the last one
+        if options.get('download_archive'):
+            cmd.extend(['--download-archive', options['download_archive']])
+            if options.get('break_on_existing'):
+                cmd.append('--break-on-existing')
+        if options.get('date_after'):
+            cmd.extend(['--dateafter', options['date_after'],
+                        '--break-match-filters', f"upload_date>=?{options['date_after']}"])
         
         # SponsorBlock
         if options.get('sponsorblock', False):
             categories = options.get('sponsor_categories', 'sponsor,selfpromo')
-            cmd.extend(['--sponsorblock-remove', categories])
+            if options.get('sponsorblock_mode') == 'mark':
+                # Cheap during download, the cut happens later in a batch
+                cmd.extend(['--sponsorblock-mark', categories,
+                            '--sponsorblock-chapter-title', CHAPTER_TITLE_TEMPLATE])
+            else:
+                cmd.extend(['--sponsorblock-remove', categories])
+            if options.get('sponsorblock_api'):
+                cmd.extend(['--sponsorblock-api', options['sponsorblock_api']])
+        
+        cmd.extend(self._transfer_args(options))
+        
+        # Report finished files (--print implies --quiet, keep the progress output)
+        cmd.extend(['--print', f'after_move:{FILEPATH_MARKER}%(filepath)s',
+                    '--print', f"after_move:{LIBRARY_INFO_MARKER}%(.{{{','.join(INFO_FIELDS)}}})j", '--no-quiet'])
         
         # Custom arguments
         custom_args = options.get('custom_args', '').strip()
@@ -88,6 +146,70 @@ class CommandBuilder:
         cmd.append(url)
         return cmd
     
+    def _transfer_args(self, options: Dict[str, Any]) -> List[str]:
+        """Downloader arguments shared by full downloads and single stream fetches"""
+        args = []
+        # Direct HTTP formats over several connections, fragmented ones keep the native downloader
+        connections = options.get('ranged_connections', 1)
+        if connections > 1:
+            args.extend(['--downloader', f'http:{launcher_path()}',
+                         '--downloader-args', f'{LAUNCHER_NAME}:-n {connections}'])
+        
+        # Fragmented formats (HLS/DASH) fetch this many fragments at once
+        fragments = options.get('concurrent_fragments', 1)
+        if fragments > 1:
+            args.extend(['--concurrent-fragments', str(fragments)])
+        return args
+    
+    def build_stream_command(self, options: Dict[str, Any], format_id: str) -> List[str]:
+        """Build a command fetching one format of a video+audio pair, named the way yt-dlp names merge inputs"""
+        url = options.get('url', '').strip()
+        if not url:
+            raise ValueError("URL is required")
+        
+        # <name>.f<format id>.<ext> next to where the merge happens, so the later merge run reuses it
+        output_dir = options.get('scratch_path') or options.get('output_path', '.')
+        template = resolve_template(options.get('output_template') or FLAT_TEMPLATE)
+        stem = template[:-len('.%(ext)s')]
+        cmd = [self.ytdlp_cmd, '-f', format_id,
+               '-o', os.path.join(output_dir, stem + '.f%(format_id)s.%(ext)s'),
+               '--no-playlist', '--newline']
+        if options.get('scratch_path'):
+            cmd.extend(['-P', f"temp:{options['scratch_path']}"])
+        if options.get('ytdlp_cache_dir'):
+            cmd.extend(['--cache-dir', options['ytdlp_cache_dir']])
+        cmd.extend(self._transfer_args(options))
+        
+        custom_args = options.get('custom_args', '').strip()
+        if custom_args:
+            cmd.extend(custom_args.split())
+        
+        cmd.append(url)
+        return cmd
+    
+    def build_live_command(self, options: Dict[str, Any]) -> List[str]:
+        """Build a command that writes a live stream to stdout, for livecapture to segment"""
+        url = options.get('url', '').strip()
+        if not url:
+            raise ValueError("URL is required")
+        
+        # A single muxed format, separate video and audio cannot be piped
+        format_str = 'best'
+        quality = options.get('quality', 'best')
+        if quality != "best" and quality.endswith('p'):
+            format_str = f"best[height<={quality[:-1]}]"
+        
+        cmd = [self.ytdlp_cmd, '-f', format_str, '-o', '-', '--no-part', '--no-playlist', '--newline']
+        if options.get('ytdlp_cache_dir'):
+            cmd.extend(['--cache-dir', options['ytdlp_cache_dir']])
+        
+        custom_args = options.get('custom_args', '').strip()
+        if custom_args:
+            cmd.extend(custom_args.split())
+        
+        cmd.append(url)
+        return cmd
+    
     def build_info_command(self, options: Dict[str, Any]) -> List[str]:
         """Build info command from options"""
         url = options.get('url', '').strip()
@@ -95,6 +217,9 @@ class CommandBuilder:
             raise ValueError("URL is required")
         
         cmd = [self.ytdlp_cmd, '--dump-json', '--no-download']
+        if options.get('ytdlp_cache_dir'):
+            # Get Info solves the same player code as the download that follows
+            cmd.extend(['--cache-dir', options['ytdlp_cache_dir']])
         
         # Custom arguments (if any apply to info gathering)
         custom_args = options.get('custom_args', '').strip()
@@ -107,7 +232,8 @@ class CommandBuilder:
             download_specific_args = {
                 '-o', '--output', '-f', '--format', '--extract-audio',
                 '--audio-format', '--audio-quality', '--write-subs',
-                '--embed-subs', '--write-thumbnail', '--sponsorblock-remove'
+                '--embed-subs', '--write-thumbnail', '--sponsorblock-remove',
+                '--sponsorblock-mark'
             }
             
             for i, arg in enumerate(args_list):
@@ -131,22 +257,27 @@ class CommandBuilder:
     
     def validate_url(self, url: str) -> bool:
         """Basic URL validation"""
-        if not url.strip():
+        url = url.strip()
+        if not url or _WHITESPACE_RE.search(url):
             return False
         
-        # Basic URL patterns
-        valid_patterns = [
-            'http://', 'https://',
-            'youtube.com', 'youtu.be',
-            'twitch.tv', 'twitter.com',
-            'instagram.com', 'tiktok.com'
-        ]
+        # Known sites are recognised by their media id
+        site, _ = canonicalize(url)
+        if site != 'url':
+            return True
         
-        url_lower = url.lower()
-        return any(pattern in url_lower for pattern in valid_patterns)
+        # Anything else is passed to yt-dlp as given, it only needs to be an http(s) URL with a host
+        try:
+            parts = urlsplit(url)
+            return parts.scheme.lower() in ('http', 'https') and bool(parts.hostname)
+        except ValueError:
+            return False
     
     def get_supported_sites(self) -> List[str]:
         """Get list of supported sites from yt-dlp"""
+        index = get_index()
+        if index:
+            return index.names
         try:
             result = subprocess.run([self.ytdlp_cmd, '--list-extractors'], 
                                   capture_output=True, text=True, timeout=15)
@@ -0,0 +1,272 @@
+import hashlib
+import os
+import sqlite3
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from paths import APP_DATA_DIR
+
+
+DEFAULT_INDEX_PATH = APP_DATA_DIR / "hashes.sqlite3"
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_MIN_SIZE = 1024 * 1024  # not worth linking tiny files (thumbnails, subs)
+DEFAULT_HASH_WORKERS = 4
+
+# Link modes
+MODE_HARDLINK = 'hardlink'
+MODE_REFLINK = 'reflink'
+MODE_AUTO = 'auto'  # reflink when the filesystem supports it, else hardlink
+
+FICLONE = 0x40049409  # Linux ioctl, btrfs/xfs/bcachefs copy-on-write clone
+
+
+def hash_file(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """BLAKE2b digest of a file, streamed through one reusable buffer"""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def reflink(source: str, target: str):
+    """Create target as a copy-on-write clone of source (Linux only)"""
+    if not sys.platform.startswith('linux'):
+        raise OSError("Reflinks are only supported on Linux")
+    import fcntl
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def replace_with_link(original: str, duplicate: str, mode: str = MODE_HARDLINK) -> str:
+    """Atomically replace duplicate with a link to original, returns the mode used"""
+    tmp_path = f"{duplicate}.dedup-tmp"
+    modes = [MODE_REFLINK, MODE_HARDLINK] if mode == MODE_AUTO else [mode]
+
+    last_error = None
+    for link_mode in modes:
+        try:
+            if link_mode == MODE_REFLINK:
+                reflink(original, tmp_path)
+                # Keep the duplicate's own timestamps on the clone
+                st = os.stat(duplicate)
+                os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            else:
+                os.link(original, tmp_path)
+            # Rename over the duplicate so it never disappears, even on a crash
+            os.replace(tmp_path, duplicate)
+            return link_mode
+        except OSError as e:
+            last_error = e
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    raise last_error
+
+
+class HashIndex:
+    """SQLite index of known files, their sizes and (lazily computed) digests"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_INDEX_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                digest TEXT
+            );
+            CREATE INDEX IF NOT EXISTS files_size ON files (size);
+            CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, path: str, st: os.stat_result, digest: Optional[str] = None):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, device, inode, digest) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino, digest))
+
+    def get(self, path: str) -> Optional[tuple]:
+        return self.conn.execute(
+            "SELECT path, size, mtime_ns, device, inode, digest FROM files WHERE path = ?",
+            (path,)).fetchone()
+
+    def set_digest(self, path: str, digest: str):
+        self.conn.execute("UPDATE files SET digest = ? WHERE path = ?", (digest, path))
+
+    def set_inode(self, path: str, st: os.stat_result):
+        self.conn.execute("UPDATE files SET mtime_ns = ?, device = ?, inode = ? WHERE path = ?",
+                          (st.st_mtime_ns, st.st_dev, st.st_ino, path))
+
+    def remove(self, path: str):
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def with_size(self, size: int) -> List[tuple]:
+        """All entries of the given size, oldest first"""
+        return self.conn.execute(
+            "SELECT path, size, mtime_ns, device, inode, digest FROM files "
+            "WHERE size = ? ORDER BY rowid", (size,)).fetchall()
+
+    def add_reclaimed(self, size: int):
+        self.conn.execute(
+            "INSERT INTO stats (key, value) VALUES ('reclaimed', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value", (size,))
+
+    def total_reclaimed(self) -> int:
+        row = self.conn.execute("SELECT value FROM stats WHERE key = 'reclaimed'").fetchone()
+        return row[0] if row else 0
+
+    def commit(self):
+        self.conn.commit()
+
+
+class DedupResult:
+    """Outcome of one deduplication pass"""
+
+    def __init__(self):
+        self.scanned = 0
+        self.hashed = 0
+        self.linked = []  # (duplicate, original, mode)
+        self.reclaimed = 0
+        self.errors = []
+
+
+class Deduplicator:
+    """Replaces byte-identical files with links to a single copy
+
+    Files are only hashed when another indexed file has the same size, so a
+    library with few duplicates costs little more than a stat() per file.
+    """
+
+    def __init__(self, index: HashIndex, mode: str = MODE_HARDLINK,
+                 min_size: int = DEFAULT_MIN_SIZE, workers: int = DEFAULT_HASH_WORKERS):
+        self.index = index
+        self.mode = mode
+        self.min_size = min_size
+        self.workers = workers
+
+    def _stat(self, path: str) -> Optional[os.stat_result]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode) or st.st_size < self.min_size:
+            return None
+        return st
+
+    def _fresh_entries(self, size: int) -> List[tuple]:
+        """Entries of a size whose files still exist unchanged, dropping stale ones"""
+        entries = []
+        for entry in self.index.with_size(size):
+            path, _, mtime_ns, _, _, _ = entry
+            st = self._stat(path)
+            if st is None or st.st_size != size:
+                self.index.remove(path)
+            elif st.st_mtime_ns != mtime_ns:
+                # Changed on disk, digest is no longer trustworthy
+                self.index.add(path, st)
+                entries.append((path, st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino, None))
+            else:
+                entries.append(entry)
+        return entries
+
+    def process(self, paths: Iterable[str]) -> DedupResult:
+        """Index new files and link any that duplicate an indexed file"""
+        result = DedupResult()
+
+        # Phase 1: index the new files (without hashing)
+        new_files = []
+        for path in paths:
+            path = os.path.abspath(path)
+            st = self._stat(path)
+            if st is None:
+                continue
+            result.scanned += 1
+            known = self.index.get(path)
+            if not known or known[2] != st.st_mtime_ns or known[4] != st.st_ino:
+                self.index.add(path, st)
+            new_files.append((path, st.st_size))
+
+        # Phase 2: hash everything that shares a size with another file, in parallel
+        groups: Dict[int, List[tuple]] = {}
+        for size in {size for _, size in new_files}:
+            entries = self._fresh_entries(size)
+            if len(entries) > 1:
+                groups[size] = entries
+
+        to_hash = [entry[0] for entries in groups.values() for entry in entries if not entry[5]]
+        digests = {}
+        if to_hash:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for path, digest in zip(to_hash, pool.map(self._safe_hash, to_hash)):
+                    if digest:
+                        digests[path] = digest
+                        self.index.set_digest(path, digest)
+                    else:
+                        result.errors.append(f"Could not hash {path}")
+            result.hashed = len(digests)
+
+        # Phase 3: link each new file to the oldest identical copy
+        for path, size in new_files:
+            entries = groups.get(size)
+            if not entries:
+                continue
+            by_path = {entry[0]: entry for entry in entries}
+            entry = by_path.get(path)
+            digest = digests.get(path) or (entry[5] if entry else None)
+            if not entry or not digest:
+                continue
+
+            for other in entries:
+                other_path, _, _, device, inode, other_digest = other
+                if other_path == path:
+                    # Only link to files indexed before this one
+                    break
+                other_digest = digests.get(other_path) or other_digest
+                if other_digest != digest or device != entry[3]:
+                    continue
+                if inode == entry[4]:
+                    break  # already the same file
+                try:
+                    mode = replace_with_link(other_path, path, self.mode)
+                except OSError as e:
+                    result.errors.append(f"Could not link {path}: {e}")
+                    break
+                self.index.set_inode(path, os.stat(path))
+                result.linked.append((path, other_path, mode))
+                result.reclaimed += size
+                break
+
+        if result.reclaimed:
+            self.index.add_reclaimed(result.reclaimed)
+        self.index.commit()
+        return result
+
+    @staticmethod
+    def _safe_hash(path: str) -> Optional[str]:
+        try:
+            return hash_file(path)
+        except OSError:
+            return None
@@ -1,18 +1,24 @@
-from typing import Dict, Any
+import json
 
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QHBoxLayout, QTabWidget, QTreeWidget, QTreeWidgetItem
-from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QHBoxLayout, QTabWidget, QTreeWidget, QTreeWidgetItem, QLabel
+from PySide6.QtGui import QFont, QPixmap
 from PySide6.QtCore import Qt
 
+from videoinfo import VideoInfo
+
 
 class VideoInfoDialog(QWidget):
     """Dialog for displaying detailed video information"""
     
-    def __init__(self, info: Dict[str, Any], parent=None):
+    def __init__(self, info: VideoInfo, parent=None, thumbnail_loader=None):
         super().__init__(parent)
         self.setWindowTitle("Video Information")
         self.setGeometry(200, 200, 800, 600)
         self.info = info
+        self.thumbnail_loader = thumbnail_loader
+        self.thumbnail_label = None
+        self.raw_text = None
+        self.raw_loaded = False
         self.setup_ui()
     
     def setup_ui(self):
@@ -30,9 +36,10 @@ class VideoInfoDialog(QWidget):
         formats_tab = self.create_formats_tab()
         tab_widget.addTab(formats_tab, "Formats")
         
-        # Raw data tab
+        # Raw data tab, filled in when first opened
         raw_tab = self.create_raw_tab()
-        tab_widget.addTab(raw_tab, "Raw Data")
+        self.raw_tab_index = tab_widget.addTab(raw_tab, "Raw Data")
+        tab_widget.currentChanged.connect(self.on_tab_changed)
         
         layout.addWidget(tab_widget)
         
@@ -53,6 +60,20 @@ class VideoInfoDialog(QWidget):
         widget = QWidget()
         layout = QVBoxLayout()
         
+        # Thumbnail (loaded asynchronously, shown when ready)
+        thumbnail_url = self.info.get('thumbnail')
+        if thumbnail_url and self.thumbnail_loader:
+            self.thumbnail_label = QLabel("Loading thumbnail...")
+            self.thumbnail_label.setAlignment(Qt.AlignCenter)
+            layout.addWidget(self.thumbnail_label)
+            
+            pixmap = self.thumbnail_loader.request(thumbnail_url)
+            if pixmap is not None:
+                self.thumbnail_label.setPixmap(pixmap)
+            else:
+                self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+                self.thumbnail_loader.thumbnail_failed.connect(self.on_thumbnail_failed)
+        
         info_text = QTextEdit()
         info_text.setReadOnly(True)
         info_text.setFont(QFont("Segoe UI", 10))
@@ -66,26 +87,47 @@ class VideoInfoDialog(QWidget):
         
         return widget
     
+    def on_thumbnail_ready(self, url: str, pixmap: QPixmap):
+        """Show the thumbnail once the loader has it"""
+        if self.thumbnail_label and url == self.info.get('thumbnail'):
+            self.thumbnail_label.setPixmap(pixmap)
+    
+    def on_thumbnail_failed(self, url: str, error: str):
+        """Hide the thumbnail placeholder if loading failed"""
+        if self.thumbnail_label and url == self.info.get('thumbnail'):
+            self.thumbnail_label.setVisible(False)
+    
+    def closeEvent(self, event):
+        """Disconnect from the shared thumbnail loader"""
+        if self.thumbnail_label and self.thumbnail_loader:
+            try:
+                self.thumbnail_loader.thumbnail_ready.disconnect(self.on_thumbnail_ready)
+                self.thumbnail_loader.thumbnail_failed.disconnect(self.on_thumbnail_failed)
+            except (RuntimeError, TypeError):
+                pass
+        super().closeEvent(event)
+    
     def create_formats_tab(self) -> QWidget:
         """Create formats information tab"""
         widget = QWidget()
         layout = QVBoxLayout()
         
-        if 'formats' in self.info:
+        if self.info.formats:
             tree = QTreeWidget()
             tree.setHeaderLabels(['Format ID', 'Extension', 'Resolution', 'FPS', 'Codec', 'Size', 'Note'])
             
-            for fmt in self.info['formats']:
-                item = QTreeWidgetItem([
-                    fmt.get('format_id', 'N/A'),
-                    fmt.get('ext', 'N/A'), 
-                    fmt.get('resolution', 'N/A'),
-                    str(fmt.get('fps', 'N/A')),
-                    fmt.get('vcodec', 'N/A') if fmt.get('vcodec') != 'none' else fmt.get('acodec', 'N/A'),
-                    self.format_filesize(fmt.get('filesize')),
-                    fmt.get('format_note', 'N/A')
-                ])
-                tree.addTopLevelItem(item)
+            items = []
+            for fmt in self.info.formats:
+                items.append(QTreeWidgetItem([
+                    fmt.format_id or 'N/A',
+                    fmt.ext or 'N/A',
+                    fmt.resolution or 'N/A',
+                    str(fmt.fps if fmt.fps is not None else 'N/A'),
+                    (fmt.vcodec or 'N/A') if fmt.vcodec != 'none' else (fmt.acodec or 'N/A'),
+                    self.format_filesize(fmt.filesize),
+                    fmt.format_note or 'N/A'
+                ]))
+            tree.addTopLevelItems(items)
             
             # Auto-resize columns
             for i in range(tree.columnCount()):
@@ -106,23 +148,28 @@ class VideoInfoDialog(QWidget):
         widget = QWidget()
         layout = QVBoxLayout()
         
-        raw_text = QTextEdit()
-        raw_text.setReadOnly(True)
-        raw_text.setFont(QFont("Consolas", 9))
+        self.raw_text = QTextEdit()
+        self.raw_text.setReadOnly(True)
+        self.raw_text.setFont(QFont("Consolas", 9))
+        self.raw_text.setPlainText("Loading...")
         
-        # Pretty print the raw JSON data
-        import json
-        try:
-            raw_str = json.dumps(self.info, indent=2, ensure_ascii=False)
-            raw_text.setPlainText(raw_str)
-        except Exception as e:
-            raw_text.setPlainText(f"Error formatting raw data: {e}")
-        
-        layout.addWidget(raw_text)
+        layout.addWidget(self.raw_text)
         widget.setLayout(layout)
         
         return widget
     
+    def on_tab_changed(self, index: int):
+        """Read the full info JSON back from disk the first time Raw Data is shown"""
+        if index != self.raw_tab_index or self.raw_loaded:
+            return
+        self.raw_loaded = True
+        # Pretty print the raw JSON data
+        try:
+            raw_str = json.dumps(self.info.raw(), indent=2, ensure_ascii=False)
+            self.raw_text.setPlainText(raw_str)
+        except Exception as e:
+            self.raw_text.setPlainText(f"Error formatting raw data: {e}")
+    
     def format_general_info(self) -> str:
         """Format general video information"""
         info_lines = []
@@ -0,0 +1,556 @@
+import importlib.metadata
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from paths import APP_CACHE_DIR
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+
+DEFAULT_INDEX_PATH = APP_CACHE_DIR / "extractors.json"
+INDEX_FORMAT = 2
+HOST_CACHE_SIZE = 4096
+
+# Extractors that accept any URL, yt-dlp only falls back to them
+GENERIC_EXTRACTORS = {'generic'}
+
+# (name, URL patterns, host keys, required literals)
+Entry = Tuple[str, List[str], Optional[List[str]], Optional[List[str]], bool]
+
+# Host of an http(s) URL, keeping www. since some patterns spell it out
+_HOST_RE = re.compile(r'^https?://(?:[^/?#@]*@)?([^/?#:]+)', re.IGNORECASE)
+_SCHEMES = ('http', 'https')
+
+# Stand-ins used when expanding a pattern into the strings it can match
+_WILDCARD = '\0'  # any run of characters
+_END = '\1'  # end of the URL
+_HOST_WILDCARD = '\2'  # any run of characters without a '/'
+_SETTLED = '\3'  # prefix whose host key is known
+_CHAR = '\5'  # one character, not ':' or '/'
+_HOST_CHAR = '\7'  # one character, not '/'
+_ANY_CHAR = '\6'  # one character
+_HOST_DELIMITERS = '/?#:' + _END
+MAX_EXPANSIONS = 8192
+MAX_FIXED_REPEAT = 16
+_SLASH = ord('/')
+_COLON = ord(':')
+_DOT = ord('.')
+_SAFE_CATEGORIES = {sre_constants.CATEGORY_DIGIT, sre_constants.CATEGORY_WORD, sre_constants.CATEGORY_SPACE}
+_SINGLE_CHAR_OPS = {sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.IN,
+                    sre_constants.ANY, sre_constants.CATEGORY}
+_REPEAT_OPS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT}
+
+
+def installed_version() -> Optional[str]:
+    """Version of the importable yt-dlp package, without importing it"""
+    try:
+        return importlib.metadata.version('yt-dlp')
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+class _Unkeyed(Exception):
+    """The pattern's host cannot be pinned down to fixed domain names"""
+
+
+def _class_excludes(av, code: int) -> bool:
+    """Whether an [...] set can never match the character"""
+    negate = bool(av) and av[0][0] == sre_constants.NEGATE
+    matched = False
+    for op, value in av[1:] if negate else av:
+        if op == sre_constants.LITERAL:
+            matched = value == code
+        elif op == sre_constants.RANGE:
+            matched = value[0] <= code <= value[1]
+        elif op == sre_constants.CATEGORY:
+            # ':', '/' and '.' are neither digits, word nor space characters
+            matched = value not in _SAFE_CATEGORIES
+        else:
+            matched = True
+        if matched:
+            break
+    return matched if negate else not matched
+
+
+def _char_excludes(op, av, code: int) -> bool:
+    if op == sre_constants.LITERAL:
+        return av != code
+    if op == sre_constants.NOT_LITERAL:
+        return av == code
+    if op == sre_constants.IN:
+        return _class_excludes(av, code)
+    if op == sre_constants.CATEGORY:
+        return av in _SAFE_CATEGORIES
+    return False
+
+
+def _host_safe(items) -> bool:
+    """Whether everything the items match stays clear of '/'"""
+    for op, av in items:
+        if op in _SINGLE_CHAR_OPS:
+            # [^.]+ is how patterns spell a subdomain label, take it as one
+            label = (op == sre_constants.NOT_LITERAL and av == _DOT) or \
+                (op == sre_constants.IN and av[0][0] == sre_constants.NEGATE and _class_excludes(av, _DOT))
+            if not label and not _char_excludes(op, av, _SLASH):
+                return False
+        elif op in _REPEAT_OPS:
+            if not _host_safe(av[2]):
+                return False
+        elif op == sre_constants.SUBPATTERN:
+            if not _host_safe(av[3]):
+                return False
+        elif op == sre_constants.BRANCH:
+            if not all(_host_safe(branch) for branch in av[1]):
+                return False
+        elif op == sre_constants.ATOMIC_GROUP:
+            if not _host_safe(av):
+                return False
+        elif op not in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return False
+    return True
+
+
+def _char_marker(op, av) -> str:
+    if not _host_safe([(op, av)]):
+        return _ANY_CHAR
+    return _CHAR if _char_excludes(op, av, _COLON) else _HOST_CHAR
+
+
+def _scheme_match(text: str, target: str, i: int = 0, j: int = 0) -> str:
+    """Match an expanded prefix against the start of a URL
+
+    Returns 'exact' or 'partial' when the prefix fits (all or part of the
+    target), 'overflow' when it fits but goes on past the target, 'mismatch'
+    when it cannot fit and 'ambiguous' when a wildcard could swallow anything.
+    """
+    if i == len(text):
+        return 'exact' if j == len(target) else 'partial'
+    if j == len(target):
+        return 'overflow'
+
+    char = text[i]
+    if char == _WILDCARD:
+        return 'ambiguous'
+    if char == _HOST_WILDCARD:
+        results = set()
+        for k in range(j, len(target) + 1):
+            results.add(_scheme_match(text, target, i + 1, k))
+            if k < len(target) and target[k] == '/':
+                break
+        for result in ('ambiguous', 'overflow', 'exact', 'partial'):
+            if result in results:
+                return result
+        return 'mismatch'
+    if char == _CHAR:
+        fits = target[j] not in ':/'
+    elif char == _HOST_CHAR:
+        fits = target[j] != '/'
+    elif char == _ANY_CHAR:
+        fits = True
+    else:
+        fits = char.lower() == target[j]
+    return _scheme_match(text, target, i + 1, j + 1) if fits else 'mismatch'
+
+
+def _settle(text: str) -> Optional[str]:
+    """Host key of an expanded prefix, or None if more of the pattern is needed
+
+    Returns '' when the prefix can never match an http(s) URL.
+    """
+    scheme_end = text.find('://')
+    if scheme_end == -1:
+        results = {_scheme_match(text, scheme + '://') for scheme in _SCHEMES}
+        if results & {'ambiguous', 'overflow', 'exact'}:
+            # Single character stand-ins took the place of '://'
+            raise _Unkeyed
+        return None if 'partial' in results else ''
+
+    results = {_scheme_match(text[:scheme_end], scheme) for scheme in _SCHEMES}
+    if 'ambiguous' in results:
+        raise _Unkeyed
+    if 'exact' not in results:
+        return ''  # rtmp://, lbry:// and the like
+
+    host = text[scheme_end + 3:]
+    for marker in (_CHAR, _HOST_CHAR):
+        host = host.replace(marker, _HOST_WILDCARD)
+    host = host.replace(_ANY_CHAR, _WILDCARD)
+    end = next((i for i, c in enumerate(host) if c in _HOST_DELIMITERS), -1)
+    if end == -1:
+        if _WILDCARD in host:
+            raise _Unkeyed
+        return None
+    host = host[:end]
+    if _WILDCARD in host:
+        raise _Unkeyed
+    if _HOST_WILDCARD in host:
+        # Only whole labels after the last (or before the first) wildcard are fixed
+        head, _, rest = host.partition(_HOST_WILDCARD)
+        tail = rest.rsplit(_HOST_WILDCARD, 1)[-1]
+        if '.' in tail and tail.split('.', 1)[1]:
+            host = tail.split('.', 1)[1]
+        elif '.' in head and not head.startswith('.'):
+            return head.rsplit('.', 1)[0].lower() + '.'  # a prefix key like 'amazon.'
+        else:
+            raise _Unkeyed
+    # '(?:www)?\.' leaves a leading dot on the bare domain
+    host = host[1:] if host.startswith('.') else host
+    if not host or host.startswith('.') or host.endswith('.'):
+        raise _Unkeyed
+    return host.lower()
+
+
+def _append(prefixes: Dict[str, Optional[str]], options: List[str]) -> Dict[str, Optional[str]]:
+    extended = {}
+    for text, key in prefixes.items():
+        if key is not None:
+            extended[text] = key
+            continue
+        for option in options:
+            extended_text = text + option
+            key = _settle(extended_text)
+            if key is not None:
+                # Settled prefixes only matter for their key
+                extended_text = _SETTLED + key
+            elif '://' in extended_text:
+                # Past the scheme, http:// and https:// expand the same way
+                extended_text = 'http' + extended_text[extended_text.index('://'):]
+            extended[extended_text] = key
+    if len(extended) > MAX_EXPANSIONS:
+        raise _Unkeyed
+    return extended
+
+
+def _merge(*alternatives: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    merged = {}
+    for prefixes in alternatives:
+        merged.update(prefixes)
+    if len(merged) > MAX_EXPANSIONS:
+        raise _Unkeyed
+    return merged
+
+
+def _expand(items, prefixes: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """Extend each unsettled prefix by everything the items can match"""
+    for op, av in items:
+        if all(key is not None for key in prefixes.values()):
+            break
+
+        if op == sre_constants.LITERAL:
+            prefixes = _append(prefixes, [chr(av)])
+        elif op == sre_constants.IN and len(av) <= 4 and all(o == sre_constants.LITERAL for o, _ in av):
+            # Keys are lowercase, so [yY] needs one expansion, not two
+            prefixes = _append(prefixes, sorted({chr(c).lower() for _, c in av}))
+        elif op == sre_constants.ANY:
+            # Nearly always an unescaped dot in a domain name
+            prefixes = _append(prefixes, ['.'])
+        elif op in _SINGLE_CHAR_OPS:
+            prefixes = _append(prefixes, [_char_marker(op, av)])
+        elif op == sre_constants.AT:
+            if av in (sre_constants.AT_END, sre_constants.AT_END_STRING):
+                prefixes = _append(prefixes, [_END])
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue
+        elif op == sre_constants.SUBPATTERN:
+            prefixes = _expand(av[3], prefixes)
+        elif op == sre_constants.ATOMIC_GROUP:
+            prefixes = _expand(av, prefixes)
+        elif op == sre_constants.BRANCH:
+            prefixes = _merge(*(_expand(branch, prefixes) for branch in av[1]))
+        elif op in _REPEAT_OPS:
+            prefixes = _expand_repeat(av, prefixes)
+        else:
+            # Back references and conditionals
+            prefixes = _append(prefixes, [_WILDCARD])
+    return prefixes
+
+
+def _expand_repeat(av, prefixes: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    low, high, body = av
+    if high == 0:
+        return prefixes
+    if (low, high) == (0, 1):
+        return _merge(prefixes, _expand(body, prefixes))
+
+    wildcard = _HOST_WILDCARD if _host_safe(body) else _WILDCARD
+    if len(body) == 1 and body[0][0] in _SINGLE_CHAR_OPS:
+        # Keep the minimum length of runs like [0-9A-Za-z_-]{11}, it rules out 'https:'
+        for _ in range(min(low, MAX_FIXED_REPEAT)):
+            prefixes = _expand(body, prefixes)
+        return prefixes if low == high else _append(prefixes, [wildcard])
+    if low == high and low <= 3:
+        for _ in range(low):
+            prefixes = _expand(body, prefixes)
+        return prefixes
+
+    if wildcard == _HOST_WILDCARD:
+        # Extra repetitions go in front, so a body ending in '.' keeps the label boundary
+        repeated = _expand(body, _append(prefixes, [wildcard]))
+    else:
+        # The first repetition decides where the host ends
+        repeated = _append(_expand(body, prefixes), [wildcard])
+    return _merge(prefixes, repeated) if low == 0 else repeated
+
+
+def host_keys(patterns: List[str]) -> Optional[List[str]]:
+    """Host names that an http(s) URL needs for any of the patterns to match
+
+    Each pattern is expanded into the URL prefixes it can match, far enough
+    to see the host. Keys are domain suffixes ('youtube.com') or, for hosts
+    like amazon.<tld>, prefixes ending in a dot ('amazon.'). Returns None
+    when some host is not spelled out literally, such patterns have to be
+    tried against every URL, and an empty list when none of them can match
+    an http(s) URL.
+    """
+    keys = set()
+    for pattern in patterns:
+        try:
+            prefixes = _expand(sre_parse.parse(pattern), {'': None})
+        except (_Unkeyed, re.error, RecursionError):
+            return None
+        for key in prefixes.values():
+            if key is None:
+                return None  # the pattern ended before the host did
+            if key:
+                keys.add(key)
+    return sorted(keys)
+
+
+def _required(items, ignore_case: bool) -> Optional[List[str]]:
+    """Strings of which a match must contain at least one, the most selective set found"""
+    best = None
+    run = []
+
+    def consider(candidates):
+        nonlocal best
+        if candidates and all(candidates):
+            score = (min(map(len, candidates)), -len(candidates))
+            if best is None or score > (min(map(len, best)), -len(best)):
+                best = candidates
+
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            run.append(chr(av).lower() if ignore_case else chr(av))
+            continue
+        if op == sre_constants.IN and all(o == sre_constants.LITERAL for o, _ in av) \
+                and len({chr(c).lower() for _, c in av}) == 1:
+            run.append(chr(av[0][1]).lower())  # [yY]
+            continue
+        if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue  # zero width, the literals around it stay adjacent
+
+        consider([''.join(run)])
+        run = []
+        if op == sre_constants.SUBPATTERN:
+            consider(_required(av[3], ignore_case or bool(av[1] & sre_constants.SRE_FLAG_IGNORECASE)))
+        elif op == sre_constants.ATOMIC_GROUP:
+            consider(_required(av, ignore_case))
+        elif op == sre_constants.BRANCH:
+            branches = [_required(branch, ignore_case) for branch in av[1]]
+            if all(branches):
+                consider(sorted({literal for branch in branches for literal in branch}))
+        elif op in _REPEAT_OPS and av[0] >= 1:
+            consider(_required(av[2], ignore_case))
+    consider([''.join(run)])
+    return best
+
+
+def required_literals(patterns: List[str]) -> Optional[List[str]]:
+    """Strings of which a matching URL contains at least one, None if there are none
+
+    Literals from case-insensitive parts are lowercase and have to be looked
+    for in the lowercased URL.
+    """
+    literals = set()
+    for pattern in patterns:
+        try:
+            parsed = sre_parse.parse(pattern)
+            required = _required(parsed, bool(parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE))
+        except (re.error, RecursionError):
+            return None
+        if not required:
+            return None
+        literals.update(required)
+    return sorted(literals)
+
+
+def build_entries() -> List[Entry]:
+    """(name, URL patterns, host keys, required literals, defers) of every yt-dlp extractor, in yt-dlp's order"""
+    from yt_dlp.extractor import gen_extractor_classes
+
+    entries = []
+    for extractor in gen_extractor_classes():
+        valid_url = getattr(extractor, '_VALID_URL', None)
+        if not valid_url:
+            continue
+        patterns = [valid_url] if isinstance(valid_url, str) else list(valid_url)
+        keys = host_keys(patterns)
+        # Extractors tried for every host at least need one of their literals in the URL
+        literals = required_literals(patterns) if keys is None else None
+        # A custom suitable() almost always hands some of its URLs to a more specific extractor
+        defers = any('suitable' in vars(cls) for cls in extractor.__mro__
+                     if cls.__name__ not in ('InfoExtractor', 'LazyLoadExtractor', 'object'))
+        entries.append((extractor.IE_NAME, patterns, keys, literals, defers))
+    return entries
+
+
+class ExtractorIndex:
+    """Offline URL -> extractor matcher built from yt-dlp's _VALID_URL patterns
+
+    Extractors are bucketed by the host names their patterns spell out, so a
+    URL is only tested against the extractors for its host plus the few whose
+    host is not literal. Candidates are tried in yt-dlp's own order, so the
+    first match is the extractor yt-dlp would pick. Extractors that override
+    suitable() usually hand some URLs on to a more specific one, so they only
+    win when no later candidate matches as well.
+    """
+
+    def __init__(self, version: str, entries: List[Entry]):
+        self.version = version
+        self.entries = entries
+        self._compiled: Dict[int, List[re.Pattern]] = {}
+        self._by_host: Dict[str, List[int]] = {}
+        self._unkeyed: List[int] = []
+        self._literals: Dict[int, List[str]] = {}
+        self._all: List[int] = []
+        self._host_candidates: Dict[str, List[int]] = {}
+
+        for position, (name, _, keys, literals, _) in enumerate(entries):
+            if name in GENERIC_EXTRACTORS:
+                continue
+            self._all.append(position)
+            if literals:
+                self._literals[position] = literals
+            if keys is None:
+                self._unkeyed.append(position)
+                continue
+            for key in keys:
+                self._by_host.setdefault(key, []).append(position)
+
+    @property
+    def names(self) -> List[str]:
+        return [entry[0] for entry in self.entries]
+
+    def _patterns(self, position: int) -> List[re.Pattern]:
+        compiled = self._compiled.get(position)
+        if compiled is None:
+            compiled = self._compiled[position] = [re.compile(p) for p in self.entries[position][1]]
+        return compiled
+
+    def candidates(self, url: str) -> List[int]:
+        """Positions of the extractors that could match a URL, in order"""
+        match = _HOST_RE.match(url)
+        if not match:
+            # Other schemes ('rtmp://', 'ytsearch:') are rare, scan everything
+            return self._all
+
+        host = match.group(1).lower()
+        positions = self._host_candidates.get(host)
+        if positions is None:
+            labels = host.split('.')
+            found = set(self._unkeyed)
+            for i in range(len(labels)):
+                found.update(self._by_host.get('.'.join(labels[i:]), ()))
+                if i:
+                    found.update(self._by_host.get('.'.join(labels[:i]) + '.', ()))
+            positions = sorted(found)
+            if len(self._host_candidates) >= HOST_CACHE_SIZE:
+                self._host_candidates.clear()
+            self._host_candidates[host] = positions
+        return positions
+
+    def match(self, url: str) -> Optional[str]:
+        """Name of the extractor yt-dlp would use for a URL, None if only the generic one"""
+        url = url.strip()
+        haystack = None
+        deferred = None
+        for position in self.candidates(url):
+            literals = self._literals.get(position)
+            if literals:
+                if haystack is None:
+                    haystack = f"{url}\n{url.lower()}"
+                if not any(literal in haystack for literal in literals):
+                    continue
+            if any(pattern.match(url) for pattern in self._patterns(position)):
+                name, _, _, _, defers = self.entries[position]
+                if not defers:
+                    return name
+                deferred = name
+        return deferred
+
+    def to_json(self) -> Dict:
+        return {'format': INDEX_FORMAT, 'version': self.version, 'extractors': self.entries}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'ExtractorIndex':
+        return cls(data['version'], [tuple(entry) for entry in data['extractors']])
+
+
+def load_index(path: Path = DEFAULT_INDEX_PATH, version: Optional[str] = None) -> Optional[ExtractorIndex]:
+    """Index for the installed yt-dlp, from the disk cache or rebuilt when the version changed
+
+    Returns None when yt-dlp cannot be imported (e.g. a standalone binary).
+    """
+    version = version or installed_version()
+    if not version:
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') == INDEX_FORMAT and data.get('version') == version:
+            return ExtractorIndex.from_json(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    try:
+        index = ExtractorIndex(version, build_entries())
+    except Exception:
+        return None
+
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index.to_json(), f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except OSError:
+        # Still usable, just rebuilt next time
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return index
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[ExtractorIndex]:
+    """Shared index, loaded on first use (safe to call from any thread)"""
+    global _index, _index_loaded
+    with _index_lock:
+        if not _index_loaded:
+            _index = load_index()
+            _index_loaded = True
+        return _index
+
+
+def match_extractor(url: str, wait: bool = True) -> Optional[str]:
+    """Extractor name for a URL, None if unknown or the index is unavailable
+
+    With wait=False this never loads the index, so it is safe on the GUI
+    thread and simply returns None until a background load has finished.
+    """
+    index = get_index() if wait or _index_loaded else None
+    return index.match(url) if index else None
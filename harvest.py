@@ -0,0 +1,326 @@
+import csv
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from urlnorm import canonicalize
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Output formats
+FORMAT_PARQUET = 'parquet'
+FORMAT_ARROW = 'arrow'
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+COLUMNAR_FORMATS = (FORMAT_PARQUET, FORMAT_ARROW)
+
+DEFAULT_WORKERS = 4
+BATCH_SIZE = 25  # URLs per yt-dlp process, amortizes its startup
+FLUSH_ROWS = 1000  # rows per written part / checkpoint step
+PER_URL_TIMEOUT = 60
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+# (column, arrow type name), in output order
+COLUMNS = [
+    ('url', 'string'),
+    ('id', 'string'),
+    ('extractor', 'string'),
+    ('title', 'string'),
+    ('uploader', 'string'),
+    ('channel_id', 'string'),
+    ('upload_date', 'string'),
+    ('timestamp', 'int64'),
+    ('duration', 'float64'),
+    ('view_count', 'int64'),
+    ('like_count', 'int64'),
+    ('comment_count', 'int64'),
+    ('age_limit', 'int64'),
+    ('is_live', 'bool'),
+    ('tags', 'list'),
+    ('categories', 'list'),
+    ('thumbnail', 'string'),
+    ('format_count', 'int64'),
+    ('formats', 'string'),  # compact JSON, see FORMAT_FIELDS
+    ('error', 'string'),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+# What is kept of each format, URLs, fragments and HTTP headers are dropped
+FORMAT_FIELDS = ('format_id', 'ext', 'protocol', 'width', 'height', 'fps', 'vcodec', 'acodec',
+                 'abr', 'vbr', 'tbr', 'asr', 'filesize', 'filesize_approx', 'dynamic_range', 'language')
+
+
+def default_format() -> str:
+    return FORMAT_PARQUET if pyarrow is not None else FORMAT_NDJSON
+
+
+def flatten_info(url: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """One output row from yt-dlp's info JSON, without the bulky parts"""
+    row = {name: info.get(name) for name in COLUMN_NAMES}
+    row['url'] = url
+    row['extractor'] = info.get('extractor_key') or info.get('extractor')
+    row['uploader'] = info.get('uploader') or info.get('channel')
+    formats = [{key: fmt[key] for key in FORMAT_FIELDS if fmt.get(key) is not None}
+               for fmt in info.get('formats') or []]
+    row['format_count'] = len(formats)
+    row['formats'] = json.dumps(formats, separators=(',', ':'))
+    row['error'] = None
+    for name, kind in COLUMNS:
+        value = row[name]
+        if value is None:
+            continue
+        # Extractors are loose with types, coerce so every batch has one schema
+        try:
+            if kind == 'int64':
+                row[name] = int(value)
+            elif kind == 'float64':
+                row[name] = float(value)
+            elif kind == 'bool':
+                row[name] = bool(value)
+            elif kind == 'list':
+                row[name] = [str(item) for item in value] if isinstance(value, list) else [str(value)]
+            else:
+                row[name] = str(value)
+        except (TypeError, ValueError):
+            row[name] = None
+    return row
+
+
+def error_row(url: str, error: str) -> Dict[str, Any]:
+    row = dict.fromkeys(COLUMN_NAMES)
+    row['url'] = url
+    row['error'] = error
+    return row
+
+
+class NdjsonWriter:
+    """Appends one JSON object per line"""
+
+    def __init__(self, path: Path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self.file.writelines(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n' for row in rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter:
+    """Appends CSV rows, list columns are stored as JSON"""
+
+    def __init__(self, path: Path):
+        new_file = not path.exists() or path.stat().st_size == 0
+        self.file = open(path, 'a', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMN_NAMES)
+        if new_file:
+            self.writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self.writer.writerow({key: json.dumps(value) if isinstance(value, list) else value
+                                  for key, value in row.items()})
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowPartWriter:
+    """Writes each flush as a new part file in a dataset directory
+
+    Parquet and Arrow IPC files cannot be appended to once closed, so a
+    resumed run adds parts instead. Readers load the directory as one table,
+    e.g. pyarrow.dataset.dataset(path) or pandas.read_parquet(path).
+    """
+
+    def __init__(self, path: Path, fmt: str):
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is required for Parquet and Arrow output")
+        self.path = path
+        self.fmt = fmt
+        self.extension = '.parquet' if fmt == FORMAT_PARQUET else '.arrow'
+        path.mkdir(parents=True, exist_ok=True)
+        self.part = len(list(path.glob(f'part-*{self.extension}')))
+        types = {'string': pyarrow.string(), 'int64': pyarrow.int64(), 'float64': pyarrow.float64(),
+                 'bool': pyarrow.bool_(), 'list': pyarrow.list_(pyarrow.string())}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        table = pyarrow.Table.from_pylist(rows, schema=self.schema)
+        final_path = self.path / f'part-{self.part:05d}{self.extension}'
+        tmp_path = final_path.with_suffix(self.extension + '.tmp')
+        if self.fmt == FORMAT_PARQUET:
+            pyarrow.parquet.write_table(table, str(tmp_path), compression='zstd')
+        else:
+            with pyarrow.ipc.new_file(str(tmp_path), self.schema) as writer:
+                writer.write_table(table)
+        # A part is either complete or absent, even after a crash
+        os.replace(tmp_path, final_path)
+        self.part += 1
+
+    def close(self):
+        pass
+
+
+def open_writer(path: Path, fmt: str):
+    if fmt in COLUMNAR_FORMATS:
+        return ArrowPartWriter(path, fmt)
+    if fmt == FORMAT_CSV:
+        return CsvWriter(path)
+    return NdjsonWriter(path)
+
+
+class Checkpoint:
+    """URLs harvested successfully, one per line, appended after each flush"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done = {line.rstrip('\n') for line in f if line.strip()}
+        except OSError:
+            pass
+
+    def add(self, urls: Iterable[str]):
+        urls = [url for url in urls if url not in self.done]
+        if not urls:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(url + '\n' for url in urls)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(urls)
+
+
+class Harvester:
+    """Extracts metadata for many URLs without downloading media
+
+    URLs are split into batches, each handled by one `yt-dlp -j` process, with
+    several processes running at once. Rows are written every FLUSH_ROWS
+    and only then recorded in the checkpoint, so an interrupted run resumes
+    where its last flush left off. Failed URLs are not checkpointed: their
+    error rows stay in the output and a resumed run tries them again.
+    """
+
+    def __init__(self, output: Path, fmt: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                 ytdlp_cmd: str = 'yt-dlp', extra_args: Optional[List[str]] = None):
+        self.output = Path(output)
+        self.fmt = fmt or default_format()
+        self.workers = workers
+        self.ytdlp_cmd = ytdlp_cmd
+        self.extra_args = extra_args or []
+        self.checkpoint = Checkpoint(Path(str(self.output) + CHECKPOINT_SUFFIX))
+        self._stopped = threading.Event()
+        self._processes = set()
+        self._processes_lock = threading.Lock()
+
+    def stop(self):
+        self._stopped.set()
+        with self._processes_lock:
+            for process in self._processes:
+                process.terminate()
+
+    def _extract(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """Rows for one batch, one per URL (failed ones carry an error)"""
+        cmd = [self.ytdlp_cmd, '--dump-json', '--skip-download', '--no-playlist', '--ignore-errors',
+               '--no-warnings', *self.extra_args, '--batch-file', '-']
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, text=True, encoding='utf-8')
+        with self._processes_lock:
+            self._processes.add(process)
+        try:
+            stdout, stderr = process.communicate('\n'.join(urls) + '\n', timeout=PER_URL_TIMEOUT * len(urls))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+        finally:
+            with self._processes_lock:
+                self._processes.discard(process)
+
+        rows = {}
+        for line in stdout.splitlines():
+            try:
+                info = json.loads(line)
+            except ValueError:
+                continue
+            url = info.get('original_url') or info.get('webpage_url')
+            if url in rows or url not in urls:
+                continue
+            rows[url] = flatten_info(url, info)
+
+        errors = [line for line in stderr.splitlines() if line.startswith('ERROR:')]
+        for url in urls:
+            if url not in rows:
+                # yt-dlp names the video id in its errors ("ERROR: [youtube] <id>: ..."), not the URL
+                site, media_id = canonicalize(url)
+                needle = url if site == 'url' else f"{media_id}:"
+                error = next((line for line in errors if needle in line or url in line),
+                             errors[0] if len(errors) == 1 else 'ERROR: extraction failed')
+                rows[url] = error_row(url, error)
+        return [rows[url] for url in urls]
+
+    def run(self, urls: Iterable[str],
+            progress: Optional[Callable[[int, int, int], None]] = None) -> Tuple[int, int]:
+        """Harvest all URLs not yet in the checkpoint, returns (rows written, failures)
+
+        progress is called with (done, total, failures) after every batch.
+        """
+        todo = list(dict.fromkeys(url for url in urls if url not in self.checkpoint.done))
+        batches = [todo[i:i + BATCH_SIZE] for i in range(0, len(todo), BATCH_SIZE)]
+        writer = open_writer(self.output, self.fmt)
+        written = failures = done = 0
+        pending_rows = []
+
+        def flush():
+            nonlocal written
+            if pending_rows:
+                writer.write(pending_rows)
+                # Failures may be transient (timeouts, 429), a resumed run retries them
+                self.checkpoint.add(row['url'] for row in pending_rows if not row['error'])
+                written += len(pending_rows)
+                pending_rows.clear()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                remaining = iter(batches)
+                running = set()
+                while True:
+                    # Only keep a few batches in flight so a stop does not wait on all of them
+                    while not self._stopped.is_set() and len(running) < self.workers:
+                        batch = next(remaining, None)
+                        if batch is None:
+                            break
+                        running.add(pool.submit(self._extract, batch))
+                    if not running:
+                        break
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        rows = future.result()
+                        if self._stopped.is_set():
+                            continue  # terminated mid-batch, its rows are incomplete
+                        done += len(rows)
+                        failures += sum(1 for row in rows if row['error'])
+                        pending_rows.extend(rows)
+                    if len(pending_rows) >= FLUSH_ROWS:
+                        flush()
+                    if progress:
+                        progress(done, len(todo), failures)
+            flush()
+        finally:
+            writer.close()
+        return written, failures
\ No newline at end of file
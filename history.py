@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from paths import APP_DATA_DIR
+from scheduler import format_bytes
+
+
+DEFAULT_HISTORY_PATH = APP_DATA_DIR / "history.sqlite3"
+FETCH_BATCH_SIZE = 256
+
+
+class HistoryRecord:
+    """One completed job, kept small since the view may hold many of them"""
+
+    __slots__ = ('record_id', 'url', 'title', 'size', 'duration', 'status', 'added_at', 'finished_at')
+
+    def __init__(self, record_id: Optional[int], url: str, title: str, size: Optional[int],
+                 duration: Optional[float], status: str, added_at: float, finished_at: float):
+        self.record_id = record_id
+        self.url = url
+        self.title = title
+        self.size = size
+        self.duration = duration
+        self.status = status
+        self.added_at = added_at
+        self.finished_at = finished_at
+
+    def __repr__(self):
+        return f"HistoryRecord({self.record_id}, {self.status}, {self.url!r})"
+
+
+class HistoryStore:
+    """SQLite log of finished, failed and cancelled jobs, read back newest first"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_HISTORY_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                size INTEGER,
+                duration REAL,
+                status TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                finished_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def add(self, record: HistoryRecord) -> HistoryRecord:
+        """Persist a record, filling in its id"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO history (url, title, size, duration, status, added_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (record.url, record.title, record.size, record.duration, record.status,
+                 record.added_at, record.finished_at))
+            self.conn.commit()
+        record.record_id = cursor.lastrowid
+        return record
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def page(self, before_id: Optional[int] = None, limit: int = FETCH_BATCH_SIZE) -> List[HistoryRecord]:
+        """Up to `limit` records older than before_id (newest first), one index seek per page"""
+        with self._lock:
+            if before_id is None:
+                rows = self.conn.execute(
+                    "SELECT id, url, title, size, duration, status, added_at, finished_at "
+                    "FROM history ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT id, url, title, size, duration, status, added_at, finished_at "
+                    "FROM history WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit)).fetchall()
+        # Few distinct statuses, share one string object for each
+        return [HistoryRecord(row[0], row[1], row[2], row[3], row[4], sys.intern(row[5]), row[6], row[7])
+                for row in rows]
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM history")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def record_from_job(job) -> HistoryRecord:
+    """History record for a DownloadJob that will not run again"""
+    size = 0
+    for path in job.files:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    duration = job.info.get('duration') if job.info else None
+    # Jobs keep monotonic times, convert them to wall clock for display
+    now = time.time()
+    offset = now - time.monotonic()
+    finished_at = job.finished_at + offset if job.finished_at else now
+    return HistoryRecord(None, job.url, job.title, size or job.estimated_size, duration,
+                         job.status, job.added_at + offset, finished_at)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if not seconds:
+        return ''
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class HistoryModel(QAbstractTableModel):
+    """Table over a HistoryStore that loads rows in batches as the view scrolls
+
+    Only the rows scrolled into so far are held in memory, so opening a
+    history of any length costs one COUNT and one page.
+    """
+
+    COLUMNS = ['Title', 'Status', 'Size', 'Duration', 'Finished']
+
+    def __init__(self, store: HistoryStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._rows: List[HistoryRecord] = []
+        self._total = store.count()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        record = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return record.title
+            if column == 1:
+                return record.status
+            if column == 2:
+                return format_bytes(record.size) if record.size else ''
+            if column == 3:
+                return format_duration(record.duration)
+            if column == 4:
+                return time.strftime('%Y-%m-%d %H:%M', time.localtime(record.finished_at))
+        elif role == Qt.ToolTipRole:
+            return record.url
+        elif role == Qt.UserRole:
+            return record
+        return None
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and len(self._rows) < self._total
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if parent.isValid():
+            return
+        before_id = self._rows[-1].record_id if self._rows else None
+        records = self.store.page(before_id)
+        if not records:
+            # Rows were removed behind our back, stop asking
+            self._total = len(self._rows)
+            return
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(records) - 1)
+        self._rows.extend(records)
+        self.endInsertRows()
+
+    def add(self, record: HistoryRecord):
+        """Persist a new record and show it at the top"""
+        self.store.add(record)
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._rows.insert(0, record)
+        self._total += 1
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self._rows = []
+        self._total = 0
+        self.endResetModel()
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""Output layout templates and migration of existing downloads into them
+
+    python layout.py ~/Downloads --preset sharded            # move a flat library, resumable
+    python layout.py ~/Downloads --template "%(uploader)s/%(id)s.%(ext)s" --dry-run
+
+The migration first writes its plan to SOURCE/.layout-migration.json and
+then records every finished move in SOURCE/.layout-migration.done, so an
+interrupted run continues where it stopped when started again.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from library import SIDECAR_EXTENSIONS, LibraryIndex
+from quota import LibraryQuota
+from scratch import IN_PROGRESS_MARKERS, move_file
+
+
+FLAT_TEMPLATE = '%(title)s.%(ext)s'
+LAYOUT_PRESETS = {
+    'flat': FLAT_TEMPLATE,
+    # A few hundred entries per directory even at millions of files, ids never collide
+    'sharded': '%(extractor)s/%(id).2s/%(id)s.%(ext)s',
+    'sharded-titled': '%(extractor)s/%(id).2s/%(id)s - %(title).100B.%(ext)s',
+}
+DEFAULT_JOBS = 8
+PLAN_NAME = '.layout-migration.json'
+DONE_NAME = '.layout-migration.done'
+NA_PLACEHOLDER = 'NA'  # what yt-dlp writes for missing fields
+
+# The subset of yt-dlp's output template syntax the presets use: %(field)[flags][width][.precision]type
+_FIELD_RE = re.compile(r'%%|%\((\w+)\)([-0 #+]*\d*(?:\.\d+)?)([sdB])')
+# yt-dlp replaces characters Windows does not allow in names with look-alikes
+_FILENAME_TABLE = str.maketrans({'/': '⧸', '\\': '⧹', ':': '：', '*': '＊', '?': '？',
+                                 '"': '＂', '<': '＜', '>': '＞', '|': '｜'})
+_CONTROL_RE = re.compile(r'[\x00-\x1f\x7f]')
+
+
+def resolve_template(template: str) -> str:
+    """A preset name or template, checked to stay inside the download folder"""
+    template = LAYOUT_PRESETS.get(template, template).strip()
+    if not template:
+        return FLAT_TEMPLATE
+    parts = re.split(r'[\\/]', template)
+    if os.path.isabs(template) or os.pardir in parts or not template.endswith('.%(ext)s'):
+        raise ValueError(f"Output layout must be a relative path ending in .%(ext)s: {template}")
+    return template
+
+
+def _sanitize(value: str) -> str:
+    value = _CONTROL_RE.sub('', value.translate(_FILENAME_TABLE)).strip()
+    # Names cannot end in a dot or space on Windows
+    return value.rstrip('. ') or '_'
+
+
+def render(template: str, info: Dict[str, Any]) -> str:
+    """The relative path yt-dlp would write for info, for the fields and conversions above"""
+    def field(match):
+        if match.group(0) == '%%':
+            return '%'
+        name, spec, kind = match.groups()
+        value = info.get(name)
+        if value is None or value == '':
+            return NA_PLACEHOLDER
+        if kind == 'B':
+            # Precision in bytes of UTF-8, so long titles stay within file name limits
+            width, _, precision = spec.partition('.')
+            text = str(value)
+            if precision:
+                text = text.encode('utf-8')[:int(precision)].decode('utf-8', 'ignore')
+            return _sanitize(('%' + width + 's') % text)
+        try:
+            return _sanitize(('%' + spec + kind) % (int(value) if kind == 'd' else str(value)))
+        except (TypeError, ValueError):
+            return NA_PLACEHOLDER
+
+    # Separators in the template make directories, the same characters inside values do not
+    return os.path.join(*(_FIELD_RE.sub(field, part) for part in re.split(r'[\\/]', template)))
+
+
+def _is_media(name: str) -> bool:
+    return (not name.startswith('.') and not name.endswith(SIDECAR_EXTENSIONS)
+            and not any(marker in name for marker in IN_PROGRESS_MARKERS))
+
+
+def _read_metadata(directory: str, name: str, library: Optional[LibraryIndex]) -> Optional[Dict[str, Any]]:
+    """Metadata of a media file from its .info.json, else from the library index"""
+    stem, ext = os.path.splitext(name)
+    info = None
+    try:
+        with open(os.path.join(directory, stem + '.info.json'), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        if library is not None:
+            info = library.get(os.path.join(directory, name))
+    if not info or not info.get('id'):
+        return None
+    info = dict(info)
+    if not info.get('extractor') and info.get('extractor_key'):
+        info['extractor'] = info['extractor_key'].lower()
+    info['ext'] = ext[1:]  # after post-processing, not the ext of the downloaded format
+    return info
+
+
+def plan_migration(source: str, template: str, destination: Optional[str] = None,
+                   library: Optional[LibraryIndex] = None) -> Dict[str, Any]:
+    """Where every media file directly inside source and its sidecars go
+
+    Files without an .info.json or a library entry cannot be placed and
+    are listed under 'unknown'.
+    """
+    source = os.path.abspath(source)
+    destination = os.path.abspath(destination or source)
+    names = sorted(entry.name for entry in os.scandir(source) if entry.is_file())
+    media = [name for name in names if _is_media(name)]
+    media_set = set(media)
+    # Longest stems first, so "a.b.mp4" keeps "a.b.en.vtt" from "a.mp4"
+    claimed = set()
+    sidecars = {}
+    for name in sorted(media, key=lambda name: -len(os.path.splitext(name)[0])):
+        stem = os.path.splitext(name)[0]
+        sidecars[name] = [other for other in names
+                          if other not in media_set and other not in claimed and other.startswith(stem + '.')
+                          and not any(marker in other[len(stem):] for marker in IN_PROGRESS_MARKERS)]
+        claimed.update(sidecars[name])
+
+    entries, unknown, targets = [], [], set()
+    for name in media:
+        info = _read_metadata(source, name, library)
+        if info is None:
+            unknown.append(name)
+            continue
+        relative = render(template, info)
+        dst = os.path.join(destination, relative)
+        base, ext = os.path.splitext(dst)
+        n = 1
+        while dst in targets or (os.path.exists(dst) and dst != os.path.join(source, name)):
+            dst = f"{base} ({n}){ext}"
+            n += 1
+        targets.add(dst)
+        # name.en.vtt -> <new name>.en.vtt
+        stem_length = len(os.path.splitext(name)[0])
+        new_stem = os.path.splitext(dst)[0]
+        entries.append({'src': os.path.join(source, name), 'dst': dst,
+                        'sidecars': [[os.path.join(source, other), new_stem + other[stem_length:]]
+                                     for other in sidecars[name]]})
+    return {'template': template, 'source': source, 'destination': destination,
+            'entries': entries, 'unknown': unknown}
+
+
+def _move(src: str, dst: str) -> bool:
+    """Move one file, tolerating a move an earlier run already made"""
+    if src == dst:
+        return False
+    if not os.path.exists(src):
+        if os.path.exists(dst):
+            return False
+        raise FileNotFoundError(src)
+    move_file(src, dst)
+    return True
+
+
+class LayoutMigration:
+    """Moves the files of a plan in parallel and records each finished entry for resuming"""
+
+    def __init__(self, plan: Dict[str, Any], jobs: int = DEFAULT_JOBS, library: Optional[LibraryIndex] = None,
+                 quota: Optional[LibraryQuota] = None):
+        self.plan = plan
+        self.jobs = max(1, jobs)
+        self.library = library
+        self.quota = quota  # LibraryQuota whose tracked paths follow the moves
+        self.plan_path = os.path.join(plan['source'], PLAN_NAME)
+        self.done_path = os.path.join(plan['source'], DONE_NAME)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def resume(cls, source: str, jobs: int = DEFAULT_JOBS, library: Optional[LibraryIndex] = None,
+               quota: Optional[LibraryQuota] = None) -> Optional['LayoutMigration']:
+        """The interrupted migration of source, if there is one"""
+        try:
+            with open(os.path.join(source, PLAN_NAME), 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(plan, jobs, library, quota)
+
+    def save_plan(self):
+        tmp_path = self.plan_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.plan, f)
+        os.replace(tmp_path, self.plan_path)
+
+    def done_entries(self) -> set:
+        try:
+            with open(self.done_path, 'r', encoding='utf-8') as f:
+                return {int(line) for line in f if line.strip().isdigit()}
+        except OSError:
+            return set()
+
+    def _move_entry(self, index: int, done_file) -> int:
+        entry = self.plan['entries'][index]
+        moved = int(_move(entry['src'], entry['dst']))
+        for src, dst in entry['sidecars']:
+            try:
+                moved += _move(src, dst)
+            except FileNotFoundError:
+                pass  # removed by the user in the meantime
+        with self._lock:
+            done_file.write(f"{index}\n")
+            done_file.flush()
+        return moved
+
+    def run(self, progress=None) -> Dict[str, int]:
+        """Move every entry not done yet, returns counts of moved, skipped and failed entries"""
+        if not os.path.exists(self.plan_path):
+            self.save_plan()
+        done = self.done_entries()
+        pending = [i for i in range(len(self.plan['entries'])) if i not in done]
+        counts = {'moved': 0, 'skipped': len(done), 'failed': 0}
+        with open(self.done_path, 'a', encoding='utf-8') as done_file, \
+                ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {pool.submit(self._move_entry, index, done_file): index for index in pending}
+            for count, future in enumerate(as_completed(futures), 1):
+                entry = self.plan['entries'][futures[future]]
+                try:
+                    future.result()
+                    counts['moved'] += 1
+                    if self.library is not None:
+                        self.library.move(entry['src'], entry['dst'], commit=False)
+                    if self.quota is not None:
+                        self.quota.move(entry['src'], entry['dst'], commit=False)
+                except OSError as e:
+                    counts['failed'] += 1
+                    if progress:
+                        progress(f"Failed to move {entry['src']}: {e}")
+                if progress and count % 1000 == 0:
+                    progress(f"{count}/{len(pending)} moved")
+        if self.library is not None:
+            self.library.commit()
+        if self.quota is not None:
+            self.quota.commit()
+        if counts['failed'] == 0:
+            # Finished, a later run plans from scratch
+            for path in (self.plan_path, self.done_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Move downloaded files into an output layout")
+    parser.add_argument('source', help="directory holding the downloads to move (not searched recursively)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--preset', choices=list(LAYOUT_PRESETS), default='sharded')
+    group.add_argument('--template', help="yt-dlp style template relative to the destination")
+    parser.add_argument('--dest', help="root of the new layout (default: source)")
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="files moved in parallel")
+    parser.add_argument('--dry-run', action='store_true', help="print the plan without moving anything")
+    parser.add_argument('--no-library', action='store_true', help="do not update paths in the library index and quota")
+    args = parser.parse_args(argv)
+
+    library = None if args.no_library else LibraryIndex()
+    quota = None if args.no_library else LibraryQuota()
+    migration = LayoutMigration.resume(args.source, args.jobs, library, quota)
+    if migration is not None:
+        print(f"Resuming migration to {migration.plan['template']}")
+    else:
+        try:
+            template = resolve_template(args.template or args.preset)
+        except ValueError as e:
+            parser.error(str(e))
+        plan = plan_migration(args.source, template, args.dest, library)
+        migration = LayoutMigration(plan, args.jobs, library, quota)
+        for name in plan['unknown']:
+            print(f"No metadata, left in place: {name}")
+
+    if args.dry_run:
+        for entry in migration.plan['entries']:
+            print(f"{entry['src']} -> {entry['dst']}")
+        return 0
+    counts = migration.run(print)
+    print(f"{counts['moved']} moved, {counts['skipped']} already done, {counts['failed']} failed")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
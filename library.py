@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from paths import APP_DATA_DIR
+
+
+DEFAULT_LIBRARY_PATH = APP_DATA_DIR / "library.sqlite3"
+DEFAULT_SEARCH_LIMIT = 200
+RANK_MAX_MATCHES = 5000  # broader queries list the newest matches instead of ranking them all
+SUBTITLE_EXTENSIONS = ('.vtt', '.srt')
+# Files that belong to a media file rather than being one
+SIDECAR_EXTENSIONS = ('.json', '.description', '.jpg', '.jpeg', '.png', '.webp', '.ass', '.lrc',
+                      '.moving') + SUBTITLE_EXTENSIONS
+MAX_SUBTITLE_CHARS = 200_000
+
+# Fields yt-dlp prints for each finished file (see command.LIBRARY_INFO_MARKER)
+INFO_FIELDS = ('id', 'title', 'uploader', 'channel', 'description', 'tags', 'categories',
+               'webpage_url', 'extractor_key', 'duration', 'upload_date')
+
+# Column weights for bm25(), in FTS column order
+_RANK_WEIGHTS = (10.0, 4.0, 1.0, 3.0, 0.5)
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_CUE_TIMING_RE = re.compile(r'^(?:\d+|WEBVTT.*|NOTE.*|[\d:.,]+ --> [\d:.,]+.*)$')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def subtitle_text(path: str) -> str:
+    """Spoken text of a .vtt/.srt file, without cue numbers, timings or markup"""
+    lines = []
+    previous = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or _CUE_TIMING_RE.match(line):
+                continue
+            line = _TAG_RE.sub('', line)
+            # Auto-generated captions repeat each line in the next cue
+            if line != previous:
+                lines.append(line)
+                previous = line
+    return ' '.join(lines)[:MAX_SUBTITLE_CHARS]
+
+
+def find_subtitles(media_path: str) -> List[str]:
+    """Subtitle files written next to a media file (name.<lang>.vtt)"""
+    directory, filename = os.path.split(media_path)
+    stem = os.path.splitext(filename)[0]
+    try:
+        names = os.listdir(directory or '.')
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names
+            if name.startswith(stem + '.') and name.endswith(SUBTITLE_EXTENSIONS)]
+
+
+def build_query(text: str) -> Optional[str]:
+    """FTS5 query matching all words, the last one as a prefix so results follow typing"""
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    # Quoted tokens can't be mistaken for FTS5 operators (AND, NEAR, column:)
+    terms = [f'"{token}"' for token in tokens]
+    if len(tokens[-1]) >= 2:
+        # Prefixes of 2+ characters are served by the prefix index, 1 would scan every term
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class LibraryIndex:
+    """SQLite FTS5 index over the metadata (and optionally subtitles) of downloaded files"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_LIBRARY_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                url TEXT,
+                video_id TEXT,
+                extractor TEXT,
+                title TEXT,
+                uploader TEXT,
+                duration REAL,
+                upload_date TEXT,
+                indexed_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                title, uploader, description, tags, subtitles,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            );
+        """)
+        self.conn.commit()
+
+    def add(self, path: str, info: Dict[str, Any], subtitles: str = '', commit: bool = True):
+        """Index one file, replacing any earlier entry for the same path"""
+        path = os.path.abspath(path)
+        title = info.get('title') or os.path.basename(path)
+        uploader = info.get('uploader') or info.get('channel') or ''
+        tags = ' '.join(str(tag) for tag in (info.get('tags') or []) + (info.get('categories') or []))
+        with self._lock:
+            row = self.conn.execute("SELECT id FROM items WHERE path = ?", (path,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM items_fts WHERE rowid = ?", (row[0],))
+            cursor = self.conn.execute(
+                "INSERT OR REPLACE INTO items (id, path, url, video_id, extractor, title, uploader, "
+                "duration, upload_date, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row[0] if row else None, path, info.get('webpage_url'), info.get('id'),
+                 info.get('extractor_key'), title, uploader, info.get('duration'),
+                 info.get('upload_date'), time.time()))
+            self.conn.execute(
+                "INSERT INTO items_fts (rowid, title, uploader, description, tags, subtitles) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cursor.lastrowid, title, uploader, info.get('description') or '', tags, subtitles))
+            if commit:
+                self.conn.commit()
+
+    def add_file(self, path: str, info: Dict[str, Any], with_subtitles: bool = False, commit: bool = True):
+        """Index a finished download, reading subtitle files next to it if asked"""
+        subtitles = ''
+        if with_subtitles:
+            texts = []
+            for subtitle_path in find_subtitles(path):
+                try:
+                    texts.append(subtitle_text(subtitle_path))
+                except OSError:
+                    pass
+            subtitles = ' '.join(texts)
+        self.add(path, info, subtitles, commit)
+
+    def remove(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self.conn.execute("SELECT id FROM items WHERE path = ?", (path,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM items_fts WHERE rowid = ?", (row[0],))
+                self.conn.execute("DELETE FROM items WHERE id = ?", (row[0],))
+                self.conn.commit()
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """The indexed metadata of one file, in info dict keys"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, video_id, extractor, title, uploader, duration, upload_date FROM items WHERE path = ?",
+                (os.path.abspath(path),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('webpage_url', 'id', 'extractor_key', 'title', 'uploader', 'duration', 'upload_date'), row))
+
+    def move(self, old_path: str, new_path: str, commit: bool = True):
+        """Follow a file that was moved or renamed, replacing any entry already at new_path"""
+        old_path, new_path = os.path.abspath(old_path), os.path.abspath(new_path)
+        if old_path == new_path:
+            return
+        with self._lock:
+            # items_fts has no trigger, the entry being replaced is dropped from it by hand
+            row = self.conn.execute("SELECT id FROM items WHERE path = ?", (new_path,)).fetchone()
+            if row and self.conn.execute("SELECT 1 FROM items WHERE path = ?", (old_path,)).fetchone():
+                self.conn.execute("DELETE FROM items_fts WHERE rowid = ?", (row[0],))
+                self.conn.execute("DELETE FROM items WHERE id = ?", (row[0],))
+            self.conn.execute("UPDATE items SET path = ? WHERE path = ?", (new_path, old_path))
+            if commit:
+                self.conn.commit()
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def search(self, text: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Tuple[str, str, str, Optional[float]]]:
+        """(path, title, uploader, duration) of the best matches, best first
+
+        Ranking has to score every match, so a query matching more than
+        RANK_MAX_MATCHES items (one or two letters typed so far) returns the
+        most recently indexed matches instead.
+        """
+        query = build_query(text)
+        if query is None:
+            return []
+        with self._lock:
+            matches = self.conn.execute("SELECT COUNT(*) FROM items_fts WHERE items_fts MATCH ?",
+                                        (query,)).fetchone()[0]
+            if matches > RANK_MAX_MATCHES:
+                order = "items_fts.rowid DESC"
+            else:
+                order = f"bm25(items_fts, {', '.join(str(weight) for weight in _RANK_WEIGHTS)})"
+            return self.conn.execute(
+                f"SELECT items.path, items.title, items.uploader, items.duration FROM "
+                f"(SELECT rowid FROM items_fts WHERE items_fts MATCH ? ORDER BY {order} LIMIT ?) AS hits "
+                f"JOIN items ON items.id = hits.rowid", (query, limit)).fetchall()
+
+    def scan(self, directory: str, with_subtitles: bool = False) -> int:
+        """Index files that have a yt-dlp .info.json next to them, returns the number added"""
+        added = 0
+        for root, _, files in os.walk(directory):
+            # name.info.json sits next to name.<ext>
+            media_by_stem = {os.path.splitext(name)[0]: name for name in files
+                             if not name.endswith(('.part', '.ytdl') + SIDECAR_EXTENSIONS)}
+            for name in files:
+                if not name.endswith('.info.json'):
+                    continue
+                media = media_by_stem.get(name[:-len('.info.json')])
+                if media is None:
+                    continue
+                try:
+                    with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+                        info = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                self.add_file(os.path.join(root, media), {key: info.get(key) for key in INFO_FIELDS},
+                              with_subtitles, commit=False)
+                added += 1
+        with self._lock:
+            self.conn.commit()
+        return added
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,224 @@
+import csv
+import hashlib
+import io
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from urlnorm import canonicalize
+
+DEFAULT_SEGMENT_SECONDS = 600
+DEFAULT_WINDOW_SECONDS = 6 * 3600
+SEGMENT_EXTENSION = 'ts'  # MPEG-TS needs no trailer, a segment cut short still plays
+FINALIZE_TIMEOUT = 30  # seconds ffmpeg gets to close its segment after the input ends
+POLL_INTERVAL = 1.0
+
+_UNSAFE_RE = re.compile(r'[^\w.-]+')
+
+
+def capture_prefix(url: str) -> str:
+    """File name prefix of a capture's segments, the same across restarts"""
+    site, media_id = canonicalize(url)
+    if site == 'url':
+        # A whole URL makes a poor file name, a short hash of it is just as stable
+        site, media_id = 'live', hashlib.sha1(media_id.encode('utf-8')).hexdigest()[:12]
+    return _UNSAFE_RE.sub('_', f"{site}-{media_id}").strip('_')[:80]
+
+
+def ffmpeg_segment_command(output_dir: str, prefix: str, segment_seconds: int, list_path: str,
+                           ffmpeg: str = 'ffmpeg') -> List[str]:
+    """ffmpeg reading the stream from stdin and cutting it into time-stamped segments"""
+    pattern = os.path.join(output_dir, f"{prefix}-%Y%m%d-%H%M%S.{SEGMENT_EXTENSION}")
+    return [ffmpeg, '-hide_banner', '-loglevel', 'warning', '-y',
+            '-i', 'pipe:0', '-map', '0:v?', '-map', '0:a?', '-c', 'copy',
+            '-f', 'segment', '-segment_time', str(segment_seconds), '-segment_format', 'mpegts',
+            '-reset_timestamps', '1', '-strftime', '1',
+            # One line per closed segment: name,start,end
+            '-segment_list', list_path, '-segment_list_type', 'csv',
+            pattern]
+
+
+class SegmentWindow:
+    """Closed segments of a capture, oldest first, trimmed to a time window and a size cap"""
+
+    def __init__(self, window_seconds: float, max_bytes: int = 0):
+        self.window_seconds = window_seconds
+        self.max_bytes = max_bytes  # 0 means no size cap
+        self.segments = deque()  # (path, seconds, bytes)
+        self.total_seconds = 0.0
+        self.total_bytes = 0
+
+    def add(self, path: str, seconds: float):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self.segments.append((path, seconds, size))
+        self.total_seconds += seconds
+        self.total_bytes += size
+
+    def evict(self) -> List[str]:
+        """Delete the oldest segments not needed to cover the window, returns their paths"""
+        evicted = []
+        while len(self.segments) > 1:
+            path, seconds, size = self.segments[0]
+            over_time = self.total_seconds - seconds >= self.window_seconds
+            over_size = self.max_bytes and self.total_bytes > self.max_bytes
+            if not (over_time or over_size):
+                break
+            self.segments.popleft()
+            self.total_seconds -= seconds
+            self.total_bytes -= size
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # in use by a player, it stays on disk but out of the window
+            evicted.append(path)
+        return evicted
+
+
+class LiveCapture:
+    """Pipes a live stream from yt-dlp into ffmpeg's segment muxer and keeps a rolling window
+
+    yt-dlp writes the stream to stdout, ffmpeg copies it into segments of
+    segment_seconds. Each segment closed by ffmpeg is added to the window,
+    which deletes the oldest ones beyond window_seconds or max_bytes. The
+    newest segment is still being written and not counted, so disk use can
+    exceed the window by one segment.
+
+    stop() ends yt-dlp only. ffmpeg then reads to the end of its input and
+    closes the current segment normally, so stopping never leaves a
+    damaged file behind.
+    """
+
+    def __init__(self, ytdlp_command: List[str], output_dir: str, prefix: str,
+                 segment_seconds: int = DEFAULT_SEGMENT_SECONDS, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                 max_bytes: int = 0, ffmpeg: str = 'ffmpeg'):
+        self.ytdlp_command = ytdlp_command
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.segment_seconds = segment_seconds
+        self.window = SegmentWindow(window_seconds, max_bytes)
+        self.ffmpeg = ffmpeg
+        self._stopped = threading.Event()
+        self._ytdlp = None
+        self._list_path = None
+        self._list_offset = 0
+
+    def _adopt_existing(self):
+        """Segments left by earlier runs of this capture count towards its window"""
+        pattern = re.compile(re.escape(self.prefix) + r'-\d{8}-\d{6}\.' + SEGMENT_EXTENSION + '$')
+        for name in sorted(os.listdir(self.output_dir)):
+            if pattern.match(name):
+                self.window.add(os.path.join(self.output_dir, name), self.segment_seconds)
+
+    def _read_closed_segments(self) -> List[Tuple[str, float]]:
+        """Segments ffmpeg has closed since the last call"""
+        try:
+            with open(self._list_path, 'rb') as f:
+                f.seek(self._list_offset)
+                data = f.read()
+        except OSError:
+            return []
+        # Only complete lines, ffmpeg may be halfway through writing one
+        end = data.rfind(b'\n') + 1
+        self._list_offset += end
+        closed = []
+        for row in csv.reader(data[:end].decode('utf-8', 'replace').splitlines()):
+            if len(row) >= 3:
+                try:
+                    seconds = float(row[2]) - float(row[1])
+                except ValueError:
+                    seconds = self.segment_seconds
+                closed.append((os.path.join(self.output_dir, os.path.basename(row[0])), seconds))
+        return closed
+
+    def _update_window(self, on_output: Callable[[str], None]):
+        for path, seconds in self._read_closed_segments():
+            self.window.add(path, seconds)
+            on_output(f"[live] Closed segment {os.path.basename(path)} ({seconds:.0f}s)")
+        evicted = self.window.evict()
+        if evicted:
+            on_output(f"[live] Removed {len(evicted)} old segment(s), keeping {len(self.window.segments)} "
+                      f"({self.window.total_seconds / 3600:.1f} h, {self.window.total_bytes / 1024 ** 3:.2f} GiB)")
+
+    @staticmethod
+    def _pump(stream, on_output: Callable[[str], None]):
+        for line in iter(stream.readline, ''):
+            line = line.strip()
+            if line:
+                on_output(line)
+        stream.close()
+
+    def run(self, on_output: Callable[[str], None]) -> Tuple[Optional[int], Optional[int]]:
+        """Capture until the stream ends or stop() is called, returns (yt-dlp, ffmpeg) exit codes"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._adopt_existing()
+        self._list_path = os.path.join(self.output_dir,
+                                       f".{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}.segments.csv")
+        self._list_offset = 0
+
+        self._ytdlp = subprocess.Popen(self.ytdlp_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            ffmpeg = subprocess.Popen(
+                ffmpeg_segment_command(self.output_dir, self.prefix, self.segment_seconds, self._list_path,
+                                       self.ffmpeg),
+                stdin=self._ytdlp.stdout, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        except OSError:
+            self._ytdlp.kill()
+            self._ytdlp.wait()
+            raise
+        # ffmpeg holds the only read end, so it sees EOF as soon as yt-dlp exits
+        self._ytdlp.stdout.close()
+        if self._stopped.is_set():
+            self._ytdlp.terminate()
+
+        # stdout carries the stream as bytes, only stderr is text
+        ytdlp_stderr = io.TextIOWrapper(self._ytdlp.stderr, encoding='utf-8', errors='replace')
+        pumps = [threading.Thread(target=self._pump, args=(ytdlp_stderr, on_output), daemon=True),
+                 threading.Thread(target=self._pump, args=(ffmpeg.stderr, on_output), daemon=True)]
+        for pump in pumps:
+            pump.start()
+
+        try:
+            while ffmpeg.poll() is None:
+                if self._ytdlp.poll() is not None:
+                    try:
+                        ffmpeg.wait(FINALIZE_TIMEOUT)
+                    except subprocess.TimeoutExpired:
+                        on_output("[live] ffmpeg did not finish the last segment in time, stopping it")
+                        ffmpeg.kill()
+                    break
+                try:
+                    self._ytdlp.wait(POLL_INTERVAL)
+                except subprocess.TimeoutExpired:
+                    pass
+                self._update_window(on_output)
+        finally:
+            if self._ytdlp.poll() is None:
+                self._ytdlp.terminate()
+            self._ytdlp.wait()
+            ffmpeg.wait()
+            for pump in pumps:
+                pump.join(5)
+        self._update_window(on_output)
+        try:
+            os.unlink(self._list_path)
+        except OSError:
+            pass
+        return self._ytdlp.returncode, ffmpeg.returncode
+
+    def stop(self):
+        """End the capture, keeping every segment recorded so far"""
+        self._stopped.set()
+        if self._ytdlp and self._ytdlp.poll() is None:
+            try:
+                self._ytdlp.terminate()
+            except OSError:
+                pass
\ No newline at end of file
@@ -1,13 +1,25 @@
 import sys
 from pathlib import Path
 
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon
-
-from app import YtDlpGUI
+import singleinstance
 
 def main():
     """Main application entry point"""
+    # URLs passed by a browser integration or the command line, anything else is for Qt
+    urls = [arg for arg in sys.argv[1:] if '://' in arg]
+    
+    # Hand the URLs to a running instance and exit before loading Qt
+    instance = singleinstance.acquire()
+    if instance is None:
+        if singleinstance.forward(urls):
+            sys.exit(0)
+        print("Another instance holds the lock but does not answer, starting anyway", file=sys.stderr)
+    
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+    
+    from app import YtDlpGUI
+    
     app = QApplication(sys.argv)
     app.setApplicationName("yt-dlp GUI")
     app.setApplicationVersion("1.0.0")
@@ -21,7 +33,15 @@ def main():
     window = YtDlpGUI()
     window.show()
     
-    sys.exit(app.exec())
+    if instance is not None:
+        instance.serve(window.urls_received.emit)
+    if urls:
+        window.receive_urls(urls)
+    
+    status = app.exec()
+    if instance is not None:
+        instance.close()
+    sys.exit(status)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,6 @@
+from pathlib import Path
+
+
+# Per-user locations for caches (safe to delete) and data (indexes, history)
+APP_CACHE_DIR = Path.home() / ".cache" / "ytdlp-gui"
+APP_DATA_DIR = Path.home() / ".local" / "share" / "ytdlp-gui"
@@ -0,0 +1,237 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from library import SIDECAR_EXTENSIONS
+from paths import APP_DATA_DIR
+
+
+DEFAULT_QUOTA_PATH = APP_DATA_DIR / "quota.sqlite3"
+
+
+def find_sidecars(media_path: str) -> List[str]:
+    """Files yt-dlp wrote next to a media file, removed together with it"""
+    directory, filename = os.path.split(media_path)
+    stem = os.path.splitext(filename)[0]
+    try:
+        names = os.listdir(directory or '.')
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names
+            if name != filename and name.startswith(stem + '.') and name.endswith(SIDECAR_EXTENSIONS)]
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+class LibraryQuota:
+    """Byte quota over downloaded files, enforced by removing the least recently used ones
+
+    Every finished download is recorded with its size (sidecars included)
+    and the last time it was opened from the app. The file's atime counts
+    too when the file system keeps it, so files played outside the app are
+    not the first to go. Pinned files are never removed.
+
+    The scheduler asks check() before starting a job and gets the files
+    that have to go for the job to fit; the space they free is credited to
+    the disk space check, and they are only removed once the job starts.
+    A scheduling pass is wrapped in begin_pass()/end_pass(), so the files
+    are read and stat()ed once per pass rather than once per queued job.
+    """
+
+    def __init__(self, max_bytes: int = 0, db_path: Optional[Path] = None, library=None):
+        self.max_bytes = max_bytes
+        self.db_path = Path(db_path) if db_path else DEFAULT_QUOTA_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.library = library  # LibraryIndex whose entries are dropped with evicted files
+        self._reserved = {}  # job id -> bytes promised to a running job
+        self._pass = None  # (used, pinned bytes, candidates) while a scheduling pass is running
+        self._in_pass = False
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL,
+                pinned INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def add(self, path: str):
+        """Track a finished download, keeping its pin if it was downloaded before"""
+        path = os.path.abspath(path)
+        size = _file_size(path) + sum(_file_size(sidecar) for sidecar in find_sidecars(path))
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO files (path, size, accessed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, accessed_at = excluded.accessed_at",
+                (path, size, time.time()))
+            self.conn.commit()
+
+    def touch(self, path: str):
+        """Record that a file was opened"""
+        with self._lock:
+            self.conn.execute("UPDATE files SET accessed_at = ? WHERE path = ?", (time.time(), os.path.abspath(path)))
+            self.conn.commit()
+
+    def move(self, old_path: str, new_path: str, commit: bool = True):
+        """Follow a file that was moved or renamed, keeping its size, last access and pin"""
+        with self._lock:
+            self.conn.execute("UPDATE OR REPLACE files SET path = ? WHERE path = ?",
+                              (os.path.abspath(new_path), os.path.abspath(old_path)))
+            if commit:
+                self.conn.commit()
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def set_pinned(self, path: str, pinned: bool):
+        """Pin a file (tracking it if needed) or unpin it"""
+        path = os.path.abspath(path)
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO files (path, size, accessed_at, pinned) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET pinned = excluded.pinned",
+                (path, _file_size(path), time.time(), int(pinned)))
+            self.conn.commit()
+
+    def pinned_paths(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT path FROM files WHERE pinned")}
+
+    def used(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    def pinned_bytes(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM files WHERE pinned").fetchone()[0]
+
+    def reserve(self, job_id: str, size: Optional[int]):
+        self._reserved[job_id] = size or 0
+
+    def release(self, job_id: str):
+        self._reserved.pop(job_id, None)
+
+    def reserved(self) -> int:
+        return sum(self._reserved.values())
+
+    def _candidates(self) -> List[Tuple[float, str, int]]:
+        """(last access, path, size) of unpinned files, least recently used first; forgets vanished files"""
+        with self._lock:
+            rows = self.conn.execute("SELECT path, size, accessed_at FROM files WHERE NOT pinned").fetchall()
+        candidates, gone = [], []
+        for path, size, accessed_at in rows:
+            try:
+                atime = os.stat(path).st_atime
+            except OSError:
+                gone.append((path,))
+                continue
+            candidates.append((max(accessed_at, atime), path, size))
+        if gone:
+            with self._lock:
+                self.conn.executemany("DELETE FROM files WHERE path = ?", gone)
+                self.conn.commit()
+        candidates.sort()
+        return candidates
+
+    def begin_pass(self):
+        self._in_pass = True
+        self._pass = None
+
+    def end_pass(self):
+        self._in_pass = False
+        self._pass = None
+
+    def _state(self) -> Tuple[int, int, List[Tuple[float, str, int]]]:
+        """(used, pinned bytes, candidates), read once per pass"""
+        if self._pass is not None:
+            return self._pass
+        candidates = self._candidates()
+        with self._lock:
+            used, pinned = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COALESCE(SUM(CASE WHEN pinned THEN size END), 0) FROM files").fetchone()
+        state = (used, pinned, candidates)
+        if self._in_pass:
+            self._pass = state
+        return state
+
+    def check(self, size: Optional[int]) -> Tuple[str, List[str]]:
+        """Check if a download of size bytes fits in the quota
+
+        Returns (decision, victims): decision is 'ok' with the files to remove
+        first, 'defer' (fits once running jobs are done) or 'refuse' (larger
+        than what is not pinned).
+        """
+        size = size or 0
+        used, pinned, candidates = self._state()
+        if size + pinned > self.max_bytes:
+            return 'refuse', []
+        over = used + self.reserved() + size - self.max_bytes
+        victims = []
+        for _, path, file_size in candidates:
+            if over <= 0:
+                break
+            victims.append(path)
+            over -= file_size
+        return ('defer', []) if over > 0 else ('ok', victims)
+
+    @staticmethod
+    def reclaimable(victims: List[str], device: int) -> int:
+        """Bytes removing victims frees on device, hard links to other files (dedup) free nothing"""
+        freed = 0
+        for path in victims:
+            for file_path in [path] + find_sidecars(path):
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                if stat.st_dev == device and stat.st_nlink <= 1:
+                    freed += stat.st_size
+        return freed
+
+    def evict(self, victims: List[str]) -> List[Tuple[str, int]]:
+        """Remove victims and their sidecars, returns (path, bytes) of each removed file"""
+        removed = []
+        for path in victims:
+            freed = 0
+            in_use = False
+            for file_path in find_sidecars(path) + [path]:
+                size = _file_size(file_path)
+                try:
+                    os.unlink(file_path)
+                except FileNotFoundError:
+                    continue
+                except OSError:
+                    in_use = True
+                    break
+                freed += size
+            if in_use:
+                continue  # open in a player on Windows, stays tracked and is tried again next time
+            with self._lock:
+                self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                self.conn.commit()
+            if self.library is not None:
+                self.library.remove(path)
+            if self._pass is not None:
+                # Keep the pass's view in step for the jobs checked after this one
+                used, pinned, candidates = self._pass
+                size = next((size for _, candidate, size in candidates if candidate == path), 0)
+                self._pass = (used - size, pinned, [entry for entry in candidates if entry[1] != path])
+            removed.append((path, freed))
+        return removed
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
\ No newline at end of file
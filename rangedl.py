@@ -0,0 +1,375 @@
+import argparse
+import http.client
+import json
+import os
+import queue
+import shlex
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from paths import APP_DATA_DIR
+
+
+# yt-dlp picks its external downloader class from the executable's name, so
+# the launcher is called 'axel' and takes axel's arguments: -o FILE, -H HEADER,
+# -n CONNECTIONS, -- URL
+LAUNCHER_NAME = 'axel'
+DEFAULT_LAUNCHER_DIR = APP_DATA_DIR / "bin"
+VERSION = 'rangedl 1.0 (axel compatible)'
+
+DEFAULT_CONNECTIONS = 4
+MAX_CONNECTIONS = 16
+CHUNK_SIZE = 4 * 1024 * 1024
+MIN_SPLIT_SIZE = 2 * 1024 * 1024  # smaller files are not worth more than one connection
+READ_SIZE = 256 * 1024
+RETRIES = 5
+TIMEOUT = 30
+PROGRESS_INTERVAL = 0.5
+RANGE_MAP_SUFFIX = '.ranges'
+USER_AGENT = 'Mozilla/5.0 (yt-dlp-gui rangedl)'
+
+
+class DownloadError(Exception):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RangeMap:
+    """Completed chunks of a preallocated file, saved next to it for resuming"""
+
+    def __init__(self, path: str, url: str, size: int, chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.chunk_size = chunk_size
+        self.done = set()
+        self._lock = threading.Lock()
+
+    @property
+    def chunk_count(self) -> int:
+        return (self.size + self.chunk_size - 1) // self.chunk_size
+
+    def chunk_bounds(self, index: int) -> Tuple[int, int]:
+        """First and last byte of a chunk, inclusive like an HTTP Range"""
+        start = index * self.chunk_size
+        return start, min(self.size, start + self.chunk_size) - 1
+
+    def missing(self) -> List[int]:
+        return [index for index in range(self.chunk_count) if index not in self.done]
+
+    def completed_bytes(self) -> int:
+        return sum(end - start + 1 for start, end in map(self.chunk_bounds, self.done))
+
+    @classmethod
+    def load(cls, path: str, url: str, size: int) -> Optional['RangeMap']:
+        """Saved map for the same size, None if there is none or it does not fit"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data['size'] != size:
+                return None
+            range_map = cls(path, url, size, data['chunk_size'])
+            range_map.done = {index for index in data['done'] if 0 <= index < range_map.chunk_count}
+            return range_map
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def mark_done(self, index: int):
+        with self._lock:
+            self.done.add(index)
+            data = {'url': self.url, 'size': self.size, 'chunk_size': self.chunk_size,
+                    'done': sorted(self.done)}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _open_connection(url: str) -> Tuple[http.client.HTTPConnection, str]:
+    """Keep-alive connection to a URL's server and the request target to use on it"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme == 'https':
+        connection = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=TIMEOUT)
+    elif parts.scheme == 'http':
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=TIMEOUT)
+    else:
+        raise DownloadError(f"Unsupported URL scheme: {parts.scheme}")
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    return connection, target
+
+
+def probe(url: str, headers: Dict[str, str]) -> Tuple[str, Optional[int], bool]:
+    """Final URL after redirects, total size and whether byte ranges are served"""
+    request = urllib.request.Request(url, headers={**headers, 'Range': 'bytes=0-0'})
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            final_url = response.geturl()
+            if response.status == 206:
+                # Content-Range: bytes 0-0/12345
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                return final_url, int(total) if total.isdigit() else None, total.isdigit()
+            length = response.headers.get('Content-Length')
+            return final_url, int(length) if length and length.isdigit() else None, False
+    except urllib.error.HTTPError as e:
+        if e.code == 416:
+            # Empty file
+            return url, 0, False
+        raise DownloadError(f"HTTP Error {e.code}: {e.reason}") from e
+    except (urllib.error.URLError, OSError) as e:
+        raise DownloadError(str(e)) from e
+
+
+def _preallocate(path: str, size: int, resume: bool):
+    """Create the output at full size so every range can be written at its offset"""
+    mode = 'r+b' if resume and os.path.exists(path) else 'wb'
+    with open(path, mode) as f:
+        f.truncate(size)
+        if hasattr(os, 'posix_fallocate') and size:
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+            except OSError:
+                pass  # not supported by the filesystem, the sparse file still works
+
+
+class RangedDownloader:
+    """Downloads one file over several keep-alive connections, one byte range at a time
+
+    The file is preallocated and each chunk is written at its own offset, so
+    chunks can finish in any order. Finished chunks are recorded in a range
+    map next to the file, and a rerun only fetches the missing ones.
+    """
+
+    def __init__(self, url: str, output: str, headers: Optional[Dict[str, str]] = None,
+                 connections: int = DEFAULT_CONNECTIONS, chunk_size: int = CHUNK_SIZE,
+                 progress: Optional[Callable[[int, Optional[int], float], None]] = None):
+        self.url = url
+        self.output = output
+        self.headers = {'User-Agent': USER_AGENT, **(headers or {})}
+        # Ranges of a compressed body are meaningless
+        self.headers['Accept-Encoding'] = 'identity'
+        self.connections = max(1, min(connections, MAX_CONNECTIONS))
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.downloaded = 0
+        self._downloaded_lock = threading.Lock()
+        self._error = None
+        self._failed = threading.Event()
+
+    def _add_progress(self, count: int):
+        with self._downloaded_lock:
+            self.downloaded += count
+
+    def run(self):
+        final_url, size, ranges = probe(self.url, self.headers)
+        if not ranges or size is None or size < MIN_SPLIT_SIZE or self.connections == 1:
+            self._single(final_url, size)
+            return
+
+        map_path = self.output + RANGE_MAP_SUFFIX
+        range_map = RangeMap.load(map_path, final_url, size) if os.path.exists(self.output) else None
+        _preallocate(self.output, size, resume=range_map is not None)
+        if range_map is None:
+            range_map = RangeMap(map_path, final_url, size, self.chunk_size)
+        self.downloaded = range_map.completed_bytes()
+
+        pending = queue.Queue()
+        for index in range_map.missing():
+            pending.put(index)
+
+        workers = [threading.Thread(target=self._worker, args=(final_url, range_map, pending),
+                                    name=f'rangedl-{i}', daemon=True)
+                   for i in range(min(self.connections, pending.qsize()))]
+        for worker in workers:
+            worker.start()
+        self._report_until_done(workers, size)
+
+        if self._error:
+            raise self._error
+        range_map.remove()
+
+    def _report_until_done(self, workers: List[threading.Thread], size: Optional[int]):
+        started = time.monotonic()
+        initial = self.downloaded
+        while True:
+            alive = [worker for worker in workers if worker.is_alive()]
+            if not alive:
+                break
+            alive[0].join(PROGRESS_INTERVAL)
+            if self.progress:
+                elapsed = time.monotonic() - started
+                self.progress(self.downloaded, size, (self.downloaded - initial) / elapsed if elapsed else 0)
+
+    def _fetch_chunk(self, connection: http.client.HTTPConnection, target: str, f, start: int, end: int) -> int:
+        """Write bytes start..end at their offset, returns the number written"""
+        connection.request('GET', target, headers={**self.headers, 'Range': f'bytes={start}-{end}'})
+        response = connection.getresponse()
+        if response.status != 206:
+            response.read()
+            # A 200 means the server stopped honouring ranges, retrying will not help
+            retryable = response.status >= 500 or response.status == 429
+            raise DownloadError(f"HTTP Error {response.status} for bytes {start}-{end}", retryable)
+
+        written = 0
+        f.seek(start)
+        try:
+            while True:
+                data = response.read(READ_SIZE)
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+                self._add_progress(len(data))
+            if written != end - start + 1:
+                raise http.client.IncompleteRead(b'', end - start + 1 - written)
+        except BaseException:
+            self._add_progress(-written)
+            raise
+        if response.will_close:
+            connection.close()
+        return written
+
+    def _worker(self, url: str, range_map: RangeMap, pending: queue.Queue):
+        connection, target = _open_connection(url)
+        try:
+            with open(self.output, 'r+b') as f:
+                while not self._failed.is_set():
+                    try:
+                        index = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    start, end = range_map.chunk_bounds(index)
+
+                    for attempt in range(RETRIES):
+                        try:
+                            # http.client reconnects by itself once a connection was closed
+                            self._fetch_chunk(connection, target, f, start, end)
+                            break
+                        except (OSError, http.client.HTTPException, DownloadError) as e:
+                            connection.close()
+                            error = e if isinstance(e, DownloadError) else DownloadError(str(e), True)
+                            if not error.retryable or attempt == RETRIES - 1 or self._failed.is_set():
+                                self._error = error
+                                self._failed.set()
+                                return
+                            time.sleep(min(2 ** attempt, 10))
+                    f.flush()
+                    range_map.mark_done(index)
+        except OSError as e:
+            self._error = DownloadError(str(e))
+            self._failed.set()
+        finally:
+            connection.close()
+
+    def _single(self, url: str, size: Optional[int]):
+        """Plain sequential download, for servers without byte ranges and small files"""
+        result = {}
+
+        def fetch():
+            try:
+                request = urllib.request.Request(url, headers=self.headers)
+                with urllib.request.urlopen(request, timeout=TIMEOUT) as response, open(self.output, 'wb') as f:
+                    while True:
+                        data = response.read(READ_SIZE)
+                        if not data:
+                            break
+                        f.write(data)
+                        self._add_progress(len(data))
+            except (urllib.error.URLError, OSError, http.client.HTTPException) as e:
+                result['error'] = DownloadError(str(e))
+
+        self.downloaded = 0
+        worker = threading.Thread(target=fetch, name='rangedl-0', daemon=True)
+        worker.start()
+        self._report_until_done([worker], size)
+        if 'error' in result:
+            raise result['error']
+
+
+def _format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024 or unit == 'GiB':
+            return f"{size:.2f}{unit}"
+        size /= 1024
+    return f"{size:.2f}GiB"
+
+
+def print_progress(downloaded: int, total: Optional[int], speed: float):
+    """Progress in yt-dlp's '[download]  45.2% of ...' form, which the GUI parses"""
+    if total:
+        print(f"[download] {downloaded * 100 / total:5.1f}% of {_format_size(total)} "
+              f"at {_format_size(speed)}/s", flush=True)
+    else:
+        print(f"[download] {_format_size(downloaded)} at {_format_size(speed)}/s", flush=True)
+
+
+def launcher_path(directory: Path = DEFAULT_LAUNCHER_DIR) -> str:
+    """Path of an executable 'axel' that runs this module, written on first use
+
+    Pass it to yt-dlp as --downloader http:PATH so direct HTTP formats use
+    the ranged downloader while fragmented ones keep the native one.
+    """
+    module = os.path.abspath(__file__)
+    if sys.platform == 'win32':
+        path = directory / f"{LAUNCHER_NAME}.cmd"
+        script = f'@"{sys.executable}" "{module}" %*\r\n'
+    else:
+        path = directory / LAUNCHER_NAME
+        script = f"#!/bin/sh\nexec {shlex.quote(sys.executable)} {shlex.quote(module)} \"$@\"\n"
+
+    try:
+        if path.read_text(encoding='utf-8') == script:
+            return str(path)
+    except OSError:
+        pass
+    directory.mkdir(parents=True, exist_ok=True)
+    path.write_text(script, encoding='utf-8')
+    if sys.platform != 'win32':
+        path.chmod(0o755)
+    return str(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog=LAUNCHER_NAME, description="Multi-connection ranged HTTP downloader")
+    parser.add_argument('-V', '--version', action='version', version=VERSION)
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('-H', '--header', action='append', default=[])
+    parser.add_argument('-n', '--num-connections', type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument('--max-redirect', type=int)  # sent by yt-dlp along with cookies, redirects are followed
+    parser.add_argument('url')
+    args = parser.parse_args(argv)
+
+    headers = {}
+    for header in args.header:
+        key, _, value = header.partition(':')
+        if key.strip():
+            headers[key.strip()] = value.strip()
+
+    downloader = RangedDownloader(args.url, args.output, headers, args.num_connections,
+                                  progress=print_progress)
+    try:
+        downloader.run()
+    except DownloadError as e:
+        print(f"{LAUNCHER_NAME}: error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
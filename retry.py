@@ -0,0 +1,122 @@
+import random
+import re
+import time
+from typing import Optional
+
+
+# Failure kinds
+NETWORK = 'network'
+THROTTLED = 'throttled'
+UNAVAILABLE = 'unavailable'
+POSTPROCESS = 'postprocess'
+CANCELLED = 'cancelled'
+UNKNOWN = 'unknown'
+LOST = 'lost'  # the worker agent running the job went away, not the job's fault
+
+# Checked in order, item-level problems first so "Unable to download webpage:
+# HTTP Error 404" counts as unavailable rather than a network problem
+FAILURE_PATTERNS = [
+    (UNAVAILABLE, re.compile(
+        r"Video unavailable|Private video|This video is (?:not available|private)|"
+        r"has been removed|HTTP Error 404|HTTP Error 410|Unsupported URL|"
+        r"is not a valid URL|members-only|requires payment|copyright|"
+        r"Requested format is not available", re.IGNORECASE)),
+    (POSTPROCESS, re.compile(
+        r"Postprocessing|ffmpeg not found|ffprobe and ffmpeg not found|"
+        r"Conversion failed|Error (?:opening|merging)|Invalid data found when processing input",
+        re.IGNORECASE)),
+    (THROTTLED, re.compile(
+        r"HTTP Error 429|Too Many Requests|rate.?limit|HTTP Error 403|"
+        r"confirm you.re not a bot", re.IGNORECASE)),
+    (NETWORK, re.compile(
+        r"timed out|Connection (?:reset|refused|aborted)|TransportError|"
+        r"Name or service not known|Temporary failure in name resolution|"
+        r"Network is unreachable|Unable to download webpage|IncompleteRead|"
+        r"HTTP Error 5\d\d|Got error:|fragment \d+ not found", re.IGNORECASE)),
+]
+
+# Failures worth trying again, and those that say the whole site is struggling
+RETRYABLE = {NETWORK, THROTTLED}
+SITE_FAILURES = {NETWORK, THROTTLED}
+
+
+def classify_failure(exit_code: Optional[int], output: str = '', cancelled: bool = False) -> str:
+    """Classify a failed yt-dlp run from its exit code and output"""
+    if cancelled:
+        return CANCELLED
+
+    # Only look at error lines, progress output can contain anything
+    error_lines = '\n'.join(line for line in output.splitlines()
+                            if 'ERROR' in line or 'WARNING' in line or 'error' in line)
+    for kind, pattern in FAILURE_PATTERNS:
+        if pattern.search(error_lines):
+            return kind
+
+    if exit_code == 2:
+        # yt-dlp usage error, retrying will not help
+        return UNAVAILABLE
+    return UNKNOWN
+
+
+class RetryPolicy:
+    """Decides whether and when a failed job is retried"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 5.0,
+                 throttled_delay: float = 30.0, max_delay: float = 600.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.throttled_delay = throttled_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, kind: str, attempts: int) -> bool:
+        return kind in RETRYABLE and attempts < self.max_attempts
+
+    def delay(self, kind: str, attempts: int) -> float:
+        """Exponential backoff with jitter, attempts is the number of runs so far"""
+        base = self.throttled_delay if kind == THROTTLED else self.base_delay
+        delay = min(self.max_delay, base * (2 ** max(attempts - 1, 0)))
+        # Equal jitter: keep at least half the delay so retries still back off
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Pauses a site after repeated failures
+
+    After `threshold` consecutive site-level failures the site is open (paused)
+    for `cooldown` seconds. Afterwards it is half-open: one job may probe the
+    site, a success closes the breaker and a failure opens it again.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = {}  # site -> consecutive failures
+        self._open_until = {}  # site -> monotonic time
+
+    def record_success(self, site: str):
+        self._failures.pop(site, None)
+        self._open_until.pop(site, None)
+
+    def record_failure(self, site: str, now: Optional[float] = None) -> bool:
+        """Count a failure, returns True if this opened the breaker"""
+        now = time.monotonic() if now is None else now
+        failures = self._failures.get(site, 0) + 1
+        self._failures[site] = failures
+        if self.threshold and failures >= self.threshold:
+            self._open_until[site] = now + self.cooldown
+            return True
+        return False
+
+    def remaining(self, site: str, now: Optional[float] = None) -> float:
+        """Seconds until the site may be tried again (0 if closed or half-open)"""
+        until = self._open_until.get(site)
+        if until is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(until - now, 0.0)
+
+    def is_open(self, site: str, now: Optional[float] = None) -> bool:
+        return self.remaining(site, now) > 0
+
+    def is_half_open(self, site: str, now: Optional[float] = None) -> bool:
+        return site in self._open_until and not self.is_open(site, now)
@@ -0,0 +1,564 @@
+import itertools
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from extractors import match_extractor
+from retry import CircuitBreaker, LOST, RetryPolicy, SITE_FAILURES
+from scratch import SCRATCH_SIZE_FACTOR
+from urlnorm import url_host
+from videoinfo import VideoInfo
+
+
+# Job states
+QUEUED = 'queued'
+DEFERRED = 'deferred'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+REFUSED = 'refused'
+CANCELLED = 'cancelled'
+RETRYING = 'retrying'
+
+# Queue orderings
+ORDER_FIFO = 'fifo'
+ORDER_SHORTEST_FIRST = 'sjf'
+
+# Always leave this much free on the target volume
+DEFAULT_SPACE_MARGIN = 1024 * 1024 * 1024
+# ...and on the scratch volume, which is often a small SSD or tmpfs
+DEFAULT_SCRATCH_MARGIN = 256 * 1024 * 1024
+
+# Hosts whose site name is not their second-level domain label
+HOST_ALIASES = {
+    'youtu.be': 'youtube',
+    'youtube-nocookie.com': 'youtube',
+    'x.com': 'twitter',
+    'redd.it': 'reddit',
+    'fb.watch': 'facebook',
+    'vm.tiktok.com': 'tiktok',
+}
+
+# Second-level labels of country domains like bbc.co.uk
+_PUBLIC_SUFFIX_LABELS = {'co', 'com', 'org', 'net', 'ac', 'gov', 'edu', 'ne', 'or'}
+
+_job_counter = itertools.count(1)
+
+
+def site_from_url(url: str) -> str:
+    """Guess a site name from a URL host (youtube, twitch, ...)"""
+    host = url_host(url)
+    if not host:
+        return 'generic'
+
+    for alias, site in HOST_ALIASES.items():
+        if host == alias or host.endswith('.' + alias):
+            return site
+
+    labels = host.split('.')
+    if len(labels) >= 3 and labels[-2] in _PUBLIC_SUFFIX_LABELS:
+        return labels[-3]
+    if len(labels) >= 2:
+        return labels[-2]
+    return labels[0]
+
+
+def classify_job(url: str, info: Optional[VideoInfo] = None) -> str:
+    """Site key used for per-site limits: the extractor if known, else the URL host"""
+    extractor = None
+    if info:
+        extractor = info.get('extractor') or info.get('extractor_key')
+    if not extractor:
+        # Same key before and after the info is fetched, once the index is loaded
+        extractor = match_extractor(url, wait=False)
+    if extractor:
+        # 'youtube' and 'youtube:tab' share the same site limits
+        return extractor.split(':')[0].lower()
+    return site_from_url(url)
+
+
+def estimate_download_size(info: Optional[VideoInfo]) -> Optional[int]:
+    """Estimate download size in bytes from yt-dlp info"""
+    if not info:
+        return None
+
+    # Merged formats (e.g. bestvideo+bestaudio) list their parts separately
+    requested = info.get('requested_formats')
+    if requested:
+        sizes = [fmt.get('filesize') or fmt.get('filesize_approx') for fmt in requested]
+        if all(sizes):
+            return int(sum(sizes))
+
+    size = info.get('filesize') or info.get('filesize_approx')
+    return int(size) if size else None
+
+
+class DownloadJob:
+    """A queued download and its scheduling state"""
+
+    def __init__(self, options: Dict[str, Any], info: Optional[VideoInfo] = None):
+        self.job_id = str(next(_job_counter))
+        self.options = dict(options)
+        self.url = self.options.get('url', '')
+        self.info = info
+        self.status = QUEUED
+        self.message = ''
+        self.progress = 0
+        self.added_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.attempts = 0
+        self.not_before = 0.0  # monotonic time before which a retry may not start
+        self.failure = ''
+        self.files = []  # final paths reported by yt-dlp
+        self.scratch_path = None  # this job's directory under scratch_dir, kept across retries
+        self.cache_warm = None  # whether yt-dlp's cache was warm for this site when the job started
+        self.remote = False  # leased to a worker agent, its files land on another machine
+        self.extract_seconds = None  # start to first progress line, mostly extraction
+        self.estimated_size = estimate_download_size(info)
+        self.site = classify_job(self.url, info)
+    
+    def attach_info(self, info: VideoInfo):
+        """Attach info fetched after the job was queued"""
+        self.info = info
+        self.estimated_size = estimate_download_size(info)
+        self.site = classify_job(self.url, info)
+
+    @property
+    def output_path(self) -> str:
+        return self.options.get('output_path', '.')
+
+    @property
+    def scratch_dir(self) -> Optional[str]:
+        return self.options.get('scratch_dir') or None
+
+    @property
+    def title(self) -> str:
+        if self.info and self.info.title:
+            return self.info.title
+        return self.url
+
+    def __repr__(self):
+        return f"DownloadJob({self.job_id}, {self.status}, {self.url!r})"
+
+
+class SpaceReservations:
+    """Tracks disk space promised to running jobs, per volume"""
+
+    def __init__(self, margin: int = DEFAULT_SPACE_MARGIN):
+        self.margin = margin
+        self._reserved = {}  # job id -> [device, total bytes, bytes still to write]
+
+    @staticmethod
+    def _existing_dir(path: str) -> str:
+        # The output directory may not exist yet, yt-dlp creates it
+        path = os.path.abspath(path or '.')
+        while not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return path
+
+    def device(self, path: str) -> int:
+        return os.stat(self._existing_dir(path)).st_dev
+
+    def free_space(self, path: str) -> int:
+        return shutil.disk_usage(self._existing_dir(path)).free
+
+    def reserved_on(self, device: int) -> int:
+        return sum(remaining for dev, _, remaining in self._reserved.values() if dev == device)
+
+    def check(self, path: str, size: Optional[int], credit: int = 0) -> Tuple[str, int]:
+        """Check if size bytes fit on the volume of path
+
+        Returns (decision, available) where decision is 'ok', 'defer' (only fits
+        once space promised to running jobs is given back) or 'refuse' (does not
+        fit even on an otherwise idle volume). credit is space that will be freed
+        before the job starts, e.g. by library quota eviction.
+        """
+        size = size or 0
+        free = self.free_space(path) + credit - self.margin
+        available = free - self.reserved_on(self.device(path))
+        if size > free:
+            # Would not fit even with nothing else running
+            return 'refuse', available
+        if size > available:
+            return 'defer', available
+        return 'ok', available
+
+    def reserve(self, job_id: str, path: str, size: Optional[int]):
+        size = size or 0
+        self._reserved[job_id] = [self.device(path), size, size]
+
+    def update_progress(self, job_id: str, percent: int):
+        """Shrink a reservation as the job writes its data to disk"""
+        entry = self._reserved.get(job_id)
+        if entry:
+            percent = min(max(percent, 0), 100)
+            entry[2] = entry[1] * (100 - percent) // 100
+
+    def release(self, job_id: str):
+        self._reserved.pop(job_id, None)
+
+    def total_reserved(self) -> int:
+        return sum(remaining for _, _, remaining in self._reserved.values())
+
+
+class SiteLimits:
+    """Per-site concurrency caps and minimum intervals between job starts"""
+
+    def __init__(self, default_limit: int = 0, default_interval: float = 0.0,
+                 overrides: Optional[Dict[str, Tuple[int, float]]] = None):
+        self.default_limit = default_limit  # 0 means unlimited
+        self.default_interval = default_interval
+        self.overrides = overrides or {}  # site -> (limit, interval)
+
+    def limit_for(self, site: str) -> int:
+        if site in self.overrides:
+            return self.overrides[site][0]
+        return self.default_limit
+
+    def interval_for(self, site: str) -> float:
+        if site in self.overrides:
+            return self.overrides[site][1]
+        return self.default_interval
+
+    @staticmethod
+    def parse_overrides(text: str, default_interval: float = 0.0) -> Dict[str, Tuple[int, float]]:
+        """Parse 'youtube=2, twitch=1/5' into {site: (limit, interval seconds)}"""
+        overrides = {}
+        for entry in text.split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            if '=' not in entry:
+                raise ValueError(f"Invalid site limit '{entry}', expected site=limit[/seconds]")
+
+            site, value = entry.split('=', 1)
+            limit_str, _, interval_str = value.partition('/')
+            try:
+                limit = int(limit_str)
+                interval = float(interval_str) if interval_str else default_interval
+            except ValueError:
+                raise ValueError(f"Invalid site limit '{entry}', expected site=limit[/seconds]")
+            if limit < 0 or interval < 0:
+                raise ValueError(f"Invalid site limit '{entry}', values must not be negative")
+
+            overrides[site.strip().lower()] = (limit, interval)
+        return overrides
+
+
+class DownloadScheduler:
+    """Decides which queued jobs may start, and in what order"""
+
+    def __init__(self, max_parallel: int = 1, order: str = ORDER_FIFO,
+                 space_margin: int = DEFAULT_SPACE_MARGIN,
+                 site_limits: Optional[SiteLimits] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_parallel = max_parallel
+        self.order = order
+        self.reservations = SpaceReservations(space_margin)
+        self.scratch_reservations = SpaceReservations(DEFAULT_SCRATCH_MARGIN)
+        self.site_limits = site_limits or SiteLimits()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.pending: List[DownloadJob] = []
+        self.running: Dict[str, DownloadJob] = {}
+        self.last_start = {}  # site -> monotonic time of the last job start
+        self.ytdlp_cache = None  # YtDlpCache when the app manages yt-dlp's --cache-dir
+        self.warming = {}  # site -> id of the job doing the first extraction against a cold cache
+        self.library_quota = None  # LibraryQuota when downloads are kept under a size cap
+        self.evicted: List[Tuple[str, int]] = []  # (path, bytes) removed for the quota, drained by the app
+        self.local_slots: Optional[int] = None  # with worker agents: jobs run here, the others are leased
+        self.remote_free = 0  # free agent slots, set before each schedule() pass
+
+    def add(self, job: DownloadJob) -> DownloadJob:
+        job.status = QUEUED
+        self.pending.append(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        if job_id in self.running:
+            return self.running[job_id]
+        for job in self.pending:
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def ordered_pending(self) -> List[DownloadJob]:
+        """Pending jobs in the order they should be considered"""
+        if self.order == ORDER_SHORTEST_FIRST:
+            # Unknown sizes go last, ties keep insertion order
+            return sorted(self.pending, key=lambda job: (
+                job.estimated_size is None,
+                job.estimated_size or 0,
+                job.added_at
+            ))
+        return list(self.pending)
+
+    def free_slots(self) -> int:
+        return max(self.max_parallel - len(self.running), 0)
+
+    def running_for_site(self, site: str) -> int:
+        return sum(1 for job in self.running.values() if job.site == site)
+
+    def site_wait(self, site: str, now: Optional[float] = None) -> float:
+        """Seconds until the site's minimum start interval has passed"""
+        interval = self.site_limits.interval_for(site)
+        last = self.last_start.get(site)
+        if not interval or last is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(last + interval - now, 0.0)
+
+    def site_saturated(self, site: str) -> bool:
+        limit = self.site_limits.limit_for(site)
+        if limit and self.running_for_site(site) >= limit:
+            return True
+        # A half-open breaker lets a single probe job through
+        return self.breaker.is_half_open(site) and self.running_for_site(site) > 0
+
+    def job_wait(self, job: DownloadJob, now: Optional[float] = None) -> float:
+        """Seconds until time-based holds (interval, backoff, breaker) are over"""
+        now = time.monotonic() if now is None else now
+        return max(self.site_wait(job.site, now),
+                   job.not_before - now,
+                   self.breaker.remaining(job.site, now),
+                   0.0)
+
+    def next_wakeup(self) -> Optional[float]:
+        """Seconds until a job held back only by time may start"""
+        now = time.monotonic()
+        waits = [self.job_wait(job, now) for job in self.pending
+                 if not self.site_saturated(job.site)]
+        waits = [wait for wait in waits if wait > 0]
+        return min(waits) if waits else None
+
+    def schedule(self) -> Tuple[List[DownloadJob], List[DownloadJob]]:
+        """Pick jobs to start now
+
+        Returns (to_start, refused). Jobs that do not fit yet stay queued as
+        deferred and are reconsidered on the next call.
+        """
+        to_start = []
+        refused = []
+        slots = self.free_slots()
+        local_running = sum(1 for job in self.running.values() if not job.remote)
+        remote_free = self.remote_free
+        if self.library_quota is not None:
+            # Reads the tracked files once for all jobs below
+            self.library_quota.begin_pass()
+
+        for job in self.ordered_pending():
+            if len(to_start) >= slots:
+                break
+
+            # A busy site only holds back its own jobs, others keep flowing
+            if self.site_saturated(job.site):
+                job.status = QUEUED
+                job.message = f"Waiting for a {job.site} slot"
+                continue
+            if self.breaker.is_open(job.site):
+                job.message = (f"{job.site} paused after repeated failures, "
+                               f"resuming in {int(self.breaker.remaining(job.site))}s")
+                continue
+            if job.not_before > time.monotonic():
+                continue
+            if self.site_wait(job.site) > 0:
+                job.status = QUEUED
+                job.message = f"Waiting to start next {job.site} job"
+                continue
+            if self.warming.get(job.site) in self.running:
+                # Started now it would redo the expensive extraction work the first job is caching
+                job.status = QUEUED
+                job.message = "Waiting for the yt-dlp cache to warm up"
+                continue
+
+            # Local vs leased is decided first, leased jobs need no local disk space or quota
+            if (self.local_slots is not None and local_running >= self.local_slots
+                    and not job.options.get('live_capture')):
+                if remote_free <= 0:
+                    job.status = QUEUED
+                    job.message = "Waiting for a free slot"
+                    continue
+                remote_free -= 1
+                to_start.append(job)
+                self._start(job, remote=True)
+                continue
+
+            # Reasons left by earlier passes (site slots, retries) do not apply to this check
+            job.message = ''
+            decision, available, victims = 'ok', 0, []
+            if self.library_quota is not None:
+                decision, victims = self.library_quota.check(job.estimated_size)
+                if decision == 'refuse':
+                    job.message = (f"Larger than the library quota: needs {format_bytes(job.estimated_size)}, "
+                                   f"{format_bytes(self.library_quota.pinned_bytes())} of "
+                                   f"{format_bytes(self.library_quota.max_bytes)} pinned")
+            quota_full = decision != 'ok'
+            if not quota_full:
+                try:
+                    # Files evicted for the quota free their space on the download volume too
+                    credit = (self.library_quota.reclaimable(victims, self.reservations.device(job.output_path))
+                              if victims else 0)
+                    decision, available = self.reservations.check(job.output_path, job.estimated_size, credit)
+                except OSError as e:
+                    decision, available = 'refuse', 0
+                    job.message = f"Cannot access download path: {e}"
+            if decision != 'refuse' and job.scratch_dir:
+                decision, available = self._check_scratch(job, decision)
+
+            if decision == 'refuse':
+                if not job.message:
+                    job.message = (f"Not enough disk space: needs {format_bytes(job.estimated_size)}, "
+                                   f"only {format_bytes(max(available, 0))} available")
+                job.status = REFUSED
+                self.pending.remove(job)
+                refused.append(job)
+            elif decision == 'defer':
+                job.status = DEFERRED
+                job.message = "Waiting for library quota" if quota_full else "Waiting for disk space"
+            else:
+                if victims:
+                    self.evicted.extend(self.library_quota.evict(victims))
+                to_start.append(job)
+                self._start(job)
+                local_running += 1
+
+        if self.library_quota is not None:
+            self.library_quota.end_pass()
+        return to_start, refused
+
+    def _check_scratch(self, job: DownloadJob, decision: str) -> Tuple[str, int]:
+        """Combine decision for the download path with the space left in the scratch directory"""
+        size = (job.estimated_size or 0) * SCRATCH_SIZE_FACTOR
+        try:
+            scratch_decision, available = self.scratch_reservations.check(job.scratch_dir, size)
+        except OSError as e:
+            job.message = f"Cannot access scratch directory: {e}"
+            return 'refuse', 0
+        if scratch_decision == 'refuse':
+            job.message = (f"Not enough scratch space: needs {format_bytes(size)}, "
+                           f"only {format_bytes(max(available, 0))} available")
+            return 'refuse', available
+        if scratch_decision == 'defer':
+            return 'defer', available
+        return decision, available
+
+    def _start(self, job: DownloadJob, remote: bool = False):
+        self.pending.remove(job)
+        self.running[job.job_id] = job
+        job.remote = remote
+        if not remote:
+            self.reservations.reserve(job.job_id, job.output_path, job.estimated_size)
+            if self.library_quota is not None:
+                self.library_quota.reserve(job.job_id, job.estimated_size)
+            if job.scratch_dir:
+                # Shrinks as the job writes, the destination reservation is held in full until the job ends
+                self.scratch_reservations.reserve(job.job_id, job.scratch_dir,
+                                                  (job.estimated_size or 0) * SCRATCH_SIZE_FACTOR)
+        job.status = RUNNING
+        job.message = ''
+        job.progress = 0
+        job.attempts += 1
+        job.started_at = time.monotonic()
+        job.extract_seconds = None
+        self.last_start[job.site] = job.started_at
+        if self.ytdlp_cache is not None:
+            job.cache_warm = self.ytdlp_cache.is_warm(job.site)
+            # Live captures never report progress, they cannot open the gate for others
+            if not job.cache_warm and not job.options.get('live_capture') and job.site not in self.warming:
+                self.warming[job.site] = job.job_id
+
+    def extraction_done(self, job_id: str) -> Optional[DownloadJob]:
+        """Record the first progress of a job, returns it if this was news"""
+        job = self.running.get(job_id)
+        if not job or job.extract_seconds is not None or job.started_at is None:
+            return None
+        job.extract_seconds = time.monotonic() - job.started_at
+        if self.ytdlp_cache is not None:
+            self.ytdlp_cache.record(job.cache_warm, job.extract_seconds)
+            self.ytdlp_cache.mark_warm(job.site)
+        if self.warming.get(job.site) == job_id:
+            del self.warming[job.site]
+        return job
+
+    def update_progress(self, job_id: str, percent: int):
+        job = self.running.get(job_id)
+        if job:
+            job.progress = percent
+            if job.scratch_dir:
+                # Written to scratch, the destination only gets the data with the final move
+                self.scratch_reservations.update_progress(job_id, percent)
+            else:
+                self.reservations.update_progress(job_id, percent)
+
+    def job_finished(self, job_id: str, success: bool, message: str = '',
+                     failure: str = '') -> Optional[DownloadJob]:
+        """Record the outcome of a job, requeueing it if the failure is retryable"""
+        job = self.running.pop(job_id, None)
+        if job and self.warming.get(job.site) == job_id:
+            # Let the next job of the site try
+            del self.warming[job.site]
+        self.reservations.release(job_id)
+        self.scratch_reservations.release(job_id)
+        if self.library_quota is not None:
+            self.library_quota.release(job_id)
+        if not job:
+            return None
+
+        job.finished_at = time.monotonic()
+        job.failure = failure
+        if success:
+            job.status = FINISHED
+            job.message = message
+            self.breaker.record_success(job.site)
+            if self.ytdlp_cache is not None:
+                self.ytdlp_cache.mark_warm(job.site)
+            return job
+
+        if failure == LOST:
+            # Hand it to the next free slot, without using up an attempt
+            job.attempts -= 1
+            job.status = RETRYING
+            job.message = f"{message}; reassigning"
+            job.not_before = 0.0
+            self.pending.insert(0, job)
+            return job
+
+        job.status = FAILED
+        job.message = message
+        if failure in SITE_FAILURES and self.breaker.record_failure(job.site):
+            job.message += f"; pausing {job.site} for {int(self.breaker.cooldown)}s"
+
+        if self.retry_policy.should_retry(failure, job.attempts):
+            delay = self.retry_policy.delay(failure, job.attempts)
+            job.status = RETRYING
+            job.not_before = job.finished_at + delay
+            job.message += f"; retry {job.attempts}/{self.retry_policy.max_attempts - 1} in {int(delay)}s"
+            self.pending.append(job)
+        return job
+
+    def cancel_pending(self) -> List[DownloadJob]:
+        cancelled = self.pending
+        self.pending = []
+        for job in cancelled:
+            job.status = CANCELLED
+        return cancelled
+
+    def has_work(self) -> bool:
+        return bool(self.pending or self.running)
+
+
+def format_bytes(size: Optional[int]) -> str:
+    """Format a byte count for log messages"""
+    if size is None:
+        return "unknown size"
+    size = float(size)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
@@ -0,0 +1,116 @@
+import errno
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+
+# Files yt-dlp is still writing (name.part, name.part-Frag3, ...), never moved out of the scratch directory
+IN_PROGRESS_MARKERS = ('.part', '.ytdl', '.temp')
+COPY_CHUNK = 64 * 1024 * 1024
+# A merge keeps both streams next to its output until it is done
+SCRATCH_SIZE_FACTOR = 2
+
+# copy_file_range() refusals that mean "use something else", not a real I/O error
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.EPERM}
+
+
+def create_job_dir(scratch_dir: str) -> str:
+    """A fresh directory for one job's fragments, parts and intermediate streams"""
+    os.makedirs(scratch_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix='job-', dir=scratch_dir)
+
+
+def remove_job_dir(path: Optional[str]):
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _copy_data(src_fd: int, dst_fd: int, size: int) -> str:
+    """Copy size bytes in the kernel where possible, returns the method used"""
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            # Can be a reflink or a server-side copy on NFS/SMB
+            while copied < size:
+                n = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK, size - copied))
+                if n == 0:
+                    break
+                copied += n
+            if copied >= size:
+                return 'copy_file_range'
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS or copied:
+                raise
+    if hasattr(os, 'sendfile'):
+        try:
+            while copied < size:
+                n = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK, size - copied))
+                if n == 0:
+                    break
+                copied += n
+            if copied >= size:
+                return 'sendfile'
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS or copied:
+                raise
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    while True:
+        data = os.read(src_fd, COPY_CHUNK)
+        if not data:
+            break
+        os.write(dst_fd, data)
+    return 'read/write'
+
+
+def move_file(src: str, dst: str) -> str:
+    """Move a finished file, renaming on the same volume and copying in the kernel across volumes
+
+    The copy goes to a temporary name first so the destination never holds
+    a partial file. Returns the method used.
+    """
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    try:
+        os.replace(src, dst)
+        return 'rename'
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp = dst + '.moving'
+    try:
+        with open(src, 'rb') as fin, open(tmp, 'wb') as fout:
+            method = _copy_data(fin.fileno(), fout.fileno(), os.fstat(fin.fileno()).st_size)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    os.unlink(src)
+    return method
+
+
+def move_finished(path: str, job_dir: str, destination: str) -> List[str]:
+    """Move a finished media file and its sidecars (subtitles, thumbnail, info JSON) to destination
+
+    Returns the new path of the media file first, then the sidecars. Paths
+    keep their location relative to job_dir.
+    """
+    directory, filename = os.path.split(path)
+    relative_dir = os.path.relpath(directory, job_dir)
+    if relative_dir.startswith(os.pardir):
+        return [path]  # written outside the scratch directory (custom -o)
+    target_dir = os.path.normpath(os.path.join(destination, relative_dir))
+    stem = os.path.splitext(filename)[0]
+    sidecars = [name for name in os.listdir(directory)
+                if name != filename and name.startswith(stem + '.')
+                and not any(marker in name[len(stem):] for marker in IN_PROGRESS_MARKERS)]
+    moved = []
+    for name in [filename] + sidecars:
+        target = os.path.join(target_dir, name)
+        move_file(os.path.join(directory, name), target)
+        moved.append(target)
+    return moved
\ No newline at end of file
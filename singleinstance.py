@@ -0,0 +1,125 @@
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Callable, List, Optional
+
+from paths import APP_DATA_DIR
+
+# Kept free of Qt imports: a second launch only loads this module before handing off and exiting
+
+LOCK_PATH = APP_DATA_DIR / "instance.lock"
+KEY_PATH = APP_DATA_DIR / "instance.key"
+CONNECT_TIMEOUT = 3.0  # how long a second launch waits for the first one to start listening
+MAX_MESSAGE = 1024 * 1024
+
+if sys.platform == 'win32':
+    import msvcrt
+    ADDRESS = rf"\\.\pipe\ytdlp-gui-{os.environ.get('USERNAME', 'user')}"
+    FAMILY = 'AF_PIPE'
+else:
+    import fcntl
+    ADDRESS = str(APP_DATA_DIR / "instance.sock")
+    FAMILY = 'AF_UNIX'
+
+
+def _lock(f) -> bool:
+    try:
+        if sys.platform == 'win32':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class InstanceServer:
+    """Held by the running instance: the instance lock and the socket later launches send URLs to
+
+    The lock lives as long as the process, so it is released even when the
+    process crashes. The socket only carries JSON and a connection has to
+    authenticate with a random per-run key readable by this user only.
+    """
+
+    def __init__(self, lock_file, listener: Listener):
+        self.lock_file = lock_file
+        self.listener = listener
+        self.thread = None
+
+    def serve(self, on_urls: Callable[[List[str]], None]):
+        """Call on_urls (from a background thread) for every handoff"""
+        self.thread = threading.Thread(target=self._serve, args=(on_urls,), name='instance-server', daemon=True)
+        self.thread.start()
+
+    def _serve(self, on_urls: Callable[[List[str]], None]):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (OSError, AuthenticationError):
+                if self.listener is None:
+                    return  # closed
+                continue  # failed authentication or a client that went away
+            try:
+                with conn:
+                    message = json.loads(conn.recv_bytes(MAX_MESSAGE))
+                    conn.send_bytes(b'ok')
+            except (OSError, EOFError, ValueError):
+                continue
+            if not isinstance(message, dict):
+                continue
+            urls = [url for url in message.get('urls', []) if isinstance(url, str)]
+            on_urls(urls)
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()  # also removes the unix socket file
+        self.lock_file.close()
+
+
+def acquire() -> Optional[InstanceServer]:
+    """Become the running instance, or None if another one already is"""
+    APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    lock_file = open(LOCK_PATH, 'a+b')
+    if not _lock(lock_file):
+        lock_file.close()
+        return None
+    if FAMILY == 'AF_UNIX':
+        try:
+            os.unlink(ADDRESS)  # left by a crashed instance, the lock says nobody is listening
+        except FileNotFoundError:
+            pass
+    key = secrets.token_bytes(32)
+    fd = os.open(KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    try:
+        listener = Listener(ADDRESS, FAMILY, authkey=key)
+    except OSError:
+        lock_file.close()
+        raise
+    return InstanceServer(lock_file, listener)
+
+
+def forward(urls: List[str], timeout: float = CONNECT_TIMEOUT) -> bool:
+    """Send urls to the running instance, False if it could not be reached"""
+    message = json.dumps({'urls': urls}).encode('utf-8')
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(KEY_PATH, 'rb') as f:
+                key = f.read()
+            with Client(ADDRESS, FAMILY, authkey=key) as conn:
+                conn.send_bytes(message)
+                return conn.recv_bytes(16) == b'ok'
+        except (OSError, EOFError, ValueError, AuthenticationError):
+            # The running instance may still be starting up
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from PySide6.QtWidgets import QGroupBox, QVBoxLayout, QHBoxLayout, QCheckBox, QLineEdit, QLabel
+from PySide6.QtWidgets import QGroupBox, QVBoxLayout, QHBoxLayout, QCheckBox, QLineEdit, QLabel, QComboBox
 
 
 # SponsorBlock categories and their descriptions
@@ -15,6 +15,10 @@ SPONSORBLOCK_CATEGORIES = {
 
 DEFAULT_CATEGORIES = "sponsor,selfpromo"
 
+# Removal modes
+MODE_REMOVE = 'remove'  # cut during download (--sponsorblock-remove)
+MODE_MARK_THEN_CUT = 'mark'  # mark as chapters now, cut in an idle-time batch later
+
 
 def create_sponsorblock_group() -> QGroupBox:
     """Create SponsorBlock configuration group widget"""
@@ -40,6 +44,27 @@ def create_sponsorblock_group() -> QGroupBox:
     
     sponsor_layout.addLayout(sponsor_options_layout)
     
+    # Removal mode
+    sponsor_mode_layout = QHBoxLayout()
+    sponsor_mode_layout.addWidget(QLabel("Mode:"))
+    
+    sponsorblock_mode_combo = QComboBox()
+    sponsorblock_mode_combo.setObjectName("sponsorblock_mode_combo")  # For findChild lookup
+    sponsorblock_mode_combo.addItem("Remove during download", MODE_REMOVE)
+    sponsorblock_mode_combo.addItem("Mark now, cut when idle", MODE_MARK_THEN_CUT)
+    sponsorblock_mode_combo.setToolTip("Marking only adds chapters while downloading, segments are cut in a batch once the queue is idle")
+    sponsor_mode_layout.addWidget(sponsorblock_mode_combo)
+    sponsor_mode_layout.addStretch()
+    
+    sponsor_layout.addLayout(sponsor_mode_layout)
+    
+    # Local segment cache
+    sponsorblock_cache_cb = QCheckBox("Cache segments locally")
+    sponsorblock_cache_cb.setObjectName("sponsorblock_cache_cb")  # For findChild lookup
+    sponsorblock_cache_cb.setChecked(True)
+    sponsorblock_cache_cb.setToolTip("Answer yt-dlp's SponsorBlock lookups from a local cache, prefetched for queued videos")
+    sponsor_layout.addWidget(sponsorblock_cache_cb)
+    
     # Add description
     description_label = QLabel("Remove segments automatically marked by the SponsorBlock community")
     description_label.setStyleSheet("color: #666666; font-size: 10px;")
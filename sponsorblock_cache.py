@@ -0,0 +1,261 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from paths import APP_CACHE_DIR
+from sponsorblock import SPONSORBLOCK_CATEGORIES
+
+
+DEFAULT_UPSTREAM_API = 'https://sponsor.ajay.app'
+DEFAULT_DB_PATH = APP_CACHE_DIR / "sponsorblock.sqlite3"
+DEFAULT_TTL = 6 * 3600
+HASH_PREFIX_LENGTH = 4  # the API's recommended (and minimum useful) prefix length
+FETCH_TIMEOUT = 15
+PREWARM_WORKERS = 4
+
+# Fetch everything upstream so one cached response serves any category filter
+ALL_CATEGORIES = list(SPONSORBLOCK_CATEGORIES) + ['poi_highlight', 'chapter']
+ALL_ACTION_TYPES = ['skip', 'mute', 'full', 'poi', 'chapter']
+
+
+def video_hash_prefix(video_id: str, length: int = HASH_PREFIX_LENGTH) -> str:
+    """SHA-256 hash prefix used by the privacy-preserving skipSegments endpoint"""
+    return hashlib.sha256(video_id.encode('ascii')).hexdigest()[:length]
+
+
+class SegmentCache:
+    """SQLite store of SponsorBlock responses, one row per hash-prefix bucket
+
+    Whole buckets are cached, so a video missing from a fresh bucket is known
+    to have no segments without asking the API again.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, ttl: float = DEFAULT_TTL):
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                service TEXT NOT NULL,
+                prefix TEXT NOT NULL,
+                videos TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (service, prefix)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, service: str, prefix: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached bucket contents, or None if missing or expired"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT videos, fetched_at FROM buckets WHERE service = ? AND prefix = ?",
+                (service, prefix)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, service: str, prefix: str, videos: List[Dict[str, Any]]):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO buckets (service, prefix, videos, fetched_at) VALUES (?, ?, ?, ?)",
+                (service, prefix, json.dumps(videos, separators=(',', ':')), time.time()))
+            self.conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self.conn.execute("DELETE FROM buckets WHERE fetched_at < ?",
+                                       (time.time() - self.ttl,))
+            self.conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class SegmentFetcher:
+    """Serves skipSegments lookups from the cache, fetching missing buckets upstream"""
+
+    def __init__(self, cache: SegmentCache, upstream: str = DEFAULT_UPSTREAM_API):
+        self.cache = cache
+        self.upstream = upstream.rstrip('/')
+        self._inflight = {}  # (service, prefix) -> Event, so one bucket is fetched once
+        self._inflight_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fetch_upstream(self, service: str, prefix: str) -> List[Dict[str, Any]]:
+        url = f"{self.upstream}/api/skipSegments/{prefix}?" + urllib.parse.urlencode({
+            'service': service,
+            'categories': json.dumps(ALL_CATEGORIES),
+            'actionTypes': json.dumps(ALL_ACTION_TYPES),
+        })
+        request = urllib.request.Request(url, headers={'User-Agent': 'yt-dlp-gui'})
+        try:
+            with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                # The API answers 404 when no video in the bucket has segments
+                return []
+            raise
+
+    def bucket(self, service: str, prefix: str) -> List[Dict[str, Any]]:
+        """All videos in a hash-prefix bucket, from cache when fresh"""
+        videos = self.cache.get(service, prefix)
+        if videos is not None:
+            self.hits += 1
+            return videos
+
+        key = (service, prefix)
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+
+        if not owner:
+            # Someone else is fetching this bucket, share their result
+            event.wait(FETCH_TIMEOUT * 2)
+            videos = self.cache.get(service, prefix)
+            if videos is not None:
+                self.hits += 1
+                return videos
+
+        try:
+            self.misses += 1
+            videos = self._fetch_upstream(service, prefix)
+            self.cache.put(service, prefix, videos)
+            return videos
+        finally:
+            if owner:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def skip_segments(self, prefix: str, service: str = 'YouTube',
+                      categories: Optional[Iterable[str]] = None,
+                      action_types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Same answer as the API's /api/skipSegments/<prefix> for the given filters"""
+        videos = self.bucket(service, prefix[:HASH_PREFIX_LENGTH])
+        categories = set(categories or ['sponsor'])
+        action_types = set(action_types or ['skip'])
+
+        result = []
+        for video in videos:
+            if not video.get('hash', '').startswith(prefix):
+                continue
+            segments = [segment for segment in video.get('segments', [])
+                        if segment.get('category') in categories
+                        and segment.get('actionType', 'skip') in action_types]
+            if segments:
+                result.append({**video, 'segments': segments})
+        return result
+
+    def prewarm(self, video_ids: Iterable[str], service: str = 'YouTube') -> int:
+        """Fetch the buckets of many videos at once, returns the number fetched upstream
+
+        Videos are grouped by hash prefix, so each bucket costs one request no
+        matter how many queued videos fall into it.
+        """
+        prefixes = {video_hash_prefix(video_id) for video_id in video_ids if video_id}
+        missing = [prefix for prefix in prefixes if self.cache.get(service, prefix) is None]
+        if not missing:
+            return 0
+
+        def fetch(prefix):
+            try:
+                self.bucket(service, prefix)
+                return True
+            except (urllib.error.URLError, OSError, ValueError):
+                return False
+
+        with ThreadPoolExecutor(max_workers=PREWARM_WORKERS) as pool:
+            return sum(pool.map(fetch, missing))
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """Answers yt-dlp's SponsorBlock queries from the local cache"""
+
+    server_version = 'ytdlp-gui-sponsorblock'
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        if not parsed.path.startswith('/api/skipSegments/'):
+            self.send_error(404)
+            return
+
+        prefix = parsed.path[len('/api/skipSegments/'):].lower()
+        query = urllib.parse.parse_qs(parsed.query)
+        try:
+            categories = json.loads(query.get('categories', ['["sponsor"]'])[0])
+            action_types = json.loads(query.get('actionTypes', ['["skip"]'])[0])
+        except ValueError:
+            self.send_error(400, "Invalid categories or actionTypes")
+            return
+        service = query.get('service', ['YouTube'])[0]
+
+        if len(prefix) < HASH_PREFIX_LENGTH or any(c not in '0123456789abcdef' for c in prefix):
+            self.send_error(400, "Invalid hash prefix")
+            return
+
+        try:
+            result = self.server.fetcher.skip_segments(prefix, service, categories, action_types)
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            self.send_error(502, f"SponsorBlock API unavailable: {e}")
+            return
+
+        if not result:
+            self.send_error(404)
+            return
+
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SponsorBlockProxy:
+    """Local HTTP endpoint for yt-dlp's --sponsorblock-api, backed by SegmentCache"""
+
+    def __init__(self, fetcher: SegmentFetcher, host: str = '127.0.0.1', port: int = 0):
+        self.fetcher = fetcher
+        self.server = ThreadingHTTPServer((host, port), _ProxyHandler)
+        self.server.daemon_threads = True
+        self.server.fetcher = fetcher
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name='sponsorblock-proxy', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
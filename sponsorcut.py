@@ -0,0 +1,165 @@
+import bisect
+import json
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+
+# Chapter titles written by --sponsorblock-mark, parsed again by the cut pass
+CHAPTER_TITLE_PREFIX = '[SponsorBlock]: '
+CHAPTER_TITLE_TEMPLATE = CHAPTER_TITLE_PREFIX + '%(categories)l'
+
+# How much sponsor content we accept keeping to cut on a keyframe with stream copy
+DEFAULT_KEYFRAME_TOLERANCE = 1.5
+PROBE_TIMEOUT = 60
+
+# Codecs for the re-encode fallback, picked to suit the container the file keeps
+WEBM_REENCODE_CODECS = ['-c:v', 'libvpx-vp9', '-deadline', 'good', '-cpu-used', '4', '-row-mt', '1',
+                        '-crf', '32', '-b:v', '0', '-c:a', 'libopus']
+DEFAULT_REENCODE_CODECS = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '20', '-c:a', 'aac']
+REENCODE_CODECS = {'.webm': WEBM_REENCODE_CODECS}
+
+
+def _run_json(cmd: List[str]) -> Dict:
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"{cmd[0]} failed with exit code {result.returncode}")
+    return json.loads(result.stdout or '{}')
+
+
+def probe_media(path: str, ffprobe: str = 'ffprobe') -> Dict:
+    """Chapters, streams and duration of a media file"""
+    return _run_json([ffprobe, '-v', 'error', '-print_format', 'json',
+                      '-show_chapters', '-show_streams', '-show_format', path])
+
+
+def probe_keyframes(path: str, ffprobe: str = 'ffprobe') -> List[float]:
+    """Timestamps of video keyframes, read from packet flags (no decoding)"""
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, timeout=PROBE_TIMEOUT * 5)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "ffprobe failed")
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' in flags and pts not in ('', 'N/A'):
+            keyframes.append(float(pts))
+    keyframes.sort()
+    return keyframes
+
+
+def sponsor_ranges(chapters: List[Dict], categories: List[str]) -> List[Tuple[float, float]]:
+    """Time ranges of marked chapters in the given categories, merged and sorted"""
+    wanted = set(categories)
+    ranges = []
+    for chapter in chapters:
+        title = chapter.get('tags', {}).get('title', '')
+        if not title.startswith(CHAPTER_TITLE_PREFIX):
+            continue
+        chapter_categories = {c.strip() for c in title[len(CHAPTER_TITLE_PREFIX):].split(',')}
+        if chapter_categories & wanted:
+            ranges.append((float(chapter['start_time']), float(chapter['end_time'])))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def keep_ranges(cuts: List[Tuple[float, float]], duration: float) -> List[Tuple[float, float]]:
+    """Complement of the cut ranges within [0, duration]"""
+    keep = []
+    position = 0.0
+    for start, end in cuts:
+        if start > position:
+            keep.append((position, start))
+        position = max(position, end)
+    if position < duration:
+        keep.append((position, duration))
+    return [(start, end) for start, end in keep if end - start > 0.01]
+
+
+def snap_to_keyframes(keep: List[Tuple[float, float]], keyframes: List[float],
+                      tolerance: float = DEFAULT_KEYFRAME_TOLERANCE) -> Optional[List[Tuple[float, float]]]:
+    """Move each kept range's start back to a keyframe for stream copy
+
+    Returns None if some start has no keyframe within tolerance before it, in
+    which case the file has to be re-encoded to cut accurately.
+    """
+    snapped = []
+    for start, end in keep:
+        if start <= 0:
+            snapped.append((0.0, end))
+            continue
+        index = bisect.bisect_right(keyframes, start + 0.001) - 1
+        if index < 0 or start - keyframes[index] > tolerance:
+            return None
+        snapped.append((keyframes[index], end))
+    return snapped
+
+
+def cut_file(path: str, categories: List[str], ffmpeg: str = 'ffmpeg', ffprobe: str = 'ffprobe',
+             tolerance: float = DEFAULT_KEYFRAME_TOLERANCE) -> Tuple[float, str]:
+    """Remove marked SponsorBlock chapters from a file in place
+
+    Returns (seconds removed, method) where method is 'copy', 'reencode' or
+    'none' when there was nothing to cut.
+    """
+    info = probe_media(path, ffprobe)
+    duration = float(info.get('format', {}).get('duration') or 0)
+    cuts = sponsor_ranges(info.get('chapters', []), categories)
+    if not cuts or not duration:
+        return 0.0, 'none'
+
+    keep = keep_ranges(cuts, duration)
+    has_video = any(stream.get('codec_type') == 'video' and
+                    not stream.get('disposition', {}).get('attached_pic')
+                    for stream in info.get('streams', []))
+
+    method = 'copy'
+    if has_video:
+        snapped = snap_to_keyframes(keep, probe_keyframes(path, ffprobe), tolerance)
+        if snapped is None:
+            method = 'reencode'
+        else:
+            keep = snapped
+    removed = duration - sum(end - start for start, end in keep)
+
+    directory, filename = os.path.split(os.path.abspath(path))
+    stem, ext = os.path.splitext(filename)
+    list_fd, list_path = tempfile.mkstemp(suffix='.txt', prefix='sponsorcut-')
+    tmp_path = os.path.join(directory, f"{stem}.cut-tmp{ext}")
+    try:
+        # Concat demuxer reading the same file once per kept range
+        escaped = os.path.abspath(path).replace("'", "'\\''")
+        with os.fdopen(list_fd, 'w', encoding='utf-8') as f:
+            f.write("ffconcat version 1.0\n")
+            for start, end in keep:
+                f.write(f"file '{escaped}'\ninpoint {start:.3f}\noutpoint {end:.3f}\n")
+
+        cmd = [ffmpeg, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path,
+               '-map', '0', '-map_metadata', '0', '-map_chapters', '-1']
+        if method == 'copy':
+            cmd.extend(['-c', 'copy'])
+        else:
+            # The WebM muxer only takes VP8/VP9/AV1 with Vorbis/Opus, H.264/AAC would be rejected
+            cmd.extend(REENCODE_CODECS.get(ext.lower(), DEFAULT_REENCODE_CODECS) + ['-c:s', 'copy'])
+        cmd.append(tmp_path)
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"ffmpeg failed with exit code {result.returncode}")
+        os.replace(tmp_path, path)
+    finally:
+        os.unlink(list_path)
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    return removed, method
@@ -0,0 +1,114 @@
+import re
+from typing import List, Optional, Tuple
+
+from videoinfo import FormatInfo, VideoInfo
+
+
+# Containers a video+audio pair can be merged into without re-encoding, with the audio that fits
+MERGE_CONTAINERS = {'mp4': 'm4a', 'webm': 'webm', 'mkv': None}
+
+_PROGRESS_RE = re.compile(r'\[download\]\s+(\d+(?:\.\d+)?)%\s+of\s+~?\s*(\d+(?:\.\d+)?)([KMGT]?)i?B'
+                          r'(?:.*?\bat\s+(\d+(?:\.\d+)?)([KMGT]?)i?B/s)?')
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def _is_video_only(fmt: FormatInfo) -> bool:
+    return fmt.vcodec not in (None, 'none') and fmt.acodec == 'none'
+
+
+def _is_audio_only(fmt: FormatInfo) -> bool:
+    return fmt.acodec not in (None, 'none') and fmt.vcodec == 'none'
+
+
+def select_stream_pair(info: VideoInfo, quality: str = 'best',
+                       container: str = 'best') -> Optional[Tuple[FormatInfo, FormatInfo]]:
+    """The video-only and audio-only formats to fetch side by side, None if the site has no such pair
+
+    Follows the Quality option (a height limit, best or worst) and prefers
+    formats of the chosen container so the merge stays a stream copy.
+    """
+    videos = [fmt for fmt in info.formats if _is_video_only(fmt)]
+    audios = [fmt for fmt in info.formats if _is_audio_only(fmt)]
+    if quality.endswith('p') and quality[:-1].isdigit():
+        videos = [fmt for fmt in videos if (fmt.height or 0) <= int(quality[:-1])]
+    if not videos or not audios:
+        return None
+
+    audio_ext = MERGE_CONTAINERS.get(container)
+    if container in MERGE_CONTAINERS and container != 'mkv':
+        videos = [fmt for fmt in videos if fmt.ext == container] or videos
+        audios = [fmt for fmt in audios if fmt.ext == audio_ext] or audios
+
+    pick = min if quality == 'worst' else max
+    video = pick(videos, key=lambda fmt: (fmt.height or 0, fmt.fps or 0, fmt.tbr or 0))
+    audio = pick(audios, key=lambda fmt: fmt.tbr or 0)
+    return video, audio
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return 'Unknown'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+class StreamProgress:
+    """Combined progress of streams downloaded at the same time, weighted by their sizes
+
+    Sizes come from yt-dlp's progress lines, or from the formats' sizes
+    until a stream has reported one.
+    """
+
+    def __init__(self, sizes: List[Optional[int]]):
+        self.sizes = list(sizes)
+        self.fractions = [0.0] * len(sizes)
+        self.speeds = [0.0] * len(sizes)
+
+    def update(self, index: int, line: str) -> bool:
+        """Take one output line of stream index, True if it was a progress line"""
+        match = _PROGRESS_RE.search(line)
+        if not match:
+            return False
+        percent, size, size_unit, speed, speed_unit = match.groups()
+        self.fractions[index] = min(float(percent) / 100, 1.0)
+        self.sizes[index] = int(float(size) * _UNITS[size_unit])
+        self.speeds[index] = float(speed) * _UNITS[speed_unit] if speed else 0.0
+        return True
+
+    def finished(self, index: int):
+        self.fractions[index] = 1.0
+        self.speeds[index] = 0.0
+
+    def _filled_sizes(self) -> List[float]:
+        known = [size for size in self.sizes if size]
+        # A stream of unknown size counts as large as the average known one
+        average = sum(known) / len(known) if known else 1
+        return [size or average for size in self.sizes]
+
+    @property
+    def total(self) -> int:
+        return int(sum(self._filled_sizes()))
+
+    @property
+    def downloaded(self) -> int:
+        return int(sum(fraction * size for fraction, size in zip(self.fractions, self._filled_sizes())))
+
+    @property
+    def percent(self) -> float:
+        total = self.total
+        return 100.0 * self.downloaded / total if total else 0.0
+
+    @property
+    def speed(self) -> float:
+        return sum(self.speeds)
+
+    @property
+    def eta(self) -> Optional[float]:
+        speed = self.speed
+        return (self.total - self.downloaded) / speed if speed > 0 else None
+
+    def line(self) -> str:
+        """A yt-dlp style progress line for the combined download"""
+        return (f"[download] {self.percent:5.1f}% of {self.total / 1024 ** 2:10.2f}MiB at "
+                f"{self.speed / 1024 ** 2:8.2f}MiB/s ETA {format_eta(self.eta)} (video+audio)")
\ No newline at end of file
@@ -0,0 +1,169 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from paths import APP_DATA_DIR
+
+
+DEFAULT_DB_PATH = APP_DATA_DIR / "subscriptions.sqlite3"
+DEFAULT_ARCHIVE_DIR = APP_DATA_DIR / "archives"
+DEFAULT_INTERVAL = 3600
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_MAX_ITEMS = 30  # newest entries looked at per sync, also bounds the first one
+
+
+class Subscription:
+    """A channel or playlist kept in sync, with the high-water mark of what was fetched"""
+
+    def __init__(self, sub_id: int, url: str, options: Dict[str, Any], last_upload_date: Optional[str],
+                 last_checked: Optional[float], last_new: int):
+        self.sub_id = sub_id
+        self.url = url
+        self.options = options
+        self.last_upload_date = last_upload_date  # YYYYMMDD of the newest entry fetched
+        self.last_checked = last_checked
+        self.last_new = last_new  # entries fetched by the last sync
+
+    def __repr__(self):
+        return f"Subscription({self.sub_id}, {self.url!r}, {self.last_upload_date})"
+
+
+class SubscriptionStore:
+    """SQLite list of subscriptions, each with its own download archive"""
+
+    def __init__(self, db_path: Optional[Path] = None, archive_dir: Optional[Path] = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self.archive_dir = Path(archive_dir) if archive_dir else DEFAULT_ARCHIVE_DIR
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                options TEXT NOT NULL,
+                last_upload_date TEXT,
+                last_checked REAL,
+                last_new INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def archive_path(self, sub_id: int) -> Path:
+        return self.archive_dir / f"{sub_id}.txt"
+
+    def add(self, url: str, options: Dict[str, Any]) -> Subscription:
+        with self._lock:
+            self.conn.execute("INSERT OR IGNORE INTO subscriptions (url, options) VALUES (?, ?)",
+                              (url, json.dumps(options)))
+            self.conn.commit()
+            row = self.conn.execute(
+                "SELECT id, url, options, last_upload_date, last_checked, last_new "
+                "FROM subscriptions WHERE url = ?", (url,)).fetchone()
+        return self._from_row(row)
+
+    def remove(self, sub_id: int):
+        with self._lock:
+            self.conn.execute("DELETE FROM subscriptions WHERE id = ?", (sub_id,))
+            self.conn.commit()
+        try:
+            self.archive_path(sub_id).unlink()
+        except OSError:
+            pass
+
+    def all(self) -> List[Subscription]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, url, options, last_upload_date, last_checked, last_new "
+                "FROM subscriptions ORDER BY id").fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def save_sync(self, subscription: Subscription):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE subscriptions SET last_upload_date = ?, last_checked = ?, last_new = ? WHERE id = ?",
+                (subscription.last_upload_date, subscription.last_checked, subscription.last_new,
+                 subscription.sub_id))
+            self.conn.commit()
+
+    @staticmethod
+    def _from_row(row) -> Subscription:
+        return Subscription(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5])
+
+
+class SubscriptionManager:
+    """Decides which subscriptions are due and how each sync only fetches new entries
+
+    A sync is an ordinary download job over the channel or playlist URL. It
+    keeps a per-subscription download archive and stops at the first entry
+    already in it (--break-on-existing), or the first one older than the
+    high-water mark (--dateafter with --break-match-filters), and never
+    looks past the newest max_items entries (--playlist-items).
+    """
+
+    def __init__(self, store: SubscriptionStore, interval: float = DEFAULT_INTERVAL,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT, max_items: int = DEFAULT_MAX_ITEMS):
+        self.store = store
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self.max_items = max_items
+        self.subscriptions = {sub.sub_id: sub for sub in store.all()}
+        self.running = {}  # subscription id -> {'new': entries fetched, 'dates': upload dates}
+
+    def add(self, url: str, options: Dict[str, Any]) -> Subscription:
+        subscription = self.store.add(url, options)
+        self.subscriptions[subscription.sub_id] = subscription
+        return subscription
+
+    def remove(self, sub_id: int):
+        self.store.remove(sub_id)
+        self.subscriptions.pop(sub_id, None)
+
+    def due(self, now: Optional[float] = None, force: bool = False) -> List[Subscription]:
+        """Subscriptions to sync now, longest unchecked first, within the concurrency cap"""
+        now = time.time() if now is None else now
+        free = self.max_concurrent - len(self.running)
+        if free <= 0:
+            return []
+        candidates = [sub for sub in self.subscriptions.values() if sub.sub_id not in self.running and
+                      (force or sub.last_checked is None or now - sub.last_checked >= self.interval)]
+        candidates.sort(key=lambda sub: sub.last_checked or 0)
+        return candidates[:free]
+
+    def sync_options(self, subscription: Subscription) -> Dict[str, Any]:
+        """Download options for one incremental sync, marks the subscription as running"""
+        self.running[subscription.sub_id] = {'new': 0, 'dates': []}
+        return dict(subscription.options,
+                    url=subscription.url,
+                    playlist=True,
+                    subscription_id=subscription.sub_id,
+                    download_archive=str(self.store.archive_path(subscription.sub_id)),
+                    break_on_existing=True,
+                    date_after=subscription.last_upload_date,
+                    playlist_items=f"1:{self.max_items}")
+
+    def entry_finished(self, sub_id: int, info: Dict[str, Any]):
+        """Note an entry fetched by a running sync"""
+        state = self.running.get(sub_id)
+        if state is not None:
+            state['new'] += 1
+            if info.get('upload_date'):
+                state['dates'].append(str(info['upload_date']))
+
+    def sync_finished(self, sub_id: int, success: bool) -> Optional[Subscription]:
+        """Move the high-water mark past what this sync fetched"""
+        state = self.running.pop(sub_id, None)
+        subscription = self.subscriptions.get(sub_id)
+        if state is None or subscription is None:
+            return None
+        subscription.last_checked = time.time()
+        subscription.last_new = state['new']
+        if success and state['dates']:
+            subscription.last_upload_date = max([subscription.last_upload_date or ''] + state['dates'])
+        self.store.save_sync(subscription)
+        return subscription
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""Lease assignment and reassignment with a coordinator and agents on localhost
+
+Agents run a stub builder, so no yt-dlp or network access is needed.
+"""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cluster import Agent, Channel, Coordinator, filter_custom_args
+
+TOKEN = 'test-token'
+SCRIPTS = {
+    'stub://quick': "print('[download] 100.0% of 1.00MiB at 1.00MiB/s ETA 00:00')",
+    'stub://slow': "import time; print('started', flush=True); time.sleep(60)",
+}
+
+
+def wait_until(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+class StubBuilder:
+    """Stands in for CommandBuilder, runs a small Python script per stub URL"""
+
+    def __init__(self):
+        self.options = []
+
+    def build_download_command(self, options):
+        self.options.append(options)
+        return [sys.executable, '-c', SCRIPTS[options['url']]]
+
+
+class Handler:
+    """Records what the coordinator reports for one lease"""
+
+    def __init__(self):
+        self.lines = []
+        self.code = None
+        self.exited = threading.Event()
+        self.lost_message = None
+
+    def handle_output(self, line):
+        self.lines.append(line)
+
+    def process_exited(self, code):
+        self.code = code
+        self.exited.set()
+
+    def lost(self, message):
+        self.lost_message = message
+
+
+class ClusterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.TemporaryDirectory()
+        self.coordinator = Coordinator(port=0, token=TOKEN, host='127.0.0.1')
+        self.coordinator.start()
+        self.agents = []
+
+    def tearDown(self):
+        for agent in self.agents:
+            agent.stop()
+        self.coordinator.stop()
+        self.output.cleanup()
+
+    def start_agent(self, name, token=TOKEN, allowed_args=()):
+        agent = Agent('127.0.0.1', self.coordinator.port, token, self.output.name, slots=1, name=name,
+                      builder=StubBuilder(), allowed_args=allowed_args)
+        agent.result = None
+
+        def run():
+            agent.result = agent.run_forever()
+
+        agent.thread = threading.Thread(target=run, daemon=True)
+        agent.thread.start()
+        self.agents.append(agent)
+        return agent
+
+    def start_agents(self, count=2, **kwargs):
+        agents = [self.start_agent(f"agent{i}", **kwargs) for i in range(count)]
+        self.assertTrue(wait_until(lambda: self.coordinator.total_slots() == count))
+        return agents
+
+    def agent_named(self, agents, lease_id):
+        name = self.coordinator.agent_of(lease_id).split('@')[0]
+        return next(agent for agent in agents if agent.name == name)
+
+    def test_jobs_are_spread_over_agents(self):
+        agents = self.start_agents()
+        handlers = [Handler(), Handler()]
+        leases = [self.coordinator.assign({'url': 'stub://slow'}, handlers[0]),
+                  self.coordinator.assign({'url': 'stub://slow'}, handlers[1])]
+        self.assertNotIn(None, leases)
+        self.assertNotEqual(self.coordinator.agent_of(leases[0]), self.coordinator.agent_of(leases[1]))
+        self.assertEqual(self.coordinator.free_slots(), 0)
+        self.assertIsNone(self.coordinator.assign({'url': 'stub://quick'}, Handler()))
+
+        for lease_id in leases:
+            self.coordinator.cancel(lease_id)
+        for handler in handlers:
+            self.assertTrue(handler.exited.wait(10))
+            self.assertNotEqual(handler.code, 0)
+        self.assertTrue(wait_until(lambda: self.coordinator.free_slots() == 2))
+        self.assertEqual(len(agents), 2)
+
+    def test_output_and_exit_code_are_relayed(self):
+        agents = self.start_agents(1)
+        handler = Handler()
+        self.assertIsNotNone(self.coordinator.assign({'url': 'stub://quick', 'output_path': '/elsewhere'}, handler))
+        self.assertTrue(handler.exited.wait(10))
+        self.assertEqual(handler.code, 0)
+        self.assertTrue(any('100.0%' in line for line in handler.lines))
+        # Paths of the coordinator's machine are replaced by the agent's own
+        self.assertEqual(agents[0].builder.options[0]['output_path'], os.path.abspath(self.output.name))
+
+    def test_job_of_lost_agent_is_reassigned(self):
+        agents = self.start_agents()
+        first = Handler()
+        lease_id = self.coordinator.assign({'url': 'stub://slow'}, first)
+        self.assertTrue(wait_until(lambda: 'started' in first.lines))
+        lost_agent = self.agent_named(agents, lease_id)
+
+        lost_agent.stop()
+        self.assertTrue(wait_until(lambda: first.lost_message is not None))
+        self.assertTrue(wait_until(lambda: not lost_agent.processes))  # its download was stopped
+        self.assertEqual(self.coordinator.total_slots(), 1)
+
+        # The scheduler hands the job out again, it lands on the remaining agent
+        second = Handler()
+        lease_id = self.coordinator.assign({'url': 'stub://quick'}, second)
+        self.assertIsNotNone(lease_id)
+        self.assertIsNot(self.agent_named(agents, lease_id), lost_agent)
+        self.assertTrue(second.exited.wait(10))
+        self.assertEqual(second.code, 0)
+
+    def test_wrong_token_is_refused(self):
+        agent = self.start_agent('intruder', token='wrong')
+        agent.thread.join(10)
+        self.assertFalse(agent.thread.is_alive())
+        self.assertIs(agent.result, False)
+        self.assertEqual(self.coordinator.total_slots(), 0)
+
+    def test_agent_refuses_coordinator_without_token(self):
+        impostor = Coordinator(port=0, token='not-the-token', host='127.0.0.1')
+        impostor.start()
+        try:
+            agent = Agent('127.0.0.1', impostor.port, TOKEN, self.output.name, builder=StubBuilder())
+            self.assertFalse(agent.run_forever())
+        finally:
+            impostor.stop()
+
+    def test_custom_args_need_to_be_allowed(self):
+        agent = self.start_agents(1, allowed_args=('--limit-rate',))[0]
+        for custom_args in ('--exec "rm -rf ~"', '--limit-rate 1M'):
+            handler = Handler()
+            self.coordinator.assign({'url': 'stub://quick', 'custom_args': custom_args}, handler)
+            self.assertTrue(handler.exited.wait(10))
+        self.assertEqual([options['custom_args'] for options in agent.builder.options], ['', '--limit-rate 1M'])
+
+    def test_filter_custom_args(self):
+        self.assertEqual(filter_custom_args('--limit-rate=1M --retries 3', ('--limit-rate', '--retries')),
+                         '--limit-rate=1M --retries 3')
+        self.assertIsNone(filter_custom_args('--retries 3 --exec x', ('--retries',)))
+        self.assertIsNone(filter_custom_args('--retries 3', ()))
+
+    def test_unsigned_messages_are_rejected(self):
+        left, right = socket.socketpair()
+        sender, receiver = Channel(left), Channel(right)
+        try:
+            sender.secure(b'k' * 32)
+            receiver.secure(b'k' * 32)
+            sender.send({'type': 'heartbeat'})
+            self.assertEqual(receiver.receive(), {'type': 'heartbeat'})
+            left.sendall(b'{"type": "assign", "lease": "x", "options": {}}\n')
+            self.assertIsNone(receiver.receive())
+        finally:
+            sender.close()
+            receiver.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -42,7 +42,7 @@ QLineEdit, QComboBox {
     background-color: #ffffff;
     color: #000000;
 }
-QTextEdit {
+QTextEdit, QPlainTextEdit {
     background-color: #ffffff;
     color: #000000;
     border: 1px solid #ccc;
@@ -141,7 +141,7 @@ QLineEdit, QComboBox {
     background-color: #3c3c3c;
     color: #ffffff;
 }
-QTextEdit {
+QTextEdit, QPlainTextEdit {
     background-color: #3c3c3c;
     color: #ffffff;
     border: 1px solid #555555;
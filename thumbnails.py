@@ -0,0 +1,207 @@
+import hashlib
+import os
+import tempfile
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QSize, Qt, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+from paths import APP_CACHE_DIR
+
+
+DEFAULT_CACHE_DIR = APP_CACHE_DIR / "thumbnails"
+DEFAULT_THUMBNAIL_SIZE = QSize(320, 180)
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_CONCURRENT = 4
+FETCH_TIMEOUT = 15
+
+
+class ThumbnailDiskCache:
+    """On-disk cache of raw thumbnail bytes keyed by URL, with ETag sidecars"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def load(self, url: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Return cached (data, etag) for a URL, or (None, None)"""
+        key = self._key(url)
+        data_path = self.cache_dir / f"{key}.img"
+        etag_path = self.cache_dir / f"{key}.etag"
+        try:
+            data = data_path.read_bytes()
+        except OSError:
+            return None, None
+        try:
+            etag = etag_path.read_text(encoding='utf-8').strip() or None
+        except OSError:
+            etag = None
+        return data, etag
+
+    def store(self, url: str, data: bytes, etag: Optional[str] = None):
+        """Store thumbnail bytes (and ETag if the server sent one)"""
+        key = self._key(url)
+        self._write_atomic(self.cache_dir / f"{key}.img", data)
+        etag_path = self.cache_dir / f"{key}.etag"
+        if etag:
+            self._write_atomic(etag_path, etag.encode('utf-8'))
+        elif etag_path.exists():
+            etag_path.unlink()
+
+    def _write_atomic(self, path: Path, data: bytes):
+        # Write to a temp file first so a concurrent reader never sees half a file
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def fetch_thumbnail(url: str, disk_cache: ThumbnailDiskCache, timeout: int = FETCH_TIMEOUT) -> bytes:
+    """Fetch thumbnail bytes, revalidating against the disk cache with the stored ETag"""
+    cached_data, etag = disk_cache.load(url)
+    if cached_data is not None and not etag:
+        # Nothing to revalidate against, thumbnails rarely change
+        return cached_data
+
+    request = urllib.request.Request(url, headers={'User-Agent': 'yt-dlp-gui'})
+    if etag:
+        request.add_header('If-None-Match', etag)
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = response.read()
+            disk_cache.store(url, data, response.headers.get('ETag'))
+            return data
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and cached_data is not None:
+            return cached_data
+        raise
+    except (urllib.error.URLError, OSError):
+        if cached_data is not None:
+            return cached_data
+        raise
+
+
+class _ThumbnailTaskSignals(QObject):
+    """Signals for a thumbnail task (QRunnable cannot emit signals itself)"""
+
+    loaded = Signal(str, QImage)
+    failed = Signal(str, str)
+
+
+class _ThumbnailTask(QRunnable):
+    """Fetch and decode one thumbnail on a pool thread"""
+
+    def __init__(self, url: str, size: QSize, disk_cache: ThumbnailDiskCache, signals: _ThumbnailTaskSignals):
+        super().__init__()
+        self.url = url
+        self.size = size
+        self.disk_cache = disk_cache
+        self.signals = signals
+
+    def run(self):
+        try:
+            data = fetch_thumbnail(self.url, self.disk_cache)
+            image = QImage.fromData(data)
+            if image.isNull():
+                self.signals.failed.emit(self.url, "Could not decode thumbnail")
+                return
+            # Scale here so the GUI thread only has to wrap the result
+            image = image.scaled(self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.signals.loaded.emit(self.url, image)
+        except Exception as e:
+            self.signals.failed.emit(self.url, str(e))
+
+
+class ThumbnailLoader(QObject):
+    """Async thumbnail loader with a bounded LRU of scaled pixmaps"""
+
+    thumbnail_ready = Signal(str, QPixmap)
+    thumbnail_failed = Signal(str, str)
+
+    def __init__(self, parent=None, size: QSize = DEFAULT_THUMBNAIL_SIZE,
+                 max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 cache_dir: Optional[Path] = None):
+        super().__init__(parent)
+        self.size = size
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_cache = ThumbnailDiskCache(cache_dir)
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_concurrent)
+
+        self._memory = OrderedDict()  # url -> QPixmap, oldest first
+        self._memory_bytes = 0
+        self._pending = {}  # url -> task signals (kept alive until the task reports)
+
+    def cached(self, url: str) -> Optional[QPixmap]:
+        """Return the pixmap for a URL if it is already in memory"""
+        pixmap = self._memory.get(url)
+        if pixmap is not None:
+            self._memory.move_to_end(url)
+        return pixmap
+
+    def request(self, url: str) -> Optional[QPixmap]:
+        """Return the pixmap if cached, otherwise start loading it and return None"""
+        if not url:
+            return None
+
+        pixmap = self.cached(url)
+        if pixmap is not None:
+            return pixmap
+
+        if url not in self._pending:
+            signals = _ThumbnailTaskSignals()
+            signals.loaded.connect(self._on_loaded)
+            signals.failed.connect(self._on_failed)
+            self._pending[url] = signals
+            self.pool.start(_ThumbnailTask(url, self.size, self.disk_cache, signals))
+        return None
+
+    def clear(self):
+        """Drop all in-memory pixmaps"""
+        self._memory.clear()
+        self._memory_bytes = 0
+
+    def _on_loaded(self, url: str, image: QImage):
+        self._pending.pop(url, None)
+        # QPixmap must be created on the GUI thread
+        pixmap = QPixmap.fromImage(image)
+        self._insert(url, pixmap)
+        self.thumbnail_ready.emit(url, pixmap)
+
+    def _on_failed(self, url: str, error: str):
+        self._pending.pop(url, None)
+        self.thumbnail_failed.emit(url, error)
+
+    def _insert(self, url: str, pixmap: QPixmap):
+        old = self._memory.pop(url, None)
+        if old is not None:
+            self._memory_bytes -= self._pixmap_bytes(old)
+
+        self._memory[url] = pixmap
+        self._memory_bytes += self._pixmap_bytes(pixmap)
+
+        # Evict least recently used, but always keep the newest entry
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= self._pixmap_bytes(evicted)
+
+    @staticmethod
+    def _pixmap_bytes(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
@@ -0,0 +1,232 @@
+import hashlib
+import math
+import re
+from typing import Callable, Iterable, List, Optional, Tuple
+
+
+# Query parameters that never change what gets downloaded
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'igsh', 'si', 'feature',
+    'ref', 'ref_src', 'ref_url', 'pp', 'ab_channel', 't', 'start', 'time_continue',
+    'is_from_webapp', 'sender_device',
+    'mc_cid', 'mc_eid', '_ga', 'spm', 'embeds_referring_euri', 'embeds_referring_origin',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+# Site host -> [(site, regex over the path and query)], the first group is the id
+_YOUTUBE_ID = r'([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])'
+_YOUTUBE_PATTERNS = [
+    ('youtube', re.compile(r'/watch/?\?(?:[^#]*&)?v=' + _YOUTUBE_ID)),
+    ('youtube', re.compile(r'/(?:shorts|embed|live|v|e)/' + _YOUTUBE_ID)),
+    ('youtube:playlist', re.compile(r'/playlist\?(?:[^#]*&)?list=([\w-]+)')),
+]
+SITE_PATTERNS = {
+    'youtube.com': _YOUTUBE_PATTERNS,
+    'music.youtube.com': _YOUTUBE_PATTERNS,
+    'youtube-nocookie.com': _YOUTUBE_PATTERNS,
+    'youtu.be': [('youtube', re.compile(r'/' + _YOUTUBE_ID))],
+    'twitch.tv': [('twitch', re.compile(r'/videos/(\d+)')),
+                  ('twitch:clip', re.compile(r'/\w+/clip/([\w-]+)'))],
+    'clips.twitch.tv': [('twitch:clip', re.compile(r'/([\w-]+)'))],
+    'twitter.com': [('twitter', re.compile(r'/\w+/status(?:es)?/(\d+)'))],
+    'x.com': [('twitter', re.compile(r'/\w+/status(?:es)?/(\d+)'))],
+    'vimeo.com': [('vimeo', re.compile(r'/(?:video/)?(\d+)'))],
+    'tiktok.com': [('tiktok', re.compile(r'/@[\w.-]+/video/(\d+)'))],
+    'instagram.com': [('instagram', re.compile(r'/(?:[\w.]+/)?(?:p|reel|reels|tv)/([\w-]+)'))],
+    'dailymotion.com': [('dailymotion', re.compile(r'/video/([a-z0-9]+)'))],
+    'dai.ly': [('dailymotion', re.compile(r'/([a-z0-9]+)'))],
+    'reddit.com': [('reddit', re.compile(r'/r/\w+/comments/(\w+)'))],
+}
+_YOUTUBE_LIST_RE = re.compile(r'[?&]list=([\w-]+)')
+
+# Splits a URL into scheme, host (without www./m.) and the rest, much cheaper than urlsplit
+_URL_RE = re.compile(r'^(?:([a-zA-Z][a-zA-Z0-9+.-]*)://)?(?:[^/?#@]*@)?(?:www\.|m\.|mobile\.)?([^/?#:]+)(:\d+)?([^#]*)')
+
+# How each site's canonical URL is rebuilt from its id
+CANONICAL_URLS = {
+    'youtube': 'https://www.youtube.com/watch?v={}',
+    'youtube:playlist': 'https://www.youtube.com/playlist?list={}',
+    'twitch': 'https://www.twitch.tv/videos/{}',
+    'twitch:clip': 'https://clips.twitch.tv/{}',
+    'twitter': 'https://x.com/i/status/{}',
+    'vimeo': 'https://vimeo.com/{}',
+    'tiktok': 'https://www.tiktok.com/@_/video/{}',
+    'instagram': 'https://www.instagram.com/p/{}/',
+    'dailymotion': 'https://www.dailymotion.com/video/{}',
+    'reddit': 'https://www.reddit.com/comments/{}',
+}
+
+
+def canonicalize(url: str, playlist: bool = False) -> Tuple[str, str]:
+    """Reduce a URL to a (site, id) key
+
+    Known sites give their media id, e.g. ('youtube', 'dQw4w9WgXcQ') for both
+    youtu.be/dQw4w9WgXcQ and youtube.com/watch?v=dQw4w9WgXcQ&t=30. Anything
+    else gives ('url', normalized URL) with tracking parameters removed. With
+    playlist=True a YouTube watch URL with a list= parameter keys on the list.
+    """
+    match = _URL_RE.match(url.strip())
+    if not match:
+        return 'url', url.strip()
+    scheme, host, port, rest = match.groups()
+    host = host.lower()
+
+    patterns = SITE_PATTERNS.get(host)
+    if patterns is None and host.count('.') > 1:
+        # Subdomains like gaming.youtube.com share their parent's patterns
+        patterns = SITE_PATTERNS.get(host.split('.', 1)[1])
+    if patterns:
+        if playlist and patterns is _YOUTUBE_PATTERNS:
+            list_match = _YOUTUBE_LIST_RE.search(rest)
+            if list_match:
+                return 'youtube:playlist', list_match.group(1)
+        for site, pattern in patterns:
+            site_match = pattern.match(rest)
+            if site_match:
+                return site, site_match.group(1)
+
+    return 'url', _normalize(scheme, host, port, rest)
+
+
+def _normalize(scheme: Optional[str], host: str, port: Optional[str], rest: str) -> str:
+    scheme = (scheme or 'https').lower()
+    if scheme == 'http':
+        scheme = 'https'
+    if port in (':80', ':443'):
+        port = None
+
+    path, _, query = rest.partition('?')
+    path = path.rstrip('/') or '/'
+    if query:
+        params = sorted(param for param in query.split('&') if param and
+                        param.split('=', 1)[0].lower() not in TRACKING_PARAMS and
+                        not param.lower().startswith(TRACKING_PREFIXES))
+        query = '&'.join(params)
+    return f"{scheme}://{host}{port or ''}{path}{'?' + query if query else ''}"
+
+
+def url_host(url: str) -> str:
+    """Lowercase host of a URL without www./m. prefixes, '' if there is none"""
+    match = _URL_RE.match(url.strip())
+    return match.group(2).lower() if match else ''
+
+
+def normalize_url(url: str) -> str:
+    """Lowercase scheme/host, drop www., fragments and tracking parameters, sort the query"""
+    match = _URL_RE.match(url.strip())
+    if not match:
+        return url.strip()
+    scheme, host, port, rest = match.groups()
+    return _normalize(scheme, host.lower(), port, rest)
+
+
+def canonical_url(key: Tuple[str, str]) -> str:
+    """URL to download for a canonical key"""
+    site, media_id = key
+    template = CANONICAL_URLS.get(site)
+    return template.format(media_id) if template else media_id
+
+
+def key_string(key: Tuple[str, str]) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+def split_url_list(text: str) -> List[str]:
+    """Split pasted text into URL candidates (one per line or whitespace separated)"""
+    return [token for token in text.split() if '.' in token or '/' in token]
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set, no false negatives
+
+    Uses a bit array sized for `capacity` items at `error_rate` false positives
+    and double hashing over one BLAKE2b digest per item.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _hashes(self, item: str) -> Tuple[int, int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def add(self, item: str) -> bool:
+        """Add an item, returns False if it was (probably) already present"""
+        h1, h2 = self._hashes(item)
+        bits = self.bits
+        size = self.size
+        present = True
+        # Check and set in one pass, setting an already set bit is harmless
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                present = False
+                bits[position >> 3] |= mask
+        if not present:
+            self.count += 1
+        return not present
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % self.size
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class SeenSet:
+    """URLs seen this session, keyed by their canonical form
+
+    An exact hash set by default. For very large ingests a Bloom filter can
+    be used instead to bound memory, at the cost of rarely dropping a new
+    URL as a false duplicate.
+    """
+
+    def __init__(self, bloom_capacity: Optional[int] = None, error_rate: float = 1e-4):
+        self._bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self._exact = set()
+
+    def add(self, key: Tuple[str, str]) -> bool:
+        """Mark a key as seen, returns False if it was seen before"""
+        item = key_string(key)
+        if self._bloom is not None:
+            return self._bloom.add(item)
+        if item in self._exact:
+            return False
+        self._exact.add(item)
+        return True
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        item = key_string(key)
+        if self._bloom is not None:
+            return item in self._bloom
+        return item in self._exact
+
+    def __len__(self) -> int:
+        return self._bloom.count if self._bloom is not None else len(self._exact)
+
+    def filter_new(self, urls: Iterable[str], playlist: bool = False,
+                   is_valid: Optional[Callable[[str], bool]] = None) -> Tuple[List[str], int]:
+        """The first occurrence of each not yet seen entry, plus the number of duplicates dropped
+
+        Keys only decide what is a duplicate, the URLs are returned as given
+        (canonical URLs would lose e.g. the hash of unlisted Vimeo videos).
+        URLs failing is_valid are dropped without being remembered as seen.
+        """
+        new_urls = []
+        duplicates = 0
+        for url in urls:
+            key = canonicalize(url, playlist)
+            if key in self:
+                duplicates += 1
+            elif is_valid is None or is_valid(url):
+                self.add(key)
+                new_urls.append(url.strip())
+        return new_urls, duplicates
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from paths import APP_CACHE_DIR
+
+
+DEFAULT_BLOB_DIR = APP_CACHE_DIR / "info"
+BLOB_MAX_AGE = 7 * 24 * 3600
+
+# Values that repeat across formats and videos, stored once
+_INTERNED_FORMAT_FIELDS = ('format_id', 'ext', 'protocol', 'resolution', 'vcodec', 'acodec',
+                           'format_note', 'dynamic_range')
+_INTERNED_VIDEO_FIELDS = ('extractor', 'extractor_key', 'uploader', 'channel', 'ext',
+                          'vcodec', 'acodec', 'resolution')
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class FormatInfo:
+    """One entry of an info dict's formats, without URLs, headers or fragment lists"""
+
+    __slots__ = ('format_id', 'ext', 'protocol', 'resolution', 'width', 'height', 'fps', 'vcodec',
+                 'acodec', 'dynamic_range', 'tbr', 'filesize', 'filesize_approx', 'format_note')
+
+    def __init__(self, fmt: Dict[str, Any]):
+        for name in self.__slots__:
+            setattr(self, name, fmt.get(name))
+        for name in _INTERNED_FORMAT_FIELDS:
+            setattr(self, name, _intern(getattr(self, name)))
+
+    def get(self, key: str, default=None):
+        """dict.get() over the kept fields"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+
+class VideoInfo:
+    """The parts of yt-dlp's info JSON the GUI uses
+
+    The full JSON (fragment lists, http_headers, automatic_captions, ...)
+    can be megabytes per video. It is written compressed to the blob store
+    and only read back by raw(), e.g. when the Raw Data tab is opened.
+    """
+
+    __slots__ = ('id', 'title', 'uploader', 'channel', 'upload_date', 'duration', 'view_count',
+                 'like_count', 'webpage_url', 'extractor', 'extractor_key', 'thumbnail', 'description',
+                 'filesize', 'filesize_approx', 'width', 'height', 'fps', 'vcodec', 'acodec', 'resolution',
+                 'format', 'ext', 'formats', 'requested_formats', 'blob_path')
+
+    def __init__(self, info: Dict[str, Any], blob_path: Optional[str] = None):
+        for name in self.__slots__:
+            setattr(self, name, info.get(name))
+        for name in _INTERNED_VIDEO_FIELDS:
+            setattr(self, name, _intern(getattr(self, name)))
+        self.formats = tuple(FormatInfo(fmt) for fmt in info.get('formats') or ())
+        self.requested_formats = tuple(FormatInfo(fmt) for fmt in info.get('requested_formats') or ())
+        self.blob_path = blob_path
+
+    @classmethod
+    def from_json(cls, text: str, store: Optional['InfoBlobStore'] = None) -> 'VideoInfo':
+        """Parse --dump-json output, keeping the full text in store"""
+        info = json.loads(text)
+        blob_path = None
+        if store is not None:
+            try:
+                blob_path = store.put(info, text)
+            except OSError:
+                pass  # raw() falls back to the kept fields
+        return cls(info, blob_path)
+
+    def get(self, key: str, default=None):
+        """dict.get() over the kept fields, so code written for info dicts keeps working"""
+        value = getattr(self, key, None) if key in self.__slots__ and key != 'blob_path' else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The kept fields as an info dict"""
+        info = {name: getattr(self, name) for name in self.__slots__
+                if name not in ('formats', 'requested_formats', 'blob_path') and getattr(self, name) is not None}
+        info['formats'] = [fmt.to_dict() for fmt in self.formats]
+        if self.requested_formats:
+            info['requested_formats'] = [fmt.to_dict() for fmt in self.requested_formats]
+        return info
+
+    def raw(self) -> Dict[str, Any]:
+        """The full info JSON, read back from the blob store"""
+        if self.blob_path:
+            try:
+                return InfoBlobStore.load(self.blob_path)
+            except (OSError, ValueError, EOFError):
+                pass
+        return self.to_dict()
+
+    def __repr__(self):
+        return f"VideoInfo({self.extractor_key}, {self.id!r}, {len(self.formats)} formats)"
+
+
+class InfoBlobStore:
+    """Compressed info JSON on disk, one file per video, removed after BLOB_MAX_AGE"""
+
+    def __init__(self, directory: Optional[Path] = None, max_age: float = BLOB_MAX_AGE):
+        self.directory = Path(directory) if directory else DEFAULT_BLOB_DIR
+        self.max_age = max_age
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def put(self, info: Dict[str, Any], text: str) -> str:
+        key = f"{info.get('extractor_key') or info.get('extractor')}\0{info.get('id') or text[:4096]}"
+        path = self.directory / (hashlib.sha1(key.encode('utf-8', 'replace')).hexdigest() + '.json.gz')
+        tmp_path = path.with_suffix('.tmp')
+        # Level 1: the text shrinks to a fraction at little CPU cost
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        return str(path)
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Any]:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def prune(self) -> int:
+        """Remove blobs older than max_age, returns the number removed"""
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for path in self.directory.glob('*.json.gz'):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
\ No newline at end of file
@@ -1,9 +1,27 @@
 import subprocess
 import json
-from typing import List
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
 
 from PySide6.QtCore import QObject, Signal
 
+from command import BREAK_EXIT_CODE, FILEPATH_MARKER, LIBRARY_INFO_MARKER
+from dedup import Deduplicator, HashIndex, MODE_HARDLINK
+from livecapture import LiveCapture
+from harvest import Harvester
+from retry import LOST, classify_failure
+from scratch import move_finished
+from streams import StreamProgress, select_stream_pair
+from videoinfo import VideoInfo
+from sponsorcut import cut_file
+
+# "[download]  45.2% of  512.00MiB at    8.00MiB/s ETA 01:02"
+_SPEED_RE = re.compile(r'\bat\s+(\d+\.?\d*)([KMGT]?)i?B/s')
+_SPEED_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
 
 class DownloadWorker(QObject):
     """Worker class for handling yt-dlp downloads in a separate thread"""
@@ -11,16 +29,31 @@ class DownloadWorker(QObject):
     output_received = Signal(str)
     progress_updated = Signal(int)
     download_finished = Signal(bool, str)  # success, message
+    job_progress = Signal(str, int)  # job id, percent
+    job_speed = Signal(str, float)  # job id, bytes per second
+    job_finished = Signal(str, bool, str, str)  # job id, success, message, failure kind
+    file_completed = Signal(str, str)  # job id, final file path
+    file_info = Signal(str, str, dict)  # job id, final file path, metadata for the library
+    start_requested = Signal(list)  # yt-dlp command, emitted once the worker is on its thread
     
-    def __init__(self):
+    def __init__(self, job_id: str = '', scratch_path: str = None, destination: str = None):
         super().__init__()
+        self.start_requested.connect(self.start_download)
+        self.job_id = job_id
+        self.scratch_path = scratch_path  # where yt-dlp writes, finished files are moved to destination
+        self.destination = destination
         self.process = None
         self.should_stop = False
+        self.recent_output = deque(maxlen=50)  # kept to classify failures
+        self.last_file = None
     
     def start_download(self, command: List[str]):
-        """Start the download process"""
+        """Start the download process, a Stop pressed before it started is kept"""
+        self.run_command(command)
+    
+    def run_command(self, command: List[str]):
+        """Run yt-dlp to the end, stopping early once should_stop is set"""
         try:
-            self.should_stop = False
             self.process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
@@ -41,36 +74,82 @@ class DownloadWorker(QObject):
                     break
                 
                 if output:
-                    self.output_received.emit(output.strip())
-                    
-                    # Try to parse progress
-                    if '[download]' in output and '%' in output:
-                        try:
-                            # Extract percentage from output like "[download] 45.2% of 123MB"
-                            import re
-                            match = re.search(r'(\d+\.?\d*)%', output)
-                            if match:
-                                progress = int(float(match.group(1)))
-                                self.progress_updated.emit(progress)
-                        except:
-                            pass
-            
-            # Get return code
-            return_code = self.process.poll()
-            success = return_code == 0 and not self.should_stop
+                    self.handle_output(output)
             
-            if self.should_stop:
-                self.download_finished.emit(False, "Download cancelled by user")
-            elif success:
-                self.download_finished.emit(True, "Download completed successfully!")
-            else:
-                self.download_finished.emit(False, f"Download failed with exit code: {return_code}")
+            self.process_exited(self.process.poll())
                 
         except Exception as e:
-            self.download_finished.emit(False, f"Error during download: {str(e)}")
+            self.recent_output.append(f"ERROR: {e}")
+            self.finish(False, f"Error during download: {str(e)}", None)
         finally:
             self.process = None
     
+    def handle_output(self, output: str):
+        """Log one line of yt-dlp output and act on files and progress it reports"""
+        self.output_received.emit(output.strip())
+        self.recent_output.append(output.strip())
+        
+        if output.startswith(FILEPATH_MARKER):
+            self.file_done(output[len(FILEPATH_MARKER):].strip())
+        elif output.startswith(LIBRARY_INFO_MARKER) and self.last_file:
+            try:
+                info = json.loads(output[len(LIBRARY_INFO_MARKER):])
+                self.file_info.emit(self.job_id, self.last_file, info)
+            except ValueError:
+                pass
+        
+        # Try to parse progress
+        if '[download]' in output and '%' in output:
+            try:
+                # Extract percentage from output like "[download] 45.2% of 123MB"
+                match = re.search(r'(\d+\.?\d*)%', output)
+                if match:
+                    progress = int(float(match.group(1)))
+                    self.progress_updated.emit(progress)
+                    self.job_progress.emit(self.job_id, progress)
+                match = _SPEED_RE.search(output)
+                if match:
+                    self.job_speed.emit(self.job_id, float(match.group(1)) * _SPEED_UNITS[match.group(2)])
+            except:
+                pass
+    
+    def file_done(self, path: str):
+        """A file yt-dlp has finished and moved into place"""
+        self.last_file = self.move_to_destination(path)
+        self.file_completed.emit(self.job_id, self.last_file)
+    
+    def process_exited(self, return_code):
+        """Report the download's outcome from yt-dlp's exit code"""
+        # 101: stopped early by --break-on-existing/--break-match-filters, nothing new left
+        success = return_code in (0, BREAK_EXIT_CODE) and not self.should_stop
+        
+        if self.should_stop:
+            self.finish(False, "Download cancelled by user", return_code)
+        elif success:
+            self.finish(True, "Download completed successfully!", return_code)
+        else:
+            self.finish(False, f"Download failed with exit code: {return_code}", return_code)
+    
+    def move_to_destination(self, path: str) -> str:
+        """Move a file finished in the scratch directory, returns its final path"""
+        if not self.scratch_path:
+            return path
+        try:
+            moved = move_finished(path, self.scratch_path, self.destination)
+        except OSError as e:
+            self.output_received.emit(f"ERROR: could not move {path} to {self.destination}: {e}")
+            return path
+        return moved[0]
+    
+    def finish(self, success: bool, message: str, return_code=None):
+        """Report the end of the download"""
+        failure = ''
+        if not success:
+            failure = classify_failure(return_code, '\n'.join(self.recent_output), self.should_stop)
+            message = f"{message} ({failure})"
+        self.download_finished.emit(success, message)
+        self.job_finished.emit(self.job_id, success, message, failure)
+    
     def stop_download(self):
         """Stop the current download"""
         self.should_stop = True
@@ -81,11 +160,216 @@ class DownloadWorker(QObject):
                 pass
 
 
+class RemoteWorker(DownloadWorker):
+    """DownloadWorker for a job leased to a worker agent, fed from the Coordinator's threads"""
+    
+    def __init__(self, job_id: str, coordinator):
+        super().__init__(job_id)
+        self.coordinator = coordinator
+        self.lease_id = None
+    
+    def start_remote(self, options: Dict[str, Any]) -> bool:
+        """Lease the job to an agent, False if none has a free slot"""
+        self.lease_id = self.coordinator.assign(options, self)
+        return self.lease_id is not None
+    
+    def file_done(self, path: str):
+        # On the agent's disk, out of reach for dedup and the library index
+        self.output_received.emit(f"[agent] Saved {path}")
+    
+    def lost(self, message: str):
+        """The agent went away, the job goes back to the queue"""
+        if self.should_stop:
+            self.finish(False, "Download cancelled by user")
+            return
+        self.download_finished.emit(False, message)
+        self.job_finished.emit(self.job_id, False, message, LOST)
+    
+    def stop_download(self):
+        self.should_stop = True
+        self.coordinator.cancel(self.lease_id)
+
+
+class SplitStreamWorker(DownloadWorker):
+    """DownloadWorker fetching the video and the audio stream of a job at the same time
+    
+    Both streams are saved under the names yt-dlp gives merge inputs, the
+    regular download command for the pair then finds them, merges them
+    with a stream copy and runs the usual post-processing.
+    """
+    
+    STREAM_LABELS = ('video', 'audio')
+    
+    split_requested = Signal(dict)  # job options, emitted once the worker is on its thread
+    
+    def __init__(self, job_id: str, scratch_path: str, destination: str, command_builder, info: VideoInfo = None):
+        super().__init__(job_id, scratch_path, destination)
+        self.split_requested.connect(self.start_split)
+        self.command_builder = command_builder
+        self.info = info
+        self.processes = []
+        self._lock = threading.Lock()
+    
+    def start_split(self, options: Dict[str, Any]):
+        """Fetch both streams in parallel, then merge; a plain download when there is no pair"""
+        try:
+            info = self.info or self.fetch_info(options)
+            quality = 'worst' if options.get('format') == 'worst' else options.get('quality', 'best')
+            pair = select_stream_pair(info, quality, options.get('format', 'best')) if info else None
+            if pair is None:
+                self.output_received.emit("No separate video and audio streams, downloading the combined format")
+                self.run_command(self.command_builder.build_download_command(options))
+                return
+            
+            video, audio = pair
+            self.output_received.emit(f"Fetching video {video.format_id} and audio {audio.format_id} in parallel")
+            return_code = self.fetch_streams(options, [video, audio])
+            if return_code != 0 or self.should_stop:
+                self.process_exited(return_code)
+                return
+            
+            options = dict(options, format_pair=f"{video.format_id}+{audio.format_id}")
+            self.run_command(self.command_builder.build_download_command(options))
+        except Exception as e:
+            self.recent_output.append(f"ERROR: {e}")
+            self.finish(False, f"Error during download: {str(e)}", None)
+    
+    def fetch_info(self, options: Dict[str, Any]):
+        """Info of a job queued without it, None if yt-dlp cannot get it"""
+        try:
+            result = subprocess.run(self.command_builder.build_info_command(options),
+                                    capture_output=True, text=True, timeout=30)
+            if result.returncode == 0:
+                return VideoInfo.from_json(result.stdout)
+        except (subprocess.TimeoutExpired, OSError, ValueError):
+            pass
+        return None
+    
+    def fetch_streams(self, options: Dict[str, Any], formats: list) -> int:
+        """Run one yt-dlp per format at the same time, returns the first non-zero exit code or 0"""
+        progress = StreamProgress([fmt.filesize or fmt.filesize_approx for fmt in formats])
+        self.processes = []
+        try:
+            for fmt in formats:
+                self.processes.append(subprocess.Popen(
+                    self.command_builder.build_stream_command(options, fmt.format_id),
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1))
+        except (ValueError, OSError):
+            # Do not leave the streams already started downloading for a failed job
+            self.terminate_streams()
+            for process in self.processes:
+                process.wait()
+            self.processes = []
+            raise
+        if self.should_stop:
+            self.terminate_streams()  # cancelled while they were starting
+        readers = [threading.Thread(target=self.read_stream, args=(index, process, progress), daemon=True)
+                   for index, process in enumerate(self.processes)]
+        for reader in readers:
+            reader.start()
+        
+        return_codes = []
+        for process in self.processes:
+            return_code = process.wait()
+            if return_code != 0:
+                # No point finishing the other stream
+                self.terminate_streams()
+            return_codes.append(return_code)
+        for reader in readers:
+            reader.join()
+        self.processes = []
+        return next((code for code in return_codes if code != 0), 0)
+    
+    def read_stream(self, index: int, process: subprocess.Popen, progress: StreamProgress):
+        """Log the output of one stream, folding its progress into the combined line"""
+        label = self.STREAM_LABELS[index]
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            with self._lock:
+                if progress.update(index, line):
+                    if progress.fractions[index] >= 1.0:
+                        progress.finished(index)
+                    self.progress_updated.emit(int(progress.percent))
+                    self.job_progress.emit(self.job_id, int(progress.percent))
+                    self.job_speed.emit(self.job_id, progress.speed)
+                    self.output_received.emit(progress.line())
+                else:
+                    self.output_received.emit(f"[{label}] {line}")
+                    self.recent_output.append(f"[{label}] {line}")
+    
+    def terminate_streams(self):
+        for process in self.processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+    
+    def stop_download(self):
+        super().stop_download()
+        self.terminate_streams()
+
+
+class LiveCaptureWorker(QObject):
+    """Worker class for recording a live stream into rolling segments"""
+    
+    output_received = Signal(str)
+    job_finished = Signal(str, bool, str, str)  # job id, success, message, failure kind
+    
+    def __init__(self, job_id: str, capture: LiveCapture):
+        super().__init__()
+        self.job_id = job_id
+        self.capture = capture
+        self.should_stop = False
+        self.recent_output = deque(maxlen=50)
+    
+    def on_output(self, line: str):
+        self.recent_output.append(line)
+        self.output_received.emit(line)
+    
+    def run(self):
+        """Capture until the stream ends or stop_download() is called"""
+        try:
+            ytdlp_code, ffmpeg_code = self.capture.run(self.on_output)
+        except Exception as e:
+            self.recent_output.append(f"ERROR: {e}")
+            self.finish(False, f"Error during live capture: {e}", None)
+            return
+        
+        kept = len(self.capture.window.segments)
+        if ffmpeg_code != 0 and not kept:
+            self.finish(False, f"Live capture failed, ffmpeg exit code: {ffmpeg_code}", ytdlp_code)
+        elif self.should_stop or ytdlp_code == 0:
+            # Stopping is how a capture normally ends, what was recorded is complete
+            self.finish(True, f"Live capture ended, {kept} segment(s) kept", ytdlp_code)
+        else:
+            self.finish(False, f"Live capture interrupted with exit code: {ytdlp_code}", ytdlp_code)
+    
+    def finish(self, success: bool, message: str, return_code=None):
+        failure = ''
+        if not success:
+            failure = classify_failure(return_code, '\n'.join(self.recent_output))
+            message = f"{message} ({failure})"
+        self.job_finished.emit(self.job_id, success, message, failure)
+    
+    def stop_download(self):
+        """Stop recording, the current segment is closed normally"""
+        self.should_stop = True
+        self.capture.stop()
+
+
 class InfoWorker(QObject):
     """Worker class for getting video information"""
     
-    info_received = Signal(dict)
+    info_received = Signal(object)  # VideoInfo
     error_occurred = Signal(str)
+    info_requested = Signal(list)  # yt-dlp command, emitted once the worker is on its thread
+    
+    def __init__(self, blob_store=None):
+        super().__init__()
+        self.info_requested.connect(self.get_info)
+        self.blob_store = blob_store  # where the full JSON is kept, see VideoInfo.raw()
     
     def get_info(self, command: List[str]):
         """Get video information"""
@@ -94,7 +378,8 @@ class InfoWorker(QObject):
             
             if result.returncode == 0:
                 try:
-                    info = json.loads(result.stdout)
+                    # Parsed here so the GUI thread only ever sees the compact form
+                    info = VideoInfo.from_json(result.stdout, self.blob_store)
                     self.info_received.emit(info)
                 except json.JSONDecodeError as e:
                     self.error_occurred.emit(f"Error parsing video information: {str(e)}")
@@ -104,4 +389,102 @@ class InfoWorker(QObject):
         except subprocess.TimeoutExpired:
             self.error_occurred.emit("Timeout while getting video information")
         except Exception as e:
-            self.error_occurred.emit(f"Error getting video info: {str(e)}")
\ No newline at end of file
+            self.error_occurred.emit(f"Error getting video info: {str(e)}")
+
+
+class DedupWorker(QObject):
+    """Worker class for hashing finished files and linking duplicates"""
+    
+    output_received = Signal(str)
+    dedup_finished = Signal(int, 'qint64')  # files linked, bytes reclaimed
+    
+    def __init__(self, index_path=None):
+        super().__init__()
+        self.index_path = index_path
+        self.deduplicator = None
+    
+    def process(self, paths: list, mode: str = MODE_HARDLINK):
+        """Index finished files and replace duplicates with links"""
+        try:
+            # The SQLite connection has to be created on this worker's thread
+            if self.deduplicator is None:
+                self.deduplicator = Deduplicator(HashIndex(self.index_path))
+            self.deduplicator.mode = mode
+            
+            result = self.deduplicator.process(paths)
+            for duplicate, original, link_mode in result.linked:
+                self.output_received.emit(f"Deduplicated {duplicate} -> {original} ({link_mode})")
+            for error in result.errors:
+                self.output_received.emit(error)
+            self.dedup_finished.emit(len(result.linked), result.reclaimed)
+        except Exception as e:
+            self.output_received.emit(f"Error during deduplication: {str(e)}")
+
+
+class CutWorker(QObject):
+    """Worker class for removing marked SponsorBlock segments in batches"""
+    
+    output_received = Signal(str)
+    cut_finished = Signal(int, int)  # files cut, failures
+    
+    def __init__(self, max_workers: int = 2):
+        super().__init__()
+        self.max_workers = max_workers
+    
+    def process(self, batch: list):
+        """Cut a batch of (path, categories) items, a few at a time (each cut runs ffmpeg in its own process)"""
+        done = 0
+        failed = 0
+        
+        def cut(item):
+            path, categories = item
+            try:
+                return path, cut_file(path, categories), None
+            except Exception as e:
+                return path, None, str(e)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for path, result, error in pool.map(cut, batch):
+                if error:
+                    failed += 1
+                    self.output_received.emit(f"SponsorBlock cut failed for {path}: {error}")
+                    continue
+                removed, method = result
+                if method != 'none':
+                    done += 1
+                    self.output_received.emit(f"Removed {removed:.1f}s of segments from {path} ({method})")
+        
+        self.cut_finished.emit(done, failed)
+
+
+class HarvestWorker(QObject):
+    """Worker class for bulk metadata extraction into a file"""
+    
+    output_received = Signal(str)
+    harvest_progress = Signal(int, int, int)  # done, total, failures
+    harvest_finished = Signal(int, int)  # rows written, failures
+    
+    def __init__(self):
+        super().__init__()
+        self.harvester = None
+        self.stop_requested = False
+    
+    def run(self, urls: list, output: str, fmt: str):
+        """Harvest metadata for urls, resuming from the output's checkpoint"""
+        written = failures = 0
+        try:
+            self.harvester = Harvester(output, fmt)
+            if self.stop_requested:
+                self.harvester.stop()  # Stop was pressed before the harvest got going
+            skipped = sum(1 for url in urls if url in self.harvester.checkpoint.done)
+            if skipped:
+                self.output_received.emit(f"Resuming harvest, {skipped} URL(s) already in {output}")
+            written, failures = self.harvester.run(urls, self.harvest_progress.emit)
+        except Exception as e:
+            self.output_received.emit(f"Error during harvest: {str(e)}")
+        self.harvest_finished.emit(written, failures)
+    
+    def stop(self):
+        self.stop_requested = True
+        if self.harvester:
+            self.harvester.stop()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from paths import APP_CACHE_DIR
+
+
+DEFAULT_CACHE_DIR = APP_CACHE_DIR / "yt-dlp"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # player code changes far more often, older entries are dead weight
+
+
+class YtDlpCache:
+    """The --cache-dir every yt-dlp process started by the app shares
+
+    yt-dlp stores extractor artifacts there, most importantly YouTube's
+    solved player signature functions. Jobs started together against a
+    cold cache would all solve the same player JavaScript, so the scheduler
+    lets one job per site extract first and starts the rest once it is
+    downloading (see DownloadScheduler.warming).
+
+    yt-dlp writes entries to a temporary file and renames it, so parallel
+    processes never read half-written entries. Eviction only runs while no
+    download is running and ignores files it cannot remove.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.directory = Path(directory) if directory else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.warm_sites = set()
+        self.timings = {True: [], False: []}  # warm cache? -> seconds from start to first progress
+        self._lock = threading.Lock()
+
+    def is_warm(self, site: str) -> bool:
+        return site in self.warm_sites
+
+    def mark_warm(self, site: str):
+        self.warm_sites.add(site)
+
+    def record(self, warm: bool, seconds: float):
+        self.timings[bool(warm)].append(seconds)
+
+    def summary(self) -> Optional[str]:
+        """Average extraction time with a cold and a warm cache, None if nothing was timed"""
+        parts = []
+        for warm, label in ((False, 'cold'), (True, 'warm')):
+            times = self.timings[warm]
+            if times:
+                parts.append(f"{sum(times) / len(times):.1f}s {label} ({len(times)} job{'s' if len(times) != 1 else ''})")
+        return f"yt-dlp cache: time to first progress {', '.join(parts)}" if parts else None
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> Tuple[int, int]:
+        """Remove entries past max_age, then the oldest until under max_bytes; returns (files, bytes)"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[0])
+            total = sum(size for _, size, _ in entries)
+            cutoff = time.time() - self.max_age
+            removed = freed = 0
+            for mtime, size, path in entries:
+                if mtime >= cutoff and total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue  # open in a yt-dlp process on Windows, try again next time
+                total -= size
+                removed += 1
+                freed += size
+            if removed:
+                # What warmed a site may be gone
+                self.warm_sites.clear()
+            return removed, freed
\ No newline at end of file